@@ -0,0 +1,278 @@
+import csv
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ARCHIVE_CODECS = ('zlib', 'lzma', 'bz2')
+# Dopuszczalne poziomy kompresji (archive_level) kodeków - włącznie
+ARCHIVE_LEVELS = {'zlib': (-1, 9), 'lzma': (0, 9), 'bz2': (1, 9)}
+SEGMENT_SUFFIX = '.seg'
+LEGACY_SUFFIX = '.zip'
+MANIFEST_FILE = 'manifest.json'
+
+# Blok w pliku segmentu: długość skompresowanej treści, potem treść (wiersze CSV bez nagłówka)
+_BLOCK = struct.Struct("<I")
+# Koniec pliku segmentu: długość stopki (JSON) i znacznik formatu
+_TRAILER = struct.Struct("<Q4s")
+_MAGIC = b"SEG1"
+
+
+# lzma i bz2 są importowane dopiero przy użyciu kodeka - domyślny zlib nie wydłuża startu procesów
+def _compress(data: bytes, codec: str, level: Optional[int]) -> bytes:
+    if codec == 'lzma':
+        import lzma
+        return lzma.compress(data, preset=level)
+    if codec == 'bz2':
+        import bz2
+        return bz2.compress(data, 9 if level is None else level)
+    return zlib.compress(data, -1 if level is None else level)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'lzma':
+        import lzma
+        return lzma.decompress(data)
+    if codec == 'bz2':
+        import bz2
+        return bz2.decompress(data)
+    return zlib.decompress(data)
+
+
+def _row_seconds(text: str) -> float:
+    # Jak w Logger: tekst ISO albo nanosekundy od epoki
+    if text.isdigit():
+        return int(text) / 1e9
+    return datetime.fromisoformat(text).timestamp()
+
+
+def write_segment(sealed_path: str, segment_path: str, codec: str, level: Optional[int], block_rows: int) -> dict:
+    """
+    Kompresuje zamknięty plik CSV do segmentu z niezależnie skompresowanymi blokami po block_rows wierszy
+    i stopką opisującą każdy blok. Zwraca wpis do manifestu. Plik CSV nie jest usuwany - robi to
+    logger dopiero po dopisaniu segmentu do manifestu, więc czytelnicy zawsze widzą jedno z nich.
+    Uruchamiane w puli procesów/wątków archiwizujących, poza ścieżką zapisu.
+
+    Granice bloków wypadają co block_rows wierszy, tak jak punkty kontrolne indeksu (.idx) przy
+    index_every_rows == block_rows, więc zakres bajtów pliku CSV odpowiada całym blokom segmentu.
+    """
+    blocks = []
+    sensors = set()
+    summary = {'rows': 0, 'min_ts': None, 'max_ts': None, 'sorted': True}
+    tmp_path = segment_path + '.tmp'
+
+    with open(sealed_path, 'rb') as source, open(tmp_path, 'wb') as out:
+        header = source.readline()
+        source_offset = len(header)
+        lines = []
+        block = None
+
+        def close_block():
+            data = b''.join(lines)
+            compressed = _compress(data, codec, level)
+            block['offset'] = out.tell()
+            out.write(_BLOCK.pack(len(compressed)) + compressed)
+            block['sensors'] = sorted(block['sensors'])
+            blocks.append(block)
+            lines.clear()
+
+        for line in source:
+            row = next(csv.reader([line.decode('utf-8')]), None)
+            # Wiersze liczone jak w indeksie loggera (Logger._build_index) - puste i uszkodzone linie
+            # trafiają do bloku, ale się nie liczą. Blok jest zamykany dopiero przed następnym poprawnym
+            # wierszem, więc każdy blok zaczyna się (source) dokładnie w punkcie kontrolnym indeksu
+            valid = bool(row) and row[0] != 'timestamp' and len(row) >= 2
+            if valid and block is not None and block['rows'] >= block_rows:
+                close_block()
+                block = None
+            if block is None:
+                block = {'source': source_offset, 'rows': 0, 'min_ts': None, 'max_ts': None, 'sensors': set()}
+            if valid:
+                if block['rows'] == 0:
+                    block['source'] = source_offset
+                row_ts = _row_seconds(row[0])
+                if summary['max_ts'] is not None and row_ts < summary['max_ts']:
+                    summary['sorted'] = False
+                for stats in (block, summary):
+                    stats['min_ts'] = row_ts if stats['min_ts'] is None else min(stats['min_ts'], row_ts)
+                    stats['max_ts'] = row_ts if stats['max_ts'] is None else max(stats['max_ts'], row_ts)
+                    stats['rows'] += 1
+                block['sensors'].add(row[1])
+                sensors.add(row[1])
+            lines.append(line)
+            source_offset += len(line)
+        if block is not None:
+            close_block()
+
+        footer = json.dumps({'version': 1, 'codec': codec, 'header': header.decode('utf-8').strip(),
+                             **summary, 'sensors': sorted(sensors), 'blocks': blocks}).encode('utf-8')
+        out.write(footer + _TRAILER.pack(len(footer), _MAGIC))
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp_path, segment_path)
+    return {'file': os.path.basename(segment_path), **summary, 'sensors': sorted(sensors),
+            'size': os.path.getsize(segment_path), 'archived': time.time()}
+
+
+def read_footer(path: str) -> dict:
+    """Stopka segmentu: kodek, podsumowanie i lista bloków (offset, source, rows, min_ts, max_ts, sensors)."""
+    with open(path, 'rb') as f:
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} nie jest segmentem archiwum")
+        f.seek(-_TRAILER.size - length, os.SEEK_END)
+        footer = json.loads(f.read(length).decode('utf-8'))
+    # Koniec ostatniego bloku (początek stopki) - granica zakresów bajtów
+    footer['end'] = os.path.getsize(path) - _TRAILER.size - length
+    return footer
+
+
+def read_blocks(path: str, start_offset: int, end_offset: int, codec: str) -> bytes:
+    """Rozpakowuje kolejne bloki z bajtów [start_offset, end_offset) segmentu (wiersze CSV bez nagłówka)."""
+    parts = []
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        data = f.read(end_offset - start_offset)
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (length,) = _BLOCK.unpack_from(view, offset)
+        offset += _BLOCK.size
+        parts.append(_decompress(view[offset:offset + length], codec))
+        offset += length
+    return b''.join(parts)
+
+
+def block_ranges(footer: dict, start_ts: float, end_ts: float, sensor_id: Optional[str],
+                 max_rows: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Zakresy bajtów (od, do) z kolejnymi blokami, które mogą zawierać odczyty z [start_ts, end_ts]
+    (sekundy od epoki) danego czujnika. Przy max_rows zakresy mają najwyżej tyle wierszy (co najmniej jeden blok).
+    """
+    blocks = footer['blocks']
+    ranges = []
+    first = None
+    rows = 0
+    for number, block in enumerate(blocks):
+        matches = (block['min_ts'] is not None and block['max_ts'] >= start_ts and block['min_ts'] <= end_ts
+                   and (sensor_id is None or sensor_id in block['sensors']))
+        if first is not None and (not matches or (max_rows is not None and rows + block['rows'] > max_rows)):
+            ranges.append((blocks[first]['offset'], block['offset']))
+            first = None
+        if matches:
+            if first is None:
+                first, rows = number, 0
+            rows += block['rows']
+    if first is not None:
+        ranges.append((blocks[first]['offset'], footer['end']))
+    return ranges
+
+
+def source_range(footer: dict, start_offset: int, end_offset: Optional[int]) -> Tuple[int, int]:
+    """Zakres bajtów segmentu z blokami, które powstały z bajtów [start_offset, end_offset) pliku CSV."""
+    blocks = [block for block in footer['blocks']
+              if block['source'] >= start_offset and (end_offset is None or block['source'] < end_offset)]
+    if not blocks:
+        return 0, 0
+    following = [block['offset'] for block in footer['blocks'] if block['offset'] > blocks[-1]['offset']]
+    return blocks[0]['offset'], following[0] if following else footer['end']
+
+
+class Archive:
+    """
+    Katalog archiwum logów z manifestem (manifest.json) opisującym wszystkie segmenty:
+    nazwę pliku, liczbę wierszy, zakres czasu (sekundy od epoki), czujniki, rozmiar i czas archiwizacji.
+
+    Retencja i planowanie zapytań korzystają tylko z manifestu - bez listowania katalogu
+    i sprawdzania czasów modyfikacji plików. Katalog jest przeglądany jednorazowo, gdy manifestu
+    brak (np. przy pierwszym uruchomieniu z archiwami ZIP z poprzednich wersji - są one
+    dopisywane do manifestu i nadal można je czytać).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._segments: Dict[str, dict] = self._load()
+
+    def segments(self) -> List[dict]:
+        """Migawka wpisów manifestu (posortowana po nazwie pliku)."""
+        with self._lock:
+            return [self._segments[name] for name in sorted(self._segments)]
+
+    def path(self, entry: dict) -> str:
+        return os.path.join(self.directory, entry['file'])
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self._segments[entry['file']] = entry
+            self._save()
+
+    def expire(self, retention_days: int) -> List[str]:
+        """Usuwa segmenty zarchiwizowane wcześniej niż retention_days dni temu. Zwraca nazwy usuniętych plików."""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            expired = [name for name, entry in self._segments.items() if entry['archived'] < cutoff]
+            for name in expired:
+                del self._segments[name]
+            if expired:
+                self._save()
+
+        # Pliki są usuwane po zapisaniu manifestu - czytelnik z wcześniejszą migawką najwyżej ich nie znajdzie
+        for name in expired:
+            for path in (os.path.join(self.directory, name), os.path.join(self.directory, name) + '.idx'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return expired
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return {entry['file']: entry for entry in manifest['segments']}
+        except (OSError, ValueError, KeyError):
+            pass
+
+        segments = self._rebuild()
+        with self._lock:
+            self._segments = segments
+            self._save()
+        return segments
+
+    def _rebuild(self) -> Dict[str, dict]:
+        segments = {}
+        for file in os.listdir(self.directory):
+            path = os.path.join(self.directory, file)
+            try:
+                if file.endswith(SEGMENT_SUFFIX):
+                    footer = read_footer(path)
+                    summary = {key: footer[key] for key in ('rows', 'min_ts', 'max_ts', 'sorted', 'sensors')}
+                elif file.endswith(LEGACY_SUFFIX):
+                    summary = {'rows': None, 'min_ts': None, 'max_ts': None, 'sorted': False, 'sensors': None}
+                    try:
+                        with open(path + '.idx', 'r', encoding='utf-8') as f:
+                            index = json.load(f)
+                        summary = {key: index[key] for key in ('rows', 'min_ts', 'max_ts', 'sorted', 'sensors')}
+                    except (OSError, ValueError, KeyError):
+                        pass
+                else:
+                    continue
+                segments[file] = {'file': file, **summary, 'size': os.path.getsize(path),
+                                  'archived': os.path.getmtime(path)}
+            except (OSError, ValueError):
+                continue
+        return segments
+
+    def _save(self) -> None:
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'segments': [self._segments[name] for name in sorted(self._segments)]}, f)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,141 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+ROOT_NAME = "sensors"
+DEFAULT_LEVEL = logging.INFO
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Pisze do bieżącego sys.stdout (jak print), więc działa też z contextlib.redirect_stdout."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _Formatter(logging.Formatter):
+    # Format jak dotychczasowe komunikaty: "[SERVER] ...", "[SERVER ERROR] ..."
+    def format(self, record: logging.LogRecord) -> str:
+        tag = record.name.rsplit(".", 1)[-1].upper()
+        if record.levelno != logging.INFO:
+            tag += " " + record.levelname
+        text = f"[{tag}] {datetime.fromtimestamp(record.created).isoformat()} - {record.getMessage()}"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure(level: Union[int, str] = DEFAULT_LEVEL, handler: Optional[logging.Handler] = None) -> None:
+    """
+    Ustawia poziom komunikatów diagnostycznych i (przy pierwszym wywołaniu) kolejkę, z której
+    osobny wątek zapisuje je na stdout albo do podanego handlera. Wywoływane automatycznie
+    z domyślnym poziomem INFO przy pierwszym użyciu Diagnostics.
+    """
+    global _listener
+    root = logging.getLogger(ROOT_NAME)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    with _configure_lock:
+        if _listener is not None and handler is None:
+            return
+        if _listener is not None:
+            _listener.stop()
+        target = handler or _StdoutHandler()
+        if target.formatter is None:
+            target.setFormatter(_Formatter())
+
+        records = queue.SimpleQueue()
+        root.handlers = [logging.handlers.QueueHandler(records)]
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(records, target, respect_handler_level=True)
+        _listener.start()
+
+
+def current_level() -> int:
+    """Bieżący poziom komunikatów (np. do przekazania procesom potomnym)."""
+    return logging.getLogger(ROOT_NAME).getEffectiveLevel()
+
+
+def shutdown() -> None:
+    """Zapisuje komunikaty czekające w kolejce i zatrzymuje wątek zapisujący."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT_NAME).handlers = []
+
+
+atexit.register(shutdown)
+
+
+class Diagnostics:
+    """
+    Komunikaty diagnostyczne komponentu (server, client, logger, ...) z poziomami DEBUG-ERROR.
+
+    Zamiast print: treść jest formatowana dopiero, gdy komunikat zostanie wypisany
+    (diag.debug("Odczyt: %s", reading) przy wyłączonym DEBUG kosztuje tylko sprawdzenie poziomu),
+    a wypisywaniem zajmuje się osobny wątek (QueueHandler/QueueListener), więc wolne stdout
+    nie blokuje wątku serwera. Komunikaty z każdego odczytu są na poziomie DEBUG - domyślnie
+    (INFO) nie są wypisywane.
+
+    Parametr every (w sekundach) ogranicza częstotliwość komunikatu z danego miejsca
+    (rozpoznawanego po szablonie treści); pominięte komunikaty są zliczane i ich liczba jest
+    dopisywana do następnego wypisanego.
+    """
+
+    def __init__(self, name: str):
+        """:param name: Nazwa komponentu (wyświetlana w nawiasie, np. [SERVER ERROR])"""
+        if _listener is None:
+            configure(logging.getLogger(ROOT_NAME).level or DEFAULT_LEVEL)
+        self.logger = logging.getLogger(f"{ROOT_NAME}.{name}")
+        self._sites: Dict[str, list] = {}  # szablon -> [czas następnego wypisania, liczba pominiętych]
+
+    def is_enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, message: str, *args, every: Optional[float] = None, exc_info=None) -> None:
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, message, args, every, exc_info)
+
+    def info(self, message: str, *args, every: Optional[float] = None, exc_info=None) -> None:
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, message, args, every, exc_info)
+
+    def warning(self, message: str, *args, every: Optional[float] = None, exc_info=None) -> None:
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, message, args, every, exc_info)
+
+    def error(self, message: str, *args, every: Optional[float] = None, exc_info=None) -> None:
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, message, args, every, exc_info)
+
+    def _log(self, level: int, message: str, args: tuple, every: Optional[float], exc_info) -> None:
+        if every is not None:
+            now = time.monotonic()
+            site = self._sites.get(message)
+            if site is None:
+                site = self._sites[message] = [0.0, 0]
+            if now < site[0]:
+                site[1] += 1
+                return
+            site[0] = now + every
+            if site[1]:
+                message = f"{message} (pominięto {site[1]} podobnych)"
+                site[1] = 0
+        self.logger.log(level, message, *args, exc_info=exc_info)
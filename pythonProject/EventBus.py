@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+from Diagnostics import Diagnostics
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'sample')
+
+_log = Diagnostics("eventbus")
+
+
+class _Subscription:
+    """Kolejka i wątek jednego subskrybenta. Odczyty są przekazywane do obsługi paczkami."""
+
+    def __init__(self, name: str, handler: Callable[[List[dict]], None], queue_size: int, batch_size: int,
+                 max_delay: float, policy: str, sample_every: int, block_timeout: float):
+        self.name = name
+        self.handler = handler
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.policy = policy
+        self.sample_every = sample_every
+        self.block_timeout = block_timeout
+
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._overflow = 0
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"EventBus-{name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, reading: dict) -> None:
+        with self._lock:
+            if len(self._queue) >= self.queue_size and not self._make_room():
+                self.dropped += 1
+                return
+            self._queue.append(reading)
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._not_empty.notify()
+
+    def close(self, timeout: float = None) -> None:
+        with self._lock:
+            self._running = False
+            self._not_empty.notify()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "policy": self.policy,
+        }
+
+    def _make_room(self) -> bool:
+        # Wywoływane z założoną blokadą przy pełnej kolejce. Zwraca False, jeśli nowy odczyt trzeba odrzucić.
+        if self.policy == 'block':
+            deadline = time.monotonic() + self.block_timeout
+            while len(self._queue) >= self.queue_size and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._not_full.wait(remaining)
+            return len(self._queue) < self.queue_size
+
+        if self.policy == 'sample':
+            # Przy przepełnieniu przyjmujemy tylko co sample_every-ty odczyt - wolny subskrybent
+            # dostaje przerzedzony strumień zamiast jednej długiej dziury
+            self._overflow += 1
+            if self._overflow % self.sample_every:
+                return False
+
+        self._queue.popleft()
+        self.dropped += 1
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue and self._running:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+
+                # Czekamy na pełną paczkę, ale nie dłużej niż max_delay od pierwszego odczytu
+                deadline = time.monotonic() + self.max_delay
+                while len(self._queue) < self.batch_size and self._running:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._not_empty.wait(remaining)
+
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._not_full.notify_all()
+
+            try:
+                self.handler(batch)
+                self.delivered += len(batch)
+            except Exception as e:
+                self.errors += 1
+                _log.error("%s: %s", self.name, e, every=1.0)
+
+
+class EventBus:
+    """
+    Szyna publikuj/subskrybuj dla odczytów czujników.
+
+    publish() ma tę samą sygnaturę co callback czujnika, więc można ją zarejestrować bezpośrednio:
+    sensor.register_callback(bus.publish). Każdy subskrybent ma własną ograniczoną kolejkę i własny
+    wątek, który przekazuje odczyty do obsługi paczkami - wolny odbiorca (np. klient sieciowy)
+    nie blokuje odczytu czujników ani pozostałych subskrybentów. Zachowanie przy pełnej kolejce
+    zależy od polityki subskrybenta:
+
+    - "block" - publish() czeka na miejsce najwyżej block_timeout sekund, potem odczyt jest odrzucany,
+    - "drop_oldest" - najstarszy odczyt w kolejce jest usuwany,
+    - "sample" - przyjmowany jest tylko co sample_every-ty nadmiarowy odczyt (w miejsce najstarszego).
+
+    Ten sam słownik odczytu trafia do wszystkich subskrybentów - obsługa nie powinna go modyfikować.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, handler: Callable[[List[dict]], None], queue_size: int = 10000,
+                  batch_size: int = 100, max_delay: float = 0.05, policy: str = 'drop_oldest',
+                  sample_every: int = 10, block_timeout: float = 1.0) -> None:
+        """
+        Dodaje subskrybenta.
+
+        :param name: Nazwa subskrybenta (używana w stats() i unsubscribe())
+        :param handler: Funkcja wywoływana w wątku subskrybenta z listą odczytów (słowników)
+        :param queue_size: Maksymalna liczba odczytów czekających na obsługę
+        :param batch_size: Maksymalna liczba odczytów przekazywanych w jednym wywołaniu
+        :param max_delay: Jak długo (w sekundach) czekać na zebranie pełnej paczki
+        :param policy: Zachowanie przy pełnej kolejce: "block", "drop_oldest" lub "sample"
+        :param sample_every: Dla polityki "sample" - co który nadmiarowy odczyt jest przyjmowany
+        :param block_timeout: Dla polityki "block" - maksymalny czas oczekiwania na miejsce (w sekundach)
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Nieznana polityka przepełnienia: {policy}")
+        if queue_size < 1 or batch_size < 1 or sample_every < 1:
+            raise ValueError("queue_size, batch_size i sample_every muszą być dodatnie")
+
+        subscription = _Subscription(name, handler, queue_size, batch_size, max_delay, policy,
+                                     sample_every, block_timeout)
+        with self._lock:
+            previous = self._subscriptions.get(name)
+            # Nowy słownik zamiast modyfikacji - publish() iteruje bez blokady
+            self._subscriptions = {**self._subscriptions, name: subscription}
+        if previous is not None:
+            previous.close()
+
+    def unsubscribe(self, name: str) -> None:
+        """Usuwa subskrybenta po obsłużeniu odczytów, które już są w jego kolejce."""
+        with self._lock:
+            subscriptions = dict(self._subscriptions)
+            subscription = subscriptions.pop(name, None)
+            self._subscriptions = subscriptions
+        if subscription is not None:
+            subscription.close()
+
+    def publish(self, **reading) -> None:
+        """Przekazuje odczyt (sensor_id, timestamp, value, unit) do kolejek wszystkich subskrybentów."""
+        for subscription in self._subscriptions.values():
+            subscription.offer(reading)
+
+    def stop(self, timeout: float = None) -> None:
+        """Obsługuje odczyty pozostałe w kolejkach i zatrzymuje wątki subskrybentów."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions = {}
+        for subscription in subscriptions:
+            subscription.close(timeout)
+
+    def stats(self) -> Dict[str, dict]:
+        """Liczba odczytów w kolejce, obsłużonych, odrzuconych i błędów obsługi dla każdego subskrybenta."""
+        return {name: subscription.stats() for name, subscription in self._subscriptions.items()}
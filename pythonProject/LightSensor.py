@@ -1,13 +1,11 @@
 import math
-import numpy as np
-from datetime import datetime
 from random import choices, gauss
 from Sensor import Sensor
 
 
 class LightSensor(Sensor):
-    def __init__(self, sensor_id, name, unit="lux", min_value=0, max_value=25000, frequency=1):
-        super().__init__(sensor_id, name, unit, min_value, max_value, frequency)
+    def __init__(self, sensor_id, name, unit="lux", min_value=0, max_value=25000, frequency=1, epoch_ns=False):
+        super().__init__(sensor_id, name, unit, min_value, max_value, frequency, epoch_ns)
         self.unit = unit
         self.noise_level = 0.05
         self.baseline_indoor = 50
@@ -16,8 +14,9 @@ class LightSensor(Sensor):
         if not self.active:
             raise Exception(f"Czujnik {self.name} jest wyłączony.")
 
-        hour = datetime.now().hour
-        minute = datetime.now().minute
+        now, timestamp = self._clock()
+        hour = now.hour
+        minute = now.minute
 
         time_decimal = hour + minute / 60.0
         base_light = self._calculate_natural_light_cycle(time_decimal)
@@ -51,7 +50,7 @@ class LightSensor(Sensor):
         for callback in self._callbacks:
             callback(
                 sensor_id=self.sensor_id,
-                timestamp=datetime.now(),
+                timestamp=timestamp,
                 value=self.last_value,
                 unit=self.unit
             )
@@ -1,10 +1,154 @@
+import io
 import os
 import json
 import csv
-import shutil
-import zipfile
+import heapq
+import queue
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from operator import itemgetter
 from datetime import datetime, timedelta
-from typing import Dict, Iterator, Optional
+from typing import Dict, Iterator, List, Optional, Union
+
+from Archive import (
+    ARCHIVE_CODECS, ARCHIVE_LEVELS, LEGACY_SUFFIX, SEGMENT_SUFFIX, Archive, block_ranges, read_blocks, read_footer,
+    source_range, write_segment
+)
+from Diagnostics import Diagnostics
+from Metrics import METRICS
+from network.Protocol import from_epoch_ns, to_epoch_ns
+from Rollups import ROLLUP_TIERS, Rollups
+
+FIELDNAMES = ['timestamp', 'sensor_id', 'value', 'unit']
+INDEX_SUFFIX = '.idx'
+FSYNC_POLICIES = ('never', 'interval', 'always')
+TIMESTAMP_FORMATS = ('iso', 'epoch_ns')
+EXECUTORS = ('process', 'thread')
+
+_STOP = object()  # Znacznik końca kolejki wątku zapisującego
+
+
+def _parse_timestamp(text: str, as_ns: bool):
+    """Odczytuje znacznik czasu z CSV (tekst ISO lub nanosekundy od epoki) jako int ns (as_ns) albo datetime."""
+    if text.isdigit():
+        return int(text) if as_ns else from_epoch_ns(int(text))
+    timestamp = datetime.fromisoformat(text)
+    return to_epoch_ns(timestamp) if as_ns else timestamp
+
+
+def _epoch_seconds(timestamp) -> float:
+    return timestamp / 1e9 if isinstance(timestamp, int) else timestamp.timestamp()
+
+
+def _new_index() -> dict:
+    return {
+        'version': 1,
+        'rows': 0,
+        'size': 0,
+        'min_ts': None,
+        'max_ts': None,
+        'sorted': True,
+        'sensors': [],
+        # [przesunięcie w bajtach, największy znacznik czasu w wierszach przed tym miejscem]
+        'checkpoints': []
+    }
+
+
+def _load_index(path: str, expected_size: Optional[int] = None) -> Optional[dict]:
+    """Wczytuje indeks pliku z logami. Zwraca None, jeśli go brak lub jest nieaktualny."""
+    try:
+        with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if expected_size is not None and index.get('size') != expected_size:
+        return None
+    return index
+
+
+def _write_index(path: str, index: dict) -> None:
+    tmp_path = path + INDEX_SUFFIX + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path + INDEX_SUFFIX)
+
+
+def _scan_segment(path: str, start_offset: int, end_offset: Optional[int], start: datetime, end: datetime,
+                  sensor_id: Optional[str], sort: bool) -> list:
+    """
+    Czyta wiersze z bajtów [start_offset, end_offset) pliku CSV, segmentu archiwum (.seg - zakres
+    obejmuje całe bloki, rozpakowywane są tylko one) lub jedynego pliku w archiwum ZIP z poprzednich
+    wersji i zwraca pasujące do zakresu/czujnika jako krotki (timestamp, sensor_id, value, unit).
+    Uruchamiane w puli procesów czytających - filtrowanie odbywa się po stronie procesu roboczego.
+
+    :param sort: Czy posortować wynik po czasie (dla plików, w których wiersze nie są uporządkowane)
+    """
+    if path.endswith(SEGMENT_SUFFIX):
+        data = read_blocks(path, start_offset, end_offset, read_footer(path)['codec'])
+    elif path.endswith(LEGACY_SUFFIX):
+        import zipfile
+        data = []
+        with zipfile.ZipFile(path) as zipf:
+            names = zipf.namelist()
+            for name in names:
+                with zipf.open(name) as f:
+                    if len(names) == 1:
+                        data.append(_read_range(f, start_offset, end_offset))
+                    else:
+                        data.append(_read_range(f, 0, None))
+        data = b''.join(data)
+    else:
+        with open(path, 'rb') as f:
+            data = _read_range(f, start_offset, end_offset)
+
+    rows = []
+    as_ns = isinstance(start, int)
+    for row in csv.reader(io.StringIO(data.decode('utf-8'), newline='')):
+        if len(row) != len(FIELDNAMES) or row[0] == FIELDNAMES[0]:
+            continue
+        if sensor_id is not None and row[1] != sensor_id:
+            continue
+        row_time = _parse_timestamp(row[0], as_ns)
+        if row_time > end and not sort:
+            break
+        if start <= row_time <= end:
+            rows.append((row_time, row[1], float(row[2]), row[3]))
+
+    if sort:
+        rows.sort(key=itemgetter(0))
+    return rows
+
+
+def _read_range(f, start_offset: int, end_offset: Optional[int]) -> bytes:
+    f.seek(start_offset)
+    data = f.read() if end_offset is None else f.read(end_offset - start_offset)
+    if start_offset == 0:
+        # Pomijamy nagłówek
+        newline = data.find(b'\n')
+        data = data[newline + 1:] if newline >= 0 else b''
+    return data
+
+
+def _index_matches(index: dict, start: datetime, end: datetime, sensor_id: Optional[str]) -> bool:
+    """Czy plik opisany indeksem (lub wpisem manifestu archiwum) może zawierać odczyty z danego zakresu."""
+    if index['rows'] is None:
+        # Archiwum ZIP bez indeksu - nic o nim nie wiadomo
+        return True
+    if not index['rows'] or index['max_ts'] < _epoch_seconds(start) or index['min_ts'] > _epoch_seconds(end):
+        return False
+    return sensor_id is None or sensor_id in index['sensors']
+
+
+def _seek_offset(index: dict, start: datetime) -> int:
+    """Przesunięcie ostatniego punktu kontrolnego, przed którym wszystkie wiersze są starsze niż start."""
+    checkpoints = index['checkpoints']
+    start_ts = _epoch_seconds(start)
+    # Największe znaczniki czasu przed kolejnymi punktami kontrolnymi rosną (pierwszy to None)
+    position = bisect_left([c[1] for c in checkpoints[1:]], start_ts) + 1
+    return checkpoints[position - 1][0] if checkpoints else 0
+
 
 class Logger:
     def __init__(self, config_path: str):
@@ -14,15 +158,54 @@ class Logger:
         self._validate_config(config)
         self.log_dir = config['log_dir']
         self.archive_dir = os.path.join(self.log_dir, 'archive')
+        self.sealed_dir = os.path.join(self.log_dir, 'sealed')
         self.filename_pattern = config['filename_pattern']
         self.buffer_size = config['buffer_size']
         self.rotate_every_hours = config['rotate_every_hours']
         self.max_size_mb = config['max_size_mb']
         self.rotate_after_lines = config.get('rotate_after_lines', None)
         self.retention_days = config['retention_days']
+        self.index_every_rows = config.get('index_every_rows', 1000)
+        # 'iso' (tekst ISO jak dotąd) albo 'epoch_ns' (int - nanosekundy od epoki, bez formatowania
+        # i parsowania dat przy zapisie i odczycie). Pliki w obu formatach można czytać zamiennie.
+        self.timestamp_format = config.get('timestamp_format', 'iso')
+        self.epoch_ns = self.timestamp_format == 'epoch_ns'
+
+        # Tryb asynchroniczny: log_reading tylko wrzuca odczyt do kolejki, a zapisem zajmuje się
+        # osobny wątek, który zbiera odczyty przez group_commit_ms i zapisuje je jedną paczką
+        self.async_write = config.get('async_write', False)
+        self.queue_size = config.get('queue_size', 10000)
+        self.group_commit_ms = config.get('group_commit_ms', 50)
+        self.backpressure_timeout = config.get('backpressure_timeout', 1.0)
+        self.fsync = config.get('fsync', 'never')
+        self.fsync_interval_ms = config.get('fsync_interval_ms', 1000)
+
+        # Rotacja tylko zamyka plik i przenosi go do sealed/, a kompresją do archive/
+        # zajmuje się pula procesów (lub wątków) w tle
+        self.archive_codec = config.get('archive_codec', 'zlib')
+        self.archive_level = config.get('archive_level', None)
+        self.archive_workers = config.get('archive_workers', 1)
+        self.archive_executor = config.get('archive_executor', 'process')
+
+        # Równoległe czytanie (read_logs(..., parallel=True)): pliki są dzielone na zadania
+        # po ok. read_chunk_rows wierszy, a w locie jest co najwyżej read_prefetch zadań
+        self.read_workers = config.get('read_workers', None)
+        self.read_executor = config.get('read_executor', 'process')
+        self.read_prefetch = config.get('read_prefetch', 2 * (self.read_workers or os.cpu_count() or 1))
+        self.read_chunk_rows = config.get('read_chunk_rows', 20000)
+
+        # Poziomy zagregowanych odczytów (Rollups) w log_dir/rollups - do zapytań o długie okresy.
+        # Domyślnie wyłączone (potrzebne tylko serwerowi); tworzone w start(), więc można je włączyć
+        # także po utworzeniu loggera (rollups_enabled = True)
+        self.rollups_enabled = config.get('rollups', False)
+        self.rollup_tiers = config.get('rollup_tiers', ROLLUP_TIERS)
+        self.rollup_retention_days = config.get('rollup_retention_days')
+        self.rollup_grace_seconds = config.get('rollup_grace_seconds', 60)
+        self.rollups: Optional[Rollups] = None
 
         os.makedirs(self.log_dir, exist_ok=True)
         os.makedirs(self.archive_dir, exist_ok=True)
+        os.makedirs(self.sealed_dir, exist_ok=True)
 
         self.buffer = []
         self.current_file = None
@@ -31,7 +214,152 @@ class Logger:
         self.current_file_open_time = None
         self.current_line_count = 0
 
+        # Indeks bieżącego pliku (zapisywany obok jako <plik>.idx przy każdym flush)
+        self._index = None
+        self._index_sensors = set()
+        self._buffer_times = []
+
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._buffer_since = None
+        self._last_fsync = time.monotonic()
+        self.dropped = 0
+        self.last_flush_lag = 0.0  # Czas (s) między przyjęciem najstarszego odczytu a jego zapisem
+
+        # Segmenty archiwum (.seg) i ich manifest - retencja i planowanie odczytów bez listowania archive/
+        self.archive = Archive(self.archive_dir)
+        self._archiver = None
+        self._reader = None
+        self._diagnostics = Diagnostics("logger")
+
+        self._metric_flush = METRICS.histogram("logger_flush_seconds", "Czas zapisu bufora do pliku (_flush)")
+        self._metric_rotate = METRICS.histogram("logger_rotate_seconds", "Czas rotacji pliku logu (_rotate)")
+        self._metric_dropped = METRICS.counter("logger_dropped_total", "Odczyty pominięte przy pełnej kolejce zapisu")
+        METRICS.gauge("logger_buffer_depth", "Odczyty w buforze czekające na zapis", lambda: len(self.buffer))
+        METRICS.gauge("logger_queue_depth", "Odczyty w kolejce i buforze czekające na zapis", self.queue_depth)
+        METRICS.gauge("logger_flush_lag_seconds", "Czas od przyjęcia najstarszego odczytu do jego zapisu",
+                      lambda: self.last_flush_lag)
+
     def start(self):
+        if self.rollups_enabled and self.rollups is None:
+            self.rollups = Rollups(os.path.join(self.log_dir, 'rollups'), tiers=self.rollup_tiers,
+                                   retention_days=self.rollup_retention_days,
+                                   grace_seconds=self.rollup_grace_seconds)
+        self._open_file()
+        if self.rollups is not None:
+            self.rollups.clean()
+        # Segmenty zamknięte przed awarią, których nie zdążono zarchiwizować
+        for file in sorted(os.listdir(self.sealed_dir)):
+            if file.endswith('.csv'):
+                self._submit_archive(os.path.join(self.sealed_dir, file))
+        if self.async_write and self._writer is None:
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._writer = threading.Thread(target=self._writer_loop, name="LoggerWriter", daemon=True)
+            self._writer.start()
+
+    def stop(self):
+        """Zatrzymuje logger. W trybie asynchronicznym najpierw zapisuje wszystko, co czeka w kolejce."""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+        self._close_file(sync=True)
+        if self.rollups is not None:
+            self.rollups.close()
+        if self._archiver is not None:
+            self._archiver.shutdown(wait=True)
+            self._archiver = None
+        if self._reader is not None:
+            self._reader.shutdown(wait=True, cancel_futures=True)
+            self._reader = None
+
+    def queue_depth(self) -> int:
+        """Liczba odczytów czekających na zapis (w kolejce i w buforze)."""
+        pending = len(self.buffer)
+        if self._queue is not None:
+            pending += self._queue.qsize()
+        return pending
+
+    def shed(self, count: int) -> int:
+        """
+        Usuwa z kolejki zapisu (tryb asynchroniczny) do count najstarszych odczytów, np. gdy serwer
+        woli zapisać najnowsze odczyty niż zaległe. Zwraca liczbę usuniętych odczytów (liczonych w dropped).
+        """
+        if self._queue is None:
+            return 0
+        removed = 0
+        while removed < count:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(item)
+                break
+            removed += 1
+        self.dropped += removed
+        self._metric_dropped.inc(removed)
+        return removed
+
+    def log_reading(self, sensor_id: str, timestamp: Union[datetime, int], value: float, unit: str):
+        if self._writer is not None:
+            try:
+                self._queue.put((sensor_id, timestamp, value, unit, time.monotonic()),
+                                timeout=self.backpressure_timeout)
+            except queue.Full:
+                # Wątek zapisujący nie nadąża nawet po odczekaniu - odczyt jest tracony
+                self.dropped += 1
+                self._metric_dropped.inc()
+                self.log_error("Kolejka zapisu pełna - pominięto odczyt z czujnika %s", sensor_id, every=1.0)
+            return
+
+        self._append(sensor_id, timestamp, value, unit, time.monotonic())
+        if len(self.buffer) >= self.buffer_size:
+            self._flush()
+            if self._should_rotate():
+                self._rotate()
+
+    def _append(self, sensor_id, timestamp, value, unit, received_at):
+        if not self.buffer:
+            self._buffer_since = received_at
+        if isinstance(timestamp, int):
+            text = str(timestamp) if self.epoch_ns else from_epoch_ns(timestamp).isoformat()
+        else:
+            text = str(to_epoch_ns(timestamp)) if self.epoch_ns else timestamp.isoformat()
+        self.buffer.append([text, sensor_id, value, unit])
+        self._buffer_times.append(_epoch_seconds(timestamp))
+        self.current_line_count += 1
+        if self.rollups is not None:
+            self.rollups.add(sensor_id, timestamp if isinstance(timestamp, int) else to_epoch_ns(timestamp),
+                             value, unit)
+
+    def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.group_commit_ms / 1000
+            # Group commit: dobieramy odczyty, które przyjdą w ciągu group_commit_ms
+            while len(batch) < self.queue_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                for item in batch:
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        self._append(*item)
+                self._flush()
+                if self._should_rotate():
+                    self._rotate()
+            except Exception as e:
+                self.log_error("Błąd wątku zapisującego logi: %s", e, every=1.0)
+
+    def _open_file(self):
         now = datetime.now()
         self.current_file_open_time = now
         filename = now.strftime(self.filename_pattern)
@@ -42,31 +370,103 @@ class Logger:
         self.current_writer = csv.writer(self.current_file)
 
         if is_new_file:
-            self.current_writer.writerow(['timestamp', 'sensor_id', 'value', 'unit'])
+            self.current_writer.writerow(FIELDNAMES)
+            self.current_file.flush()
+        self._open_index()
 
-    def stop(self):
-        self._flush()
+    def _close_file(self, sync: bool = False):
+        self._flush(sync=sync)
         if self.current_file:
             self.current_file.close()
             self.current_file = None
             self.current_writer = None
             self.current_file_path = None
 
-    def log_reading(self, sensor_id: str, timestamp: datetime, value: float, unit: str):
-        self.buffer.append([timestamp.isoformat(), sensor_id, value, unit])
-        self.current_line_count += 1
-
-        if len(self.buffer) >= self.buffer_size:
-            self._flush()
-            if self._should_rotate():
-                self._rotate()
-
-    def _flush(self):
+    def _flush(self, sync: bool = False):
+        """
+        Zapisuje bufor do pliku i aktualizuje indeks. fsync jest wykonywany zgodnie
+        z polityką 'fsync' (never/interval/always) albo zawsze, gdy sync=True.
+        """
         if not self.current_writer:
             return
-        self.current_writer.writerows(self.buffer)
-        self.current_file.flush()
+        started = time.perf_counter()
+        if self.buffer:
+            self.current_file.write(self._render_rows(self.buffer, self._buffer_times))
+            self.current_file.flush()
+            _write_index(self.current_file_path, self._index)
+            self.last_flush_lag = time.monotonic() - self._buffer_since
         self.buffer = []
+        self._buffer_times = []
+        if self.rollups is not None:
+            self.rollups.flush()
+
+        now = time.monotonic()
+        if sync or self.fsync == 'always' or (
+                self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval_ms / 1000):
+            os.fsync(self.current_file.fileno())
+            self._last_fsync = now
+        self._metric_flush.observe(time.perf_counter() - started)
+
+    def _open_index(self):
+        """Wczytuje indeks bieżącego pliku albo odbudowuje go, jeśli jest nieaktualny."""
+        size = os.path.getsize(self.current_file_path)
+        index = _load_index(self.current_file_path, size)
+        if index is None:
+            index = self._build_index(self.current_file_path)
+            _write_index(self.current_file_path, index)
+        self._index = index
+        self._index_sensors = set(index['sensors'])
+
+    def _build_index(self, path: str) -> dict:
+        index = _new_index()
+        self._index, self._index_sensors = index, set()
+        with open(path, 'rb') as f:
+            offset = 0
+            for raw_line in f:
+                line_size = len(raw_line)
+                row = next(csv.reader([raw_line.decode('utf-8')]), None)
+                if not row or row[0] == 'timestamp' or len(row) < 2:
+                    offset += line_size
+                    index['size'] = offset
+                    continue
+                self._index_row(offset, _parse_timestamp(row[0], True) / 1e9, row[1])
+                offset += line_size
+                index['size'] = offset
+        index['sensors'] = sorted(self._index_sensors)
+        return index
+
+    def _render_rows(self, rows, times) -> str:
+        """Formatuje wiersze CSV i dopisuje je do indeksu (razem z punktami kontrolnymi przesunięć)."""
+        out = io.StringIO()
+        writer = csv.writer(out)
+        chunks = []
+        for row, row_time in zip(rows, times):
+            if self._index['rows'] % self.index_every_rows == 0:
+                # Punkt kontrolny wymaga dokładnego przesunięcia w bajtach
+                chunk = out.getvalue()
+                chunks.append(chunk)
+                self._index['size'] += len(chunk.encode('utf-8'))
+                out.seek(0)
+                out.truncate()
+            writer.writerow(row)
+            self._index_row(None, row_time, row[1])
+
+        chunk = out.getvalue()
+        chunks.append(chunk)
+        self._index['size'] += len(chunk.encode('utf-8'))
+        self._index['sensors'] = sorted(self._index_sensors)
+        return ''.join(chunks)
+
+    def _index_row(self, offset: Optional[int], row_time: float, sensor_id: str):
+        index = self._index
+        if index['rows'] % self.index_every_rows == 0:
+            index['checkpoints'].append([index['size'] if offset is None else offset, index['max_ts']])
+        if index['max_ts'] is not None and row_time < index['max_ts']:
+            index['sorted'] = False
+        index['min_ts'] = row_time if index['min_ts'] is None else min(index['min_ts'], row_time)
+        index['max_ts'] = row_time if index['max_ts'] is None else max(index['max_ts'], row_time)
+        index['rows'] += 1
+        self._index_sensors.add(sensor_id)
 
     def _should_rotate(self) -> bool:
         # Sprawdzenie rotacji czasowej
@@ -86,62 +486,366 @@ class Logger:
         return False
 
     def _rotate(self):
-        self.stop()
-
-        # Archiwizacja
-        base_name = os.path.basename(self.current_file_path)
-        archive_path = os.path.join(self.archive_dir, base_name.replace('.csv', '.zip'))
+        started = time.perf_counter()
+        file_path = self.current_file_path
+        self._close_file(sync=True)
 
-        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(self.current_file_path, arcname=os.path.basename(self.current_file_path))
+        # Zamknięcie segmentu to tylko zmiana nazwy - plik (z indeksem) trafia do sealed/
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        sealed_path = os.path.join(self.sealed_dir, f"{stem}_{datetime.now():%H%M%S%f}.csv")
+        if os.path.exists(file_path + INDEX_SUFFIX):
+            os.replace(file_path + INDEX_SUFFIX, sealed_path + INDEX_SUFFIX)
+        os.replace(file_path, sealed_path)
 
-        os.remove(self.current_file_path)
+        self._open_file()
+        self.current_line_count = 0
 
+        self._submit_archive(sealed_path)
         self._clean_old_archives()
-        self.start()
-        self.current_line_count = 0
+        if self.rollups is not None:
+            self.rollups.clean()
+        self._metric_rotate.observe(time.perf_counter() - started)
+
+    def _submit_archive(self, sealed_path: str):
+        archive_path = os.path.join(self.archive_dir, os.path.basename(sealed_path)[:-len('.csv')] + SEGMENT_SUFFIX)
+        # Bloki po index_every_rows wierszy - ich granice pokrywają się z punktami kontrolnymi indeksu
+        job = self._get_archiver().submit(
+            write_segment, sealed_path, archive_path, self.archive_codec, self.archive_level, self.index_every_rows
+        )
+        job.add_done_callback(lambda done: self._archive_done(done, sealed_path))
+
+    def _archive_done(self, job, sealed_path: str):
+        error = job.exception()
+        if error is not None:
+            self.log_error(f"Błąd archiwizacji segmentu logów: {error}")
+            return
+        # Zamknięty plik znika dopiero, gdy segment jest w manifeście - czytelnicy zawsze widzą jedno z nich
+        self.archive.add(job.result())
+        for path in (sealed_path, sealed_path + INDEX_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
     def _clean_old_archives(self):
-        cutoff = datetime.now() - timedelta(days=self.retention_days)
-
-        for file in os.listdir(self.archive_dir):
-            if file.endswith('.zip'):
-                full_path = os.path.join(self.archive_dir, file)
-                mod_time = datetime.fromtimestamp(os.path.getmtime(full_path))
-                if mod_time < cutoff:
-                    os.remove(full_path)
-
-    def read_logs(self, start: datetime, end: datetime, sensor_id: Optional[str] = None) -> Iterator[Dict]:
-        # Przeszukiwanie plików CSV w log_dir
-        for file in os.listdir(self.log_dir):
-            if file.endswith('.csv'):
-                yield from self._read_csv(os.path.join(self.log_dir, file), start, end, sensor_id)
+        self.archive.expire(self.retention_days)
 
-        # Przeszukiwanie archiwów ZIP
-        for file in os.listdir(self.archive_dir):
-            if file.endswith('.zip'):
-                with zipfile.ZipFile(os.path.join(self.archive_dir, file)) as zipf:
-                    for name in zipf.namelist():
+    def _get_archiver(self):
+        if self._archiver is None:
+            self._archiver = self._make_executor(self.archive_executor, self.archive_workers, "LoggerArchiver")
+        return self._archiver
+
+    def _get_reader(self):
+        if self._reader is None:
+            self._reader = self._make_executor(self.read_executor, self.read_workers, "LoggerReader")
+        return self._reader
+
+    @staticmethod
+    def _make_executor(kind: str, workers: Optional[int], name: str):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if kind == 'process':
+            # "spawn" - proces roboczy nie dziedziczy wątków (np. wątku zapisującego) ani ich blokad
+            import multiprocessing
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    def read_logs(self, start: Union[datetime, int], end: Union[datetime, int], sensor_id: Optional[str] = None,
+                  parallel: bool = False) -> Iterator[Dict]:
+        """
+        Zwraca odczyty z przedziału [start, end] (opcjonalnie tylko jednego czujnika).
+        Pliki, których indeks (<plik>.idx) wyklucza zakres czasu lub czujnik, są pomijane,
+        a w pozostałych czytanie zaczyna się od punktu kontrolnego najbliższego początkowi zakresu.
+
+        Granice można podać jako datetime albo nanosekundy od epoki. Znaczniki czasu odczytów są
+        zwracane jako datetime, a przy timestamp_format == 'epoch_ns' jako int (nanosekundy od epoki).
+
+        :param parallel: Czytaj pliki równolegle w puli procesów i zwracaj odczyty posortowane po czasie
+                         (bez tej opcji kolejność odczytów z różnych plików jest dowolna)
+        """
+        if self.epoch_ns:
+            start, end = to_epoch_ns(start), to_epoch_ns(end)
+        else:
+            start = from_epoch_ns(start) if isinstance(start, int) else start
+            end = from_epoch_ns(end) if isinstance(end, int) else end
+
+        if parallel:
+            yield from self._read_logs_parallel(start, end, sensor_id)
+            return
+
+        # Przeszukiwanie plików CSV w log_dir oraz zamkniętych segmentów czekających na archiwizację
+        read_segments = set()
+        for directory in (self.log_dir, self.sealed_dir):
+            for file in os.listdir(directory):
+                if file.endswith('.csv'):
+                    path = os.path.join(directory, file)
+                    try:
+                        index = _load_index(path, os.path.getsize(path))
+                        yield from self._read_csv(path, start, end, sensor_id, index=index)
+                    except FileNotFoundError:
+                        # Plik został w międzyczasie zamknięty lub zarchiwizowany - znajdzie się dalej
+                        continue
+                    read_segments.add(file[:-len('.csv')])
+
+        # Przeszukiwanie archiwum według manifestu
+        for entry in self.archive.segments():
+            stem, suffix = os.path.splitext(entry['file'])
+            if stem in read_segments or not _index_matches(entry, start, end, sensor_id):
+                continue
+            path = self.archive.path(entry)
+            try:
+                if suffix == SEGMENT_SUFFIX:
+                    yield from self._read_segment(path, start, end, sensor_id)
+                    continue
+                import zipfile
+                index = _load_index(path)
+                with zipfile.ZipFile(path) as zipf:
+                    names = zipf.namelist()
+                    for name in names:
                         with zipf.open(name) as f:
-                            yield from self._read_csv(f, start, end, sensor_id, from_zip=True)
+                            yield from self._read_csv(f, start, end, sensor_id, from_zip=True,
+                                                      index=index if len(names) == 1 else None)
+            except FileNotFoundError:
+                # Segment usunięty przez retencję po pobraniu migawki manifestu
+                continue
 
-    def log_info(self, message: str):
-        print(f"[INFO] {datetime.now().isoformat()} - {message}")
+    def _read_segment(self, path: str, start, end, sensor_id: Optional[str]) -> Iterator[Dict]:
+        """Odczyty z segmentu archiwum - rozpakowywane są tylko bloki pasujące do zakresu i czujnika."""
+        footer = read_footer(path)
+        for start_offset, end_offset in block_ranges(footer, _epoch_seconds(start), _epoch_seconds(end), sensor_id):
+            for row in _scan_segment(path, start_offset, end_offset, start, end, sensor_id, not footer['sorted']):
+                yield dict(zip(FIELDNAMES, row))
 
-    def log_error(self, message: str):
-        print(f"[ERROR] {datetime.now().isoformat()} - {message}")
+    def query_rollups(self, start: Union[datetime, int], end: Union[datetime, int],
+                      resolution: Union[float, timedelta], sensor_id: Optional[str] = None) -> List[Dict]:
+        """
+        Zwraca zagregowane odczyty z przedziału [start, end] w kubełkach o długości resolution
+        (sekundy lub timedelta): listę słowników z timestamp (początek kubełka), sensor_id, count,
+        avg, min, max, last i unit, posortowaną po czasie i czujniku.
 
-    def _read_csv(self, file_obj, start, end, sensor_id, from_zip=False):
-        import io
-        open_file = (
-            io.TextIOWrapper(file_obj) if from_zip
-            else open(file_obj, newline='', encoding='utf-8')
-        )
+        Dane pochodzą z najgrubszego poziomu Rollups, z którego da się złożyć kubełki tej długości
+        (np. doby z poziomu 1h). Gdy żaden nie pasuje (np. resolution krótsze niż minuta), odczyty
+        są agregowane z surowych logów - tak samo jak część zakresu sprzed początku danych poziomu
+        (Rollups.covered_from, np. sprzed włączenia Rollups). Kubełki są wyrównane do początku epoki (UTC).
+        """
+        seconds = resolution.total_seconds() if isinstance(resolution, timedelta) else resolution
+        resolution_ns = int(seconds * 10 ** 9)
+        if resolution_ns <= 0:
+            raise ValueError("resolution musi być dodatnie")
+        start_ns, end_ns = to_epoch_ns(start), to_epoch_ns(end)
+
+        tier = self.rollups.pick_tier(resolution_ns) if self.rollups is not None else None
+        covered_ns = self.rollups.covered_from(tier) if tier is not None else None
+        # Odczyty sprzed covered_ns (cały zakres, gdy poziom nie ma danych) - z surowych logów
+        raw_end_ns = end_ns if covered_ns is None else min(end_ns, covered_ns - 1)
+        buckets = {}
+        if covered_ns is not None and covered_ns <= end_ns:
+            buckets = self.rollups.query(tier, max(start_ns, covered_ns), end_ns, resolution_ns, sensor_id)
+        if start_ns <= raw_end_ns:
+            readings = ({**reading, 'timestamp': to_epoch_ns(reading['timestamp'])}
+                        for reading in self.read_logs(start_ns, raw_end_ns, sensor_id))
+            buckets = Rollups.aggregate(readings, resolution_ns, into=buckets)
+        return Rollups.to_rows(buckets, as_datetime=not self.epoch_ns)
+
+    def _read_logs_parallel(self, start: datetime, end: datetime, sensor_id: Optional[str]) -> Iterator[Dict]:
+        segments = self._plan_scan(start, end, sensor_id)
+        executor = self._get_reader()
+
+        # Zadania są zlecane w kolejności planu, z wyprzedzeniem co najwyżej read_prefetch zadań
+        jobs = [(path, start_offset, end_offset, sort)
+                for _, path, ranges, sort in segments for start_offset, end_offset in ranges]
+        futures = {}
+        next_job = 0
+
+        def submit_until(job_number: int):
+            nonlocal next_job
+            while next_job < len(jobs) and (next_job <= job_number or len(futures) < self.read_prefetch):
+                path, start_offset, end_offset, sort = jobs[next_job]
+                futures[next_job] = executor.submit(
+                    _scan_segment, path, start_offset, end_offset, start, end, sensor_id, sort
+                )
+                next_job += 1
 
-        with open_file as f:
-            reader = csv.DictReader(f)
+        def stream(first_job: int, job_count: int):
+            for job_number in range(first_job, first_job + job_count):
+                submit_until(job_number)
+                job = futures.pop(job_number)
+                submit_until(-1)
+                try:
+                    rows = job.result()
+                except FileNotFoundError:
+                    rows = self._rescan_moved(jobs[job_number], segments, start, end, sensor_id)
+                yield from rows
+
+        # Scalanie po czasie: plik dołącza do kopca dopiero wtedy, gdy najmniejszy czekający odczyt
+        # nie jest starszy od jego początku - w pamięci są tylko wyniki zadań w locie i aktywnych plików
+        heap = []
+        waiting = deque()
+        first_job = 0
+        for number, (min_time, _, ranges, _) in enumerate(segments):
+            waiting.append((min_time, number, stream(first_job, len(ranges))))
+            first_job += len(ranges)
+
+        try:
+            while heap or waiting:
+                while waiting and (not heap or waiting[0][0] <= heap[0][0]):
+                    _, number, rows = waiting.popleft()
+                    row = next(rows, None)
+                    if row is not None:
+                        heapq.heappush(heap, (row[0], number, row, rows))
+                if not heap:
+                    continue
+
+                _, number, row, rows = heap[0]
+                following = next(rows, None)
+                if following is None:
+                    heapq.heappop(heap)
+                else:
+                    heapq.heapreplace(heap, (following[0], number, following, rows))
+                yield dict(zip(FIELDNAMES, row))
+        finally:
+            for job in futures.values():
+                job.cancel()
+
+    def _plan_scan(self, start: datetime, end: datetime, sensor_id: Optional[str]) -> list:
+        """
+        Wybiera pliki do przeczytania i dzieli je na zakresy bajtów.
+        Zwraca listę [najwcześniejszy możliwy odczyt, ścieżka, zakresy (od, do), czy sortować]
+        posortowaną po pierwszym polu.
+        """
+        segments = []
+        read_segments = set()
+        for directory in (self.log_dir, self.sealed_dir):
+            for file in os.listdir(directory):
+                if file.endswith('.csv'):
+                    path = os.path.join(directory, file)
+                    try:
+                        index = _load_index(path, os.path.getsize(path))
+                    except FileNotFoundError:
+                        continue
+                    self._plan_segment(segments, path, index, start, end, sensor_id)
+                    read_segments.add(file[:-len('.csv')])
+
+        for entry in self.archive.segments():
+            stem, suffix = os.path.splitext(entry['file'])
+            if stem in read_segments or not _index_matches(entry, start, end, sensor_id):
+                continue
+            path = self.archive.path(entry)
+            try:
+                if suffix == SEGMENT_SUFFIX:
+                    self._plan_blocks(segments, path, entry, start, end, sensor_id)
+                else:
+                    self._plan_segment(segments, path, _load_index(path), start, end, sensor_id)
+            except FileNotFoundError:
+                continue
+
+        segments.sort(key=itemgetter(0))
+        return segments
+
+    def _plan_segment(self, segments: list, path: str, index: Optional[dict], start: datetime, end: datetime,
+                      sensor_id: Optional[str]):
+        if index is None:
+            segments.append([-(1 << 63) if isinstance(start, int) else datetime.min, path, [(0, None)], True])
+            return
+        if not _index_matches(index, start, end, sensor_id):
+            return
+
+        # Z zapasem na zaokrąglenie - zbyt wczesny początek tylko wcześniej dołącza plik do scalania
+        min_ts = index['min_ts'] - 0.001
+        min_time = max(start, int(min_ts * 1e9) if isinstance(start, int) else datetime.fromtimestamp(min_ts))
+        first = _seek_offset(index, start)
+        if not index['sorted']:
+            segments.append([min_time, path, [(first, index['size'])], True])
+            return
+
+        # W posortowanym pliku wszystko za punktem kontrolnym, przed którym było już coś późniejszego
+        # niż end, też jest późniejsze - tam kończy się zakres
+        last = index['size']
+        boundaries = []
+        for offset, prefix_max in index['checkpoints']:
+            if prefix_max is not None and prefix_max > _epoch_seconds(end):
+                last = offset
+                break
+            if offset >= first:
+                boundaries.append(offset)
+        if not boundaries or boundaries[0] != first:
+            boundaries.insert(0, first)
+
+        # Archiwum ZIP nie pozwala tanio przeskoczyć do środka, więc czytamy je jednym zadaniem
+        step = max(1, self.read_chunk_rows // self.index_every_rows) if path.endswith('.csv') else len(boundaries)
+        starts = [offset for offset in boundaries[::step] if offset < last] or [first]
+        segments.append([min_time, path, list(zip(starts, starts[1:] + [last])), False])
+
+    def _plan_blocks(self, segments: list, path: str, entry: dict, start, end, sensor_id: Optional[str]):
+        # Zadania to zakresy kolejnych pasujących bloków, po ok. read_chunk_rows wierszy. Nieposortowany
+        # segment (jak nieposortowany plik CSV) jest czytany jednym zadaniem - sortowane są wiersze
+        # całego zadania, więc kilka osobno posortowanych zakresów nie dałoby kolejności po czasie
+        ranges = block_ranges(read_footer(path), _epoch_seconds(start), _epoch_seconds(end), sensor_id,
+                              self.read_chunk_rows if entry['sorted'] else None)
+        if not ranges:
+            return
+        if not entry['sorted']:
+            ranges = [(ranges[0][0], ranges[-1][1])]
+        min_ts = entry['min_ts'] - 0.001
+        min_time = max(start, int(min_ts * 1e9) if isinstance(start, int) else datetime.fromtimestamp(min_ts))
+        segments.append([min_time, path, ranges, not entry['sorted']])
+
+    def _rescan_moved(self, job: tuple, segments: list, start: datetime, end: datetime,
+                      sensor_id: Optional[str]) -> list:
+        """Ponawia zadanie dla pliku, który po zaplanowaniu odczytu został zamknięty lub zarchiwizowany."""
+        path, start_offset, end_offset, sort = job
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if os.path.dirname(path) == self.sealed_dir:
+            candidates = [os.path.join(self.archive_dir, stem + SEGMENT_SUFFIX)]
+        else:
+            # Bieżący plik trafił do sealed/ (a być może już do archiwum) pod nazwą z dopisanym czasem
+            planned = {os.path.splitext(os.path.basename(segment[1]))[0] for segment in segments}
+            candidates = []
+            for directory, suffix in ((self.sealed_dir, '.csv'), (self.archive_dir, SEGMENT_SUFFIX)):
+                names = sorted(file for file in os.listdir(directory)
+                               if file.startswith(stem + '_') and file.endswith(suffix)
+                               and file[:-len(suffix)] not in planned)
+                candidates += [os.path.join(directory, name) for name in names[:1]]
+
+        for candidate in candidates:
+            try:
+                if candidate.endswith(SEGMENT_SUFFIX):
+                    # Zakres bajtów dotyczył pliku CSV - w segmencie odpowiadają mu całe bloki
+                    first, last = source_range(read_footer(candidate), start_offset, end_offset)
+                    return _scan_segment(candidate, first, last, start, end, sensor_id, sort) if last > first else []
+                return _scan_segment(candidate, start_offset, end_offset, start, end, sensor_id, sort)
+            except FileNotFoundError:
+                continue
+        self.log_error(f"Plik {path} zniknął w trakcie odczytu")
+        return []
+
+    def log_info(self, message: str, *args, every: Optional[float] = None):
+        """Komunikat informacyjny (formatowany jak w logging: message % args, dopiero przy wypisaniu)."""
+        self._diagnostics.info(message, *args, every=every)
+
+    def log_error(self, message: str, *args, every: Optional[float] = None):
+        """:param every: Najmniejszy odstęp (w sekundach) między komunikatami z tego miejsca"""
+        self._diagnostics.error(message, *args, every=every)
+
+    def _read_csv(self, file_obj, start, end, sensor_id, from_zip=False, index=None):
+        offset = 0
+        if index is not None:
+            if not _index_matches(index, start, end, sensor_id):
+                return
+            offset = _seek_offset(index, start)
+
+        raw = file_obj if from_zip else open(file_obj, 'rb')
+        if offset:
+            raw.seek(offset)
+
+        with io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+            # Po przeskoczeniu nagłówka nazwy kolumn trzeba podać jawnie
+            reader = csv.DictReader(f, fieldnames=FIELDNAMES) if offset else csv.DictReader(f)
+            stop_after_end = index is not None and index['sorted']
+            as_ns = isinstance(start, int)
             for row in reader:
-                row_time = datetime.fromisoformat(row['timestamp'])
+                row_time = _parse_timestamp(row['timestamp'], as_ns)
+                if row_time > end and stop_after_end:
+                    break
                 if start <= row_time <= end:
                     if sensor_id is None or row['sensor_id'] == sensor_id:
                         yield {
@@ -169,3 +873,29 @@ class Logger:
 
         if 'rotate_after_lines' in config and not isinstance(config['rotate_after_lines'], int):
             raise TypeError("Pole 'rotate_after_lines' (jeśli podane) musi być typu int.")
+
+        codec = config.get('archive_codec', 'zlib')
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Pole 'archive_codec' musi mieć jedną z wartości: {', '.join(ARCHIVE_CODECS)}")
+
+        # Archiwizacja działa w procesie w tle - błędny poziom wyszedłby dopiero przy pierwszej rotacji
+        level = config.get('archive_level')
+        if level is not None:
+            minimum, maximum = ARCHIVE_LEVELS[codec]
+            if isinstance(level, bool) or not isinstance(level, int) or not minimum <= level <= maximum:
+                raise ValueError(f"Pole 'archive_level' dla kodeka {codec} musi być liczbą całkowitą "
+                                 f"z przedziału {minimum}..{maximum}")
+
+        for key in ('archive_executor', 'read_executor'):
+            if config.get(key, 'process') not in EXECUTORS:
+                raise ValueError(f"Pole '{key}' musi mieć jedną z wartości: {', '.join(EXECUTORS)}")
+
+        if config.get('timestamp_format', 'iso') not in TIMESTAMP_FORMATS:
+            raise ValueError(f"Pole 'timestamp_format' musi mieć jedną z wartości: {', '.join(TIMESTAMP_FORMATS)}")
+
+        for key in ('rollup_tiers', 'rollup_retention_days'):
+            if key in config and not isinstance(config[key], dict):
+                raise TypeError(f"Pole '{key}' (jeśli podane) musi być słownikiem {{nazwa poziomu: liczba}}.")
+
+        if config.get('fsync', 'never') not in FSYNC_POLICIES:
+            raise ValueError(f"Pole 'fsync' musi mieć jedną z wartości: {', '.join(FSYNC_POLICIES)}")
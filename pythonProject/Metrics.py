@@ -0,0 +1,204 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence
+
+from Diagnostics import Diagnostics
+
+# Domyślne granice kubełków histogramów czasu (w sekundach)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: Optional[Dict[str, str]], extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in sorted((labels or {}).items())]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _NoOp:
+    """Metryka, gdy pomiary są wyłączone - wszystkie operacje nic nie robią."""
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+_NOOP = _NoOp()
+
+
+class _Counter:
+    def __init__(self, labels: Optional[Dict[str, str]]):
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self, name: str):
+        yield name + _format_labels(self.labels), self.value
+
+
+class _Gauge:
+    def __init__(self, labels: Optional[Dict[str, str]], function: Optional[Callable[[], float]]):
+        self.labels = labels
+        self.function = function
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self, name: str):
+        # Wartość z funkcji jest liczona dopiero przy odczycie metryk - zero kosztu w ścieżce odczytów
+        value = self.function() if self.function is not None else self.value
+        yield name + _format_labels(self.labels), value
+
+
+class _Histogram:
+    def __init__(self, labels: Optional[Dict[str, str]], buckets: Sequence[float]):
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def samples(self, name: str):
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            yield name + "_bucket" + _format_labels(self.labels, f'le="{_format_value(bound)}"'), cumulative
+        yield name + "_sum" + _format_labels(self.labels), total
+        yield name + "_count" + _format_labels(self.labels), count
+
+
+class Metrics:
+    """
+    Rejestr metryk (liczniki, histogramy, wskaźniki) udostępnianych w formacie tekstowym Prometheus.
+
+    Dopóki rejestr jest wyłączony, counter()/histogram()/gauge() zwracają wspólny obiekt,
+    którego metody nic nie robią, więc instrumentacja kosztuje tylko puste wywołanie.
+    Komponenty pobierają metryki w konstruktorze - rejestr trzeba włączyć (enable() lub serve())
+    przed utworzeniem serwera, loggera czy klienta.
+
+    Metryki o tej samej nazwie i etykietach są współdzielone (np. przez kilka loggerów w procesie).
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._http = None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def counter(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None):
+        """Licznik rosnący (inc). Nazwa powinna kończyć się na _total."""
+        return self._get('counter', name, help_text, labels, lambda: _Counter(labels))
+
+    def gauge(self, name: str, help_text: str, function: Optional[Callable[[], float]] = None,
+              labels: Optional[Dict[str, str]] = None):
+        """
+        Wskaźnik (set). Jeśli podano function, wartość jest z niej odczytywana przy każdym pobraniu metryk
+        (ponowna rejestracja zastępuje funkcję).
+        """
+        gauge = self._get('gauge', name, help_text, labels, lambda: _Gauge(labels, function))
+        if function is not None and gauge is not _NOOP:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  labels: Optional[Dict[str, str]] = None):
+        """Histogram obserwowanych wartości (observe), np. czasów w sekundach."""
+        return self._get('histogram', name, help_text, labels, lambda: _Histogram(labels, buckets))
+
+    def render(self) -> str:
+        """Wszystkie metryki w formacie tekstowym Prometheus (wersja 0.0.4)."""
+        lines = []
+        with self._lock:
+            families = [(name, dict(family), dict(family['series'])) for name, family in self._metrics.items()]
+        for name, family, series in sorted(families):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for metric in series.values():
+                try:
+                    for sample, value in metric.samples(name):
+                        lines.append(f"{sample} {_format_value(value)}")
+                except Exception as e:
+                    # Błąd funkcji wskaźnika nie może zepsuć całej odpowiedzi
+                    lines.append(f"# {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        Włącza rejestr i udostępnia metryki pod http://host:port/metrics (wątek w tle).
+        Zwraca serwer HTTP (do zatrzymania przez stop()).
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.enable()
+        self._http = ThreadingHTTPServer((host, port), Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, name="MetricsHTTP", daemon=True).start()
+        Diagnostics("metrics").info("http://%s:%d/metrics", host, self._http.server_address[1])
+        return self._http
+
+    def stop(self) -> None:
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+    def _get(self, kind: str, name: str, help_text: str, labels: Optional[Dict[str, str]], create):
+        if not self.enabled:
+            return _NOOP
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._metrics.setdefault(name, {'type': kind, 'help': help_text, 'series': {}})
+            if family['type'] != kind:
+                raise ValueError(f"Metryka {name} jest już zarejestrowana jako {family['type']}")
+            metric = family['series'].get(key)
+            if metric is None:
+                metric = family['series'][key] = create()
+            return metric
+
+
+# Domyślny rejestr procesu - wyłączony, dopóki nie zostanie wywołane METRICS.enable() lub METRICS.serve()
+METRICS = Metrics()
@@ -1,18 +1,17 @@
 import math
-from datetime import datetime
 import random  # Importujemy cały moduł random
 from Sensor import Sensor
 
 class PressureSensor(Sensor):
-    def __init__(self, sensor_id, name, unit="hPa", min_value=950, max_value=1050, frequency=1):
-        super().__init__(sensor_id, name, unit, min_value, max_value, frequency)
+    def __init__(self, sensor_id, name, unit="hPa", min_value=950, max_value=1050, frequency=1, epoch_ns=False):
+        super().__init__(sensor_id, name, unit, min_value, max_value, frequency, epoch_ns)
         self.unit = unit
 
     def read_value(self):
         if not self.active:
             raise Exception(f"Czujnik {self.name} jest wyłączony.")
 
-        now = datetime.now()
+        now, timestamp = self._clock()
         hour = now.hour
         day_of_year = now.timetuple().tm_yday
 
@@ -27,7 +26,7 @@ class PressureSensor(Sensor):
         for callback in self._callbacks:
             callback(
                 sensor_id=self.sensor_id,
-                timestamp=now,
+                timestamp=timestamp,
                 value=self.last_value,
                 unit=self.unit
             )
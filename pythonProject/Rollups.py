@@ -0,0 +1,288 @@
+import csv
+import io
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from network.Protocol import from_epoch_ns
+
+# Domyślne poziomy agregacji: nazwa -> długość kubełka w sekundach
+ROLLUP_TIERS = {'1m': 60, '1h': 3600}
+ROLLUP_RETENTION_DAYS = {'1m': 31, '1h': 730}
+FIELDNAMES = ['bucket', 'sensor_id', 'count', 'sum', 'min', 'max', 'last', 'last_ts', 'unit']
+
+# Stan kubełka: [liczba, suma, minimum, maksimum, ostatnia wartość, czas ostatniej wartości (ns), jednostka]
+_COUNT, _SUM, _MIN, _MAX, _LAST, _LAST_TS, _UNIT = range(7)
+
+
+def _new_state(timestamp_ns: int, value: float, unit: str) -> list:
+    return [1, value, value, value, value, timestamp_ns, unit]
+
+
+def _merge_state(state: list, other: list) -> None:
+    """Dołącza do stanu kubełka inny stan (kubełki są łączne, więc kolejność nie ma znaczenia)."""
+    state[_COUNT] += other[_COUNT]
+    state[_SUM] += other[_SUM]
+    state[_MIN] = min(state[_MIN], other[_MIN])
+    state[_MAX] = max(state[_MAX], other[_MAX])
+    if other[_LAST_TS] >= state[_LAST_TS]:
+        state[_LAST] = other[_LAST]
+        state[_LAST_TS] = other[_LAST_TS]
+        state[_UNIT] = other[_UNIT]
+
+
+def _partition(bucket_ns: int, size_ns: int) -> str:
+    # Kubełki krótsze niż godzina trafiają do plików dziennych, dłuższe - do miesięcznych (daty UTC)
+    moment = datetime.fromtimestamp(bucket_ns // 10 ** 9, timezone.utc)
+    return moment.strftime('%Y%m%d' if size_ns < 3600 * 10 ** 9 else '%Y%m')
+
+
+class Rollups:
+    """
+    Poziomy zagregowanych odczytów (domyślnie 1 min i 1 h) zapisywane obok surowych logów.
+
+    Każdy poziom trzyma dla każdego czujnika i kubełka czasu liczbę odczytów, sumę, minimum,
+    maksimum i ostatnią wartość. Otwarte kubełki są w pamięci; kubełek jest dopisywany do pliku
+    poziomu (<katalog>/<poziom>/<data>.csv), gdy najnowszy przyjęty odczyt wyprzedzi jego koniec
+    o grace_seconds. Spóźniony odczyt do zapisanego już kubełka otwiera go ponownie i trafia
+    do pliku jako kolejny wiersz - przy odczycie wiersze tego samego kubełka są łączone.
+
+    Kubełki są wyrównane do początku epoki (UTC), więc np. doby w query() zaczynają się o północy UTC.
+    Poziom obejmuje dane dopiero od covered_from() - starsze odczyty (sprzed włączenia Rollups)
+    są tylko w surowych logach. Po awarii procesu w plikach brakuje kubełków, które były jeszcze
+    otwarte - surowe logi je zawierają.
+    """
+
+    def __init__(self, directory: str, tiers: Optional[Dict[str, float]] = None,
+                 retention_days: Optional[Dict[str, int]] = None, grace_seconds: float = 60.0):
+        """
+        :param directory: Katalog na pliki poziomów (tworzony, jeśli nie istnieje)
+        :param tiers: Poziomy agregacji {nazwa: długość kubełka w sekundach}
+        :param retention_days: Jak długo przechowywać pliki poziomu {nazwa: liczba dni}
+        :param grace_seconds: Jak długo po końcu kubełka czekać na spóźnione odczyty przed zapisem
+        """
+        tiers = ROLLUP_TIERS if tiers is None else tiers
+        if not tiers or any(seconds <= 0 for seconds in tiers.values()):
+            raise ValueError("Długości kubełków muszą być dodatnie")
+
+        self.directory = directory
+        # Od najdrobniejszego do najgrubszego poziomu
+        self.tiers = {name: int(seconds * 10 ** 9) for name, seconds in sorted(tiers.items(), key=lambda x: x[1])}
+        self.retention_days = {**ROLLUP_RETENTION_DAYS, **(retention_days or {})}
+        self.grace_ns = int(grace_seconds * 10 ** 9)
+
+        self._open: Dict[str, Dict[tuple, list]] = {name: {} for name in self.tiers}
+        self._oldest: Dict[str, Optional[int]] = {name: None for name in self.tiers}
+        self._watermark_ns = 0
+        self._lock = threading.Lock()
+
+        for name in self.tiers:
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+        # Pierwszy kubełek poziomu (zapisany lub otwarty) - od niego liczy się covered_from()
+        self._first: Dict[str, Optional[int]] = {name: self._first_persisted(name) for name in self.tiers}
+
+    def add(self, sensor_id: str, timestamp_ns: int, value, unit: str) -> None:
+        """Dolicza odczyt do otwartych kubełków wszystkich poziomów."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+
+        with self._lock:
+            if timestamp_ns > self._watermark_ns:
+                self._watermark_ns = timestamp_ns
+            for name, size_ns in self.tiers.items():
+                bucket_ns = timestamp_ns - timestamp_ns % size_ns
+                buckets = self._open[name]
+                state = buckets.get((bucket_ns, sensor_id))
+                if state is None:
+                    buckets[(bucket_ns, sensor_id)] = _new_state(timestamp_ns, value, unit)
+                    oldest = self._oldest[name]
+                    if oldest is None or bucket_ns < oldest:
+                        self._oldest[name] = bucket_ns
+                    if self._first[name] is None:
+                        self._first[name] = bucket_ns
+                    continue
+
+                state[_COUNT] += 1
+                state[_SUM] += value
+                if value < state[_MIN]:
+                    state[_MIN] = value
+                if value > state[_MAX]:
+                    state[_MAX] = value
+                if timestamp_ns >= state[_LAST_TS]:
+                    state[_LAST] = value
+                    state[_LAST_TS] = timestamp_ns
+                    state[_UNIT] = unit
+
+    def flush(self, force: bool = False) -> None:
+        """Dopisuje do plików zamknięte kubełki (przy force=True - wszystkie otwarte)."""
+        with self._lock:
+            for name, size_ns in self.tiers.items():
+                oldest = self._oldest[name]
+                # Najstarszy otwarty kubełek jest jeszcze otwarty - nie ma czego zapisywać
+                if oldest is None or (not force and oldest + size_ns + self.grace_ns > self._watermark_ns):
+                    continue
+
+                buckets = self._open[name]
+                closed = [key for key in buckets
+                          if force or key[0] + size_ns + self.grace_ns <= self._watermark_ns]
+                self._write(name, size_ns, sorted(closed), buckets)
+                for key in closed:
+                    del buckets[key]
+                self._oldest[name] = min((key[0] for key in buckets), default=None)
+
+    def close(self) -> None:
+        self.flush(force=True)
+
+    def clean(self) -> None:
+        """Usuwa pliki poziomów starsze niż ich retention_days (według czasu modyfikacji, jak archiwa logów)."""
+        for name in self.tiers:
+            days = self.retention_days.get(name)
+            if days is None:
+                continue
+            cutoff = datetime.now() - timedelta(days=days)
+            tier_dir = os.path.join(self.directory, name)
+            removed = False
+            for file in os.listdir(tier_dir):
+                path = os.path.join(tier_dir, file)
+                if file.endswith('.csv') and datetime.fromtimestamp(os.path.getmtime(path)) < cutoff:
+                    os.remove(path)
+                    removed = True
+            if removed:
+                with self._lock:
+                    first = self._first_persisted(name)
+                    if first is None:
+                        first = self._oldest[name]
+                    self._first[name] = first
+
+    def covered_from(self, tier: str) -> Optional[int]:
+        """
+        Początek (ns) okresu, za który poziom ma wszystkie odczyty, albo None, jeśli nie ma jeszcze danych.
+        Pierwszy kubełek poziomu może być niepełny (Rollups włączono w jego trakcie), więc jest pomijany.
+        """
+        first = self._first[tier]
+        return None if first is None else first + self.tiers[tier]
+
+    def pick_tier(self, resolution_ns: int) -> Optional[str]:
+        """Najgrubszy poziom, z którego da się złożyć kubełki o długości resolution_ns (None - żaden)."""
+        for name in reversed(list(self.tiers)):
+            if resolution_ns % self.tiers[name] == 0:
+                return name
+        return None
+
+    def query(self, tier: str, start_ns: int, end_ns: int, resolution_ns: int,
+              sensor_id: Optional[str] = None) -> Dict[tuple, list]:
+        """
+        Łączy kubełki poziomu tier z przedziału [start_ns, end_ns] w kubełki o długości resolution_ns.
+        Zwraca {(początek kubełka w ns, czujnik): stan}.
+        """
+        size_ns = self.tiers[tier]
+        first_ns = start_ns - start_ns % size_ns
+        first_partition, last_partition = _partition(first_ns, size_ns), _partition(end_ns, size_ns)
+
+        # Pliki są dopisywane pod blokadą - zapamiętujemy ich rozmiary i czytamy tylko do nich
+        with self._lock:
+            opened = [(key, list(state)) for key, state in self._open[tier].items()
+                      if first_ns <= key[0] <= end_ns and (sensor_id is None or key[1] == sensor_id)]
+            tier_dir = os.path.join(self.directory, tier)
+            files = [(os.path.join(tier_dir, file), os.path.getsize(os.path.join(tier_dir, file)))
+                     for file in sorted(os.listdir(tier_dir))
+                     if file.endswith('.csv') and first_partition <= file[:-len('.csv')] <= last_partition]
+
+        result: Dict[tuple, list] = {}
+        for path, size in files:
+            for key, state in self._read(path, size, first_ns, end_ns, sensor_id):
+                self._merge_into(result, key, state, resolution_ns)
+        for key, state in opened:
+            self._merge_into(result, key, state, resolution_ns)
+        return result
+
+    @staticmethod
+    def aggregate(readings: Iterable[dict], resolution_ns: int,
+                  into: Optional[Dict[tuple, list]] = None) -> Dict[tuple, list]:
+        """
+        Agreguje surowe odczyty (jak z Logger.read_logs, znaczniki czasu w ns) w kubełki resolution_ns.
+
+        :param into: Wynik query()/aggregate() o tej samej resolution_ns, do którego dołączyć odczyty
+        """
+        result: Dict[tuple, list] = {} if into is None else into
+        for reading in readings:
+            timestamp_ns = reading['timestamp']
+            Rollups._merge_into(result, (timestamp_ns, reading['sensor_id']),
+                                _new_state(timestamp_ns, reading['value'], reading['unit']), resolution_ns)
+        return result
+
+    @staticmethod
+    def to_rows(buckets: Dict[tuple, list], as_datetime: bool) -> List[dict]:
+        """Zamienia wynik query()/aggregate() na listę słowników posortowaną po czasie i czujniku."""
+        rows = []
+        for (bucket_ns, sensor_id), state in sorted(buckets.items()):
+            rows.append({
+                'timestamp': from_epoch_ns(bucket_ns) if as_datetime else bucket_ns,
+                'sensor_id': sensor_id,
+                'count': state[_COUNT],
+                'avg': state[_SUM] / state[_COUNT],
+                'min': state[_MIN],
+                'max': state[_MAX],
+                'last': state[_LAST],
+                'unit': state[_UNIT],
+            })
+        return rows
+
+    @staticmethod
+    def _merge_into(result: Dict[tuple, list], key: tuple, state: list, resolution_ns: int) -> None:
+        bucket_ns, sensor_id = key
+        target_key = (bucket_ns - bucket_ns % resolution_ns, sensor_id)
+        target = result.get(target_key)
+        if target is None:
+            result[target_key] = list(state)
+        else:
+            _merge_state(target, state)
+
+    def _first_persisted(self, tier: str) -> Optional[int]:
+        """Najwcześniejszy kubełek w najstarszym pliku poziomu (None - brak plików)."""
+        tier_dir = os.path.join(self.directory, tier)
+        files = sorted(file for file in os.listdir(tier_dir) if file.endswith('.csv'))
+        for file in files:
+            path = os.path.join(tier_dir, file)
+            first = min((key[0] for key, _ in self._read(path, os.path.getsize(path), 0, 2 ** 63 - 1, None)),
+                        default=None)
+            if first is not None:
+                return first
+        return None
+
+    def _write(self, tier: str, size_ns: int, keys: List[tuple], buckets: Dict[tuple, list]) -> None:
+        # Wiersze są grupowane po plikach partycji i dopisywane jednym zapisem na plik
+        partitions: Dict[str, io.StringIO] = {}
+        for key in keys:
+            bucket_ns, sensor_id = key
+            partition = _partition(bucket_ns, size_ns)
+            text = partitions.get(partition)
+            if text is None:
+                text = partitions[partition] = io.StringIO()
+            state = buckets[key]
+            csv.writer(text).writerow([bucket_ns, sensor_id, state[_COUNT], state[_SUM], state[_MIN],
+                                       state[_MAX], state[_LAST], state[_LAST_TS], state[_UNIT]])
+
+        for partition, text in partitions.items():
+            path = os.path.join(self.directory, tier, partition + '.csv')
+            is_new_file = not os.path.exists(path)
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                if is_new_file:
+                    csv.writer(f).writerow(FIELDNAMES)
+                f.write(text.getvalue())
+
+    @staticmethod
+    def _read(path: str, size: int, start_ns: int, end_ns: int, sensor_id: Optional[str]):
+        with open(path, 'rb') as f:
+            data = f.read(size)
+        reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+        next(reader, None)
+        for row in reader:
+            bucket_ns = int(row[0])
+            if bucket_ns < start_ns or bucket_ns > end_ns or (sensor_id is not None and row[1] != sensor_id):
+                continue
+            yield (bucket_ns, row[1]), [int(row[2]), float(row[3]), float(row[4]), float(row[5]),
+                                        float(row[6]), int(row[7]), row[8]]
@@ -1,9 +1,10 @@
 
 import random
 import time
+from datetime import datetime
 
 class Sensor:
-    def __init__(self, sensor_id, name, unit, min_value, max_value, frequency=1):
+    def __init__(self, sensor_id, name, unit, min_value, max_value, frequency=1, epoch_ns=False):
         self.sensor_id = sensor_id
         self.name = name
         self.unit = unit
@@ -14,6 +15,8 @@ class Sensor:
         self.last_value = None
         self.last_read_time = time.time()
         self._callbacks = []
+        # Znacznik czasu w callbackach: datetime albo (gdy epoch_ns) int - nanosekundy od epoki
+        self.epoch_ns = epoch_ns
 
     def register_callback(self, callback):
         self._callbacks.append(callback)
@@ -22,7 +25,8 @@ class Sensor:
         if not self.active:
             raise Exception(f"Czujnik {self.name} jest wyłączony.")
 
-        current_time = time.time()
+        now, timestamp = self._clock()
+        current_time = now.timestamp()
         if current_time - self.last_read_time < self.frequency:
             return self.last_value
 
@@ -31,17 +35,27 @@ class Sensor:
         self.last_read_time = current_time
 
         # Wywołanie zarejestrowanych callbacków
-        from datetime import datetime
         for callback in self._callbacks:
             callback(
                 sensor_id=self.sensor_id,
-                timestamp=datetime.now(),
+                timestamp=timestamp,
                 value=self.last_value,
                 unit=self.unit
             )
 
         return value
 
+    def _clock(self):
+        """
+        Jeden odczyt zegara na odczyt czujnika. Zwraca (datetime do obliczeń zależnych od pory dnia,
+        znacznik czasu przekazywany do callbacków).
+        """
+        if self.epoch_ns:
+            timestamp = time.time_ns()
+            return datetime.fromtimestamp(timestamp / 1e9), timestamp
+        now = datetime.now()
+        return now, now
+
     def calibrate(self, calibration_factor):
         """
         Kalibruje ostatni odczyt przez przemnożenie go przez calibration_factor.
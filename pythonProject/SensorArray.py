@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from network.Protocol import from_epoch_ns, to_epoch_ns
+
+# Domyślne parametry modeli - takie same jak w klasach TemperatureSensor, HumiditySensor itd.
+MODELS = {
+    'temperature': {'unit': "°C", 'min_value': -40, 'max_value': 50},
+    'humidity': {'unit': "%", 'min_value': 0, 'max_value': 100},
+    'light': {'unit': "lux", 'min_value': 0, 'max_value': 25000},
+    'pressure': {'unit': "hPa", 'min_value': 950, 'max_value': 1050},
+}
+
+LIGHT_CONDITIONS = ['sunny', 'cloudy', 'overcast', 'rainy', 'stormy']
+LIGHT_WEIGHTS = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+LIGHT_FACTORS = np.array([1.0, 0.7, 0.4, 0.25, 0.15])
+
+
+class SensorArray:
+    """
+    Grupa czujników jednego typu symulowana wektorowo w NumPy.
+
+    Odpowiada wielu obiektom TemperatureSensor/HumiditySensor/LightSensor/PressureSensor
+    (te same wzory i rozkłady losowe), ale jeden odczyt całej grupy to kilka operacji
+    na tablicach zamiast pętli w Pythonie - pozwala to symulować tysiące czujników na jednym rdzeniu.
+    Czas (godzina, dzień roku) jest wspólny dla wszystkich czujników w danej rundzie odczytów.
+    """
+
+    def __init__(self, kind: str, sensor_ids: Sequence[str], unit: Optional[str] = None,
+                 min_value: Optional[float] = None, max_value: Optional[float] = None,
+                 frequency: float = 1, seed: Optional[int] = None):
+        """
+        :param kind: Typ czujników: "temperature", "humidity", "light" lub "pressure"
+        :param sensor_ids: Identyfikatory czujników w grupie
+        :param unit: Jednostka (domyślnie taka jak w klasie pojedynczego czujnika)
+        :param min_value: Dolne ograniczenie odczytów (domyślnie jak w klasie pojedynczego czujnika)
+        :param max_value: Górne ograniczenie odczytów (domyślnie jak w klasie pojedynczego czujnika)
+        :param frequency: Odstęp między kolejnymi rundami odczytów w read_batch (w sekundach)
+        :param seed: Ziarno generatora liczb losowych (dla powtarzalnych symulacji)
+        """
+        if kind not in MODELS:
+            raise ValueError(f"Nieznany typ czujnika: {kind}")
+
+        model = MODELS[kind]
+        self.kind = kind
+        self.sensor_ids = list(sensor_ids)
+        self.unit = model['unit'] if unit is None else unit
+        self.min_value = model['min_value'] if min_value is None else min_value
+        self.max_value = model['max_value'] if max_value is None else max_value
+        self.frequency = frequency
+        self.noise_level = 0.05
+        self.baseline_indoor = 50
+        self.last_values: Optional[np.ndarray] = None
+        self.last_conditions: Optional[np.ndarray] = None
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def create(cls, kind: str, count: int, prefix: str = "", **kwargs) -> "SensorArray":
+        """Tworzy grupę count czujników o identyfikatorach <prefix><numer>."""
+        prefix = prefix or kind[0].upper()
+        return cls(kind, [f"{prefix}{number}" for number in range(1, count + 1)], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.sensor_ids)
+
+    def read_batch(self, n: int = 1, start: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generuje n kolejnych rund odczytów (co frequency sekund, od start lub od teraz) dla wszystkich czujników.
+
+        :return: (znaczniki czasu [ns od epoki], kształt (n,), wartości, kształt (n, liczba czujników))
+        """
+        start_ns = time.time_ns() if start is None else to_epoch_ns(start)
+        timestamps = start_ns + np.arange(n, dtype=np.int64) * int(self.frequency * 1e9)
+
+        # Składowe czasu liczymy raz na rundę - są wspólne dla wszystkich czujników
+        moments = [from_epoch_ns(timestamp) for timestamp in timestamps.tolist()]
+        hours = np.array([moment.hour for moment in moments], dtype=float)[:, None]
+        minutes = np.array([moment.minute for moment in moments], dtype=float)[:, None]
+        days = np.array([moment.timetuple().tm_yday for moment in moments], dtype=float)[:, None]
+        shape = (n, len(self.sensor_ids))
+
+        if self.kind == 'temperature':
+            values = self._temperature(hours, days, shape)
+        elif self.kind == 'humidity':
+            # Jak w HumiditySensor: każdy czujnik wilgotności ma własny czujnik temperatury
+            temperature = np.clip(self._temperature(hours, days, shape), -40, 50)
+            values = 60 - (temperature - 20) * 1.5 + 20 * np.sin(np.pi * hours / 12)
+        elif self.kind == 'light':
+            values = self._light(hours + minutes / 60.0, shape)
+        else:
+            values = (1013 + 5 * np.sin(2 * np.pi * days / 365) + 2 * np.sin(np.pi * hours / 12)
+                      + self._rng.uniform(-3, 3, shape))
+
+        values = np.clip(values, self.min_value, self.max_value)
+        self.last_values = values[-1] if n else self.last_values
+        return timestamps, values
+
+    def readings(self, n: int = 1, start: Optional[datetime] = None, epoch_ns: bool = False) -> List[dict]:
+        """
+        Jak read_batch, ale zwraca odczyty w formacie wysyłanym przez klienta
+        (lista słowników z sensor_id, timestamp w ISO, value i unit - runda po rundzie).
+
+        :param epoch_ns: Znacznik czasu jako int (nanosekundy od epoki) zamiast tekstu ISO
+        """
+        timestamps, values = self.read_batch(n, start)
+        readings = []
+        for timestamp, row in zip(timestamps.tolist(), values.tolist()):
+            if not epoch_ns:
+                timestamp = from_epoch_ns(timestamp).isoformat()
+            readings.extend(
+                {"sensor_id": sensor_id, "timestamp": timestamp, "value": value, "unit": self.unit}
+                for sensor_id, value in zip(self.sensor_ids, row)
+            )
+        return readings
+
+    def _temperature(self, hours: np.ndarray, days: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+        daily_variation = 10 * np.sin(np.pi * hours / 12)
+        seasonal_variation = 10 * np.sin(2 * np.pi * days / 365)
+        return (15 + seasonal_variation + daily_variation) * self._rng.uniform(0.8, 1.2, shape)
+
+    def _light(self, time_decimal: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+        # Naturalny cykl światła dziennego (maksimum o 6:00), jak w LightSensor
+        cycle_factor = (np.cos(2 * np.pi * (time_decimal - 6) / 24) + 1) / 2
+        base_light = np.broadcast_to(0.1 + (20000 - 0.1) * cycle_factor, shape)
+
+        conditions = self._rng.choice(len(LIGHT_CONDITIONS), size=shape, p=LIGHT_WEIGHTS)
+        self.last_conditions = np.array(LIGHT_CONDITIONS)[conditions[-1]]
+        light_level = base_light * LIGHT_FACTORS[conditions]
+
+        # Szum gaussowski proporcjonalny do sygnału, szum kwantyzacji i flicker (dla jaśniejszego światła)
+        noise = self._rng.normal(0, 1, shape) * (light_level * self.noise_level)
+        quantization_noise = self._rng.normal(0, 1.0, shape)
+        flicker_noise = np.where(light_level > 100, self._rng.normal(0, 1, shape) * (light_level * 0.01), 0)
+        light_level = light_level + noise + quantization_noise + flicker_noise
+
+        return np.maximum(self.baseline_indoor, light_level)
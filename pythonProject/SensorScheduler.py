@@ -0,0 +1,179 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from Diagnostics import Diagnostics
+
+_log = Diagnostics("scheduler")
+
+
+class SensorScheduler:
+    """
+    Odczytuje wiele czujników z jednego wątku, każdy z jego własnym okresem (domyślnie sensor.frequency).
+
+    Terminy kolejnych odczytów leżą w kopcu (heapq), więc obsługa jednego odczytu kosztuje O(log n)
+    niezależnie od liczby czujników. Następny termin jest liczony od poprzedniego terminu, a nie od
+    chwili odczytu, dzięki czemu opóźnienia nie kumulują się (korekta dryfu). Gdy harmonogram spóźni
+    się o cały okres lub więcej, zaległe odczyty są pomijane (metrics()["skipped"]) zamiast
+    nadrabiane seriami.
+
+    Czujnikiem może być dowolny obiekt z metodą read_value() (np. Sensor lub SensorArray z read_batch
+    opakowanym w funkcję). Wyłączone czujniki (active == False) zachowują swoje terminy, ale nie są odczytywane.
+    """
+
+    def __init__(self, on_idle: Optional[Callable[[], None]] = None, late_threshold: float = 0.01,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param on_idle: Wywoływane po obsłużeniu wszystkich zaległych odczytów, przed uśpieniem
+                        (np. do wysłania paczki zebranych odczytów)
+        :param late_threshold: Od jakiego opóźnienia (w sekundach) odczyt jest liczony jako spóźniony
+        :param clock: Zegar monotoniczny (w sekundach)
+        """
+        self.on_idle = on_idle
+        self.late_threshold = late_threshold
+        self.clock = clock
+
+        self._heap: List[list] = []
+        self._entries: Dict[int, list] = {}
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+
+        self.fired = 0
+        self.late = 0
+        self.skipped = 0
+        self.errors = 0
+        self.max_lateness = 0.0
+        self._lateness_total = 0.0
+        self._recent_lateness = deque(maxlen=1024)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, sensor, period: Optional[float] = None, phase: float = 0.0) -> None:
+        """
+        Dodaje czujnik do harmonogramu.
+
+        :param sensor: Obiekt z metodą read_value()
+        :param period: Odstęp między odczytami w sekundach (domyślnie sensor.frequency)
+        :param phase: Przesunięcie pierwszego odczytu względem chwili dodania (w sekundach) -
+                      pozwala rozłożyć odczyty czujników o tym samym okresie w czasie
+        """
+        period = sensor.frequency if period is None else period
+        if period <= 0:
+            raise ValueError("Okres odczytu musi być dodatni")
+
+        self.remove(sensor)
+        # Wpis: [czujnik, okres, czy usunięty]
+        entry = [sensor, period, False]
+        self._entries[id(sensor)] = entry
+        heapq.heappush(self._heap, (self.clock() + phase, next(self._counter), entry))
+
+    def remove(self, sensor) -> None:
+        """Usuwa czujnik z harmonogramu (wpis w kopcu jest pomijany przy najbliższym terminie)."""
+        entry = self._entries.pop(id(sensor), None)
+        if entry is not None:
+            entry[2] = True
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """
+        Wykonuje odczyty w bieżącym wątku, aż minie duration sekund, zostanie wywołane stop()
+        albo harmonogram będzie pusty.
+        """
+        self._stop.clear()
+        end = None if duration is None else self.clock() + duration
+        while not self._stop.is_set():
+            delay = self._delay(self._run_due(), end)
+            if delay is None:
+                break
+            self._stop.wait(delay)
+
+    async def run_async(self, duration: Optional[float] = None) -> None:
+        """Jak run(), ale czeka przez asyncio.sleep - do uruchomienia jako zadanie w pętli asyncio."""
+        import asyncio
+
+        self._stop.clear()
+        end = None if duration is None else self.clock() + duration
+        while not self._stop.is_set():
+            delay = self._delay(self._run_due(), end)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+    def stop(self) -> None:
+        """Przerywa run()/run_async(). Bezpieczne do wywołania z innego wątku i z callbacków."""
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        """Statystyki punktualności: liczba odczytów, spóźnionych i pominiętych oraz opóźnienia w sekundach."""
+        recent = sorted(self._recent_lateness)
+        return {
+            "sensors": len(self._entries),
+            "fired": self.fired,
+            "late": self.late,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_lateness": self._lateness_total / self.fired if self.fired else 0.0,
+            "p99_lateness": recent[min(len(recent) - 1, int(0.99 * len(recent)))] if recent else 0.0,
+            "max_lateness": self.max_lateness,
+        }
+
+    def _delay(self, next_delay: Optional[float], end: Optional[float]) -> Optional[float]:
+        # Czas uśpienia do następnego terminu (None = koniec pracy)
+        if next_delay is None:
+            return None
+        if end is not None:
+            remaining = end - self.clock()
+            if remaining <= 0:
+                return None
+            next_delay = min(next_delay, remaining)
+        if self.on_idle:
+            self.on_idle()
+        return next_delay
+
+    def _run_due(self) -> Optional[float]:
+        """Wykonuje wszystkie zaległe odczyty. Zwraca czas do następnego terminu lub None, gdy harmonogram jest pusty."""
+        heap = self._heap
+        now = self.clock()
+        while heap:
+            deadline, order, entry = heap[0]
+            sensor, period, removed = entry
+            if removed:
+                heapq.heappop(heap)
+                continue
+            if deadline > now:
+                return deadline - now
+            if self._stop.is_set():
+                return 0.0
+
+            self._fire(sensor, now - deadline)
+
+            # Korekta dryfu: następny termin wynika z poprzedniego, a całe zaległe okresy są pomijane
+            now = self.clock()
+            next_deadline = deadline + period
+            if next_deadline <= now:
+                missed = int((now - deadline) // period)
+                self.skipped += missed
+                next_deadline = deadline + (missed + 1) * period
+            heapq.heapreplace(heap, (next_deadline, order, entry))
+        return None
+
+    def _fire(self, sensor, lateness: float) -> None:
+        if not getattr(sensor, "active", True):
+            return
+
+        self.fired += 1
+        self._lateness_total += lateness
+        self._recent_lateness.append(lateness)
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        if lateness > self.late_threshold:
+            self.late += 1
+
+        try:
+            sensor.read_value()
+        except Exception as e:
+            self.errors += 1
+            _log.error("%s: %s", sensor, e, every=1.0)
@@ -1,11 +1,10 @@
 import random
 import math
 from Sensor import Sensor
-from datetime import datetime
 
 class TemperatureSensor(Sensor):
-    def __init__(self, sensor_id, name, unit="°C", min_value=-40, max_value=50, frequency=1):
-        super().__init__(sensor_id, name, unit, min_value, max_value, frequency)
+    def __init__(self, sensor_id, name, unit="°C", min_value=-40, max_value=50, frequency=1, epoch_ns=False):
+        super().__init__(sensor_id, name, unit, min_value, max_value, frequency, epoch_ns)
         self.unit = unit
 
     def read_value(self):
@@ -13,8 +12,9 @@ class TemperatureSensor(Sensor):
             raise Exception(f"Czujnik {self.name} jest wyłączony.")
 
         # Uzyskaj aktualny czas
-        current_hour = datetime.now().hour
-        day_of_year = datetime.now().timetuple().tm_yday
+        now, timestamp = self._clock()
+        current_hour = now.hour
+        day_of_year = now.timetuple().tm_yday
 
         # Logika zmienności temperatury
         daily_variation = 10 * math.sin(math.pi * current_hour / 12)
@@ -34,7 +34,7 @@ class TemperatureSensor(Sensor):
         for callback in self._callbacks:
             callback(
                 sensor_id=self.sensor_id,
-                timestamp=datetime.now(),  # Aktualny timestamp
+                timestamp=timestamp,  # Ten sam odczyt zegara co do obliczeń
                 value=self.last_value,
                 unit=self.unit
             )
@@ -0,0 +1,165 @@
+"""
+Pomiar kosztu wykrywania anomalii (server.Anomaly) w przeliczeniu na jeden odczyt.
+
+Generuje odczyty N czujników (błądzenie losowe z wstrzykniętymi skokami, wartościami spoza zakresu
+i okresami zawieszenia), przeplatane tak jak przy przyjmowaniu przez serwer, i mierzy:
+- każdy detektor osobno i wszystkie razem (AnomalyDetector.update),
+- dodatkowy koszt w ścieżce serwera (Server._handle_reading bez loggera, z anomaly i bez).
+
+Wynik (ns na odczyt, liczba zgłoszonych anomalii, pamięć stanu) jest zapisywany jako JSON.
+
+Użycie (z katalogu pythonProject):
+    python -m benchmarks.anomaly --sensors 10000 --readings 50 --output wynik.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from server.Anomaly import AnomalyDetector, RangeDetector, RateDetector, StuckDetector, ZScoreDetector
+
+INTERVAL_NS = 1_000_000_000
+
+
+def _detectors() -> dict:
+    return {
+        "zscore": [ZScoreDetector()],
+        "rate": [RateDetector(max_rate=5.0)],
+        "stuck": [StuckDetector(min_count=30)],
+        "range": [RangeDetector(minimum=-40.0, maximum=60.0)],
+        "all": [ZScoreDetector(), RateDetector(max_rate=5.0), StuckDetector(min_count=30),
+                RangeDetector(minimum=-40.0, maximum=60.0)],
+    }
+
+
+def generate(sensors: int, readings: int, seed: int) -> list:
+    """Odczyty (sensor_id, timestamp_ns, value) w kolejności napływu: runda po jednym odczycie każdego czujnika."""
+    rng = random.Random(seed)
+    start_ns = time.time_ns() - readings * INTERVAL_NS
+    values = [rng.uniform(0, 30) for _ in range(sensors)]
+    stuck_until = [0] * sensors
+    result = []
+    for step in range(readings):
+        timestamp_ns = start_ns + step * INTERVAL_NS
+        for number in range(sensors):
+            if stuck_until[number] > step:
+                value = values[number]
+            else:
+                values[number] += rng.gauss(0, 0.2)
+                value = values[number]
+                chance = rng.random()
+                if chance < 0.001:
+                    value += rng.choice((-1, 1)) * rng.uniform(10, 30)
+                elif chance < 0.0015:
+                    value = rng.choice((-100.0, 150.0))
+                elif chance < 0.002:
+                    stuck_until[number] = step + 40
+            result.append((f"sensor_{number}", timestamp_ns, value))
+    return result
+
+
+def _measure(readings: list, detectors: list, sensors: int) -> dict:
+    stage = AnomalyDetector(detectors)
+    update = stage.update
+    anomalies = 0
+    started = time.perf_counter_ns()
+    for sensor_id, timestamp_ns, value in readings:
+        events = update(sensor_id, timestamp_ns, value)
+        if events:
+            anomalies += len(events)
+    elapsed = time.perf_counter_ns() - started
+
+    # Pamięć stanu: osobny przebieg po pierwszej rundzie (po jednym odczycie każdego czujnika),
+    # bo tracemalloc spowalnia pomiar czasu
+    stage = AnomalyDetector(detectors)
+    tracemalloc.start()
+    for sensor_id, timestamp_ns, value in readings[:sensors]:
+        stage.update(sensor_id, timestamp_ns, value)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ns_per_reading": elapsed / len(readings),
+        "anomalies": anomalies,
+        "state_bytes_per_sensor": memory / max(1, stage.sensors()),
+    }
+
+
+def _measure_server(readings: list, detectors) -> float:
+    from server.Server import Server
+
+    server = Server(port=0, anomaly=AnomalyDetector(detectors) if detectors is not None else None)
+    server.on_anomaly = lambda event: None
+    messages = [{"sensor_id": sensor_id, "timestamp": timestamp_ns, "value": value, "unit": "C"}
+                for sensor_id, timestamp_ns, value in readings]
+    started = time.perf_counter_ns()
+    for message in messages:
+        server._handle_reading(message)
+    return (time.perf_counter_ns() - started) / len(messages)
+
+
+def run(options: dict) -> dict:
+    """Przeprowadza pomiar i zwraca wyniki jako słownik (ten sam, który trafia do pliku JSON)."""
+    readings = generate(options['sensors'], options['readings'], options['seed'])
+    results = {name: _measure(readings, detectors, options['sensors']) for name, detectors in _detectors().items()}
+
+    if options['server']:
+        sample = readings[:options['server_readings']]
+        # Przebiegi na przemian, minimum z każdego rodzaju - mniej szumu od GC i innych procesów
+        baseline, with_stage = [], []
+        for _ in range(options['repeat']):
+            baseline.append(_measure_server(sample, None))
+            with_stage.append(_measure_server(sample, _detectors()["all"]))
+        baseline, with_stage = min(baseline), min(with_stage)
+        results["server"] = {
+            "ns_per_reading": baseline,
+            "ns_per_reading_with_anomaly": with_stage,
+            "overhead_ns": with_stage - baseline,
+        }
+
+    return {
+        "benchmark": "anomaly",
+        "started": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "options": options,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Koszt wykrywania anomalii (server.Anomaly) na odczyt")
+    parser.add_argument("--sensors", type=int, default=10000, help="Liczba czujników")
+    parser.add_argument("--readings", type=int, default=50, help="Liczba odczytów na czujnik")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-server", dest="server", action="store_false",
+                        help="Bez pomiaru w ścieżce Server._handle_reading")
+    parser.add_argument("--server-readings", type=int, default=200000,
+                        help="Ile odczytów przepuścić przez Server._handle_reading")
+    parser.add_argument("--repeat", type=int, default=3, help="Liczba przebiegów pomiaru w ścieżce serwera")
+    parser.add_argument("--output", default=None, help="Plik wynikowy JSON (domyślnie standardowe wyjście)")
+    args = parser.parse_args(argv)
+
+    report = run(vars(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        for name, result in report['results'].items():
+            if name == "server":
+                print(f"{name}: +{result['overhead_ns']:.0f} ns/odczyt "
+                      f"({result['ns_per_reading']:.0f} -> {result['ns_per_reading_with_anomaly']:.0f})")
+            else:
+                print(f"{name}: {result['ns_per_reading']:.0f} ns/odczyt, anomalie: {result['anomalies']}, "
+                      f"stan: {result['state_bytes_per_sensor']:.0f} B/czujnik")
+        print(f"-> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
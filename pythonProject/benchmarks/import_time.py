@@ -0,0 +1,157 @@
+"""
+Pomiar czasu importu punktów wejścia (python -X importtime) z budżetem.
+
+Każdy moduł (domyślnie client_main, main i main_server) jest importowany w nowym procesie
+interpretera --repeat razy; wynikiem jest mediana łącznego czasu importu modułu (bez startu samego
+interpretera) i moduły, które najbardziej się do niego przyczyniają. Pomiar kończy się kodem 1, gdy:
+- mediana przekracza budżet modułu (--budget modul=ms),
+- moduł importuje (pośrednio) ciężką zależność, której nie potrzebuje przy starcie (numpy, yaml,
+  tkinter, ...) - to sprawdzenie nie zależy od szybkości maszyny.
+
+Użycie (z katalogu pythonProject):
+    python -m benchmarks.import_time --repeat 5 --output wynik.json
+    python -m benchmarks.import_time --budget client_main=80 --budget main_server=150
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budżety w milisekundach - z zapasem na wolniejsze maszyny; import numpy sam przekracza różnicę
+DEFAULT_BUDGETS_MS = {
+    "client_main": 120.0,
+    "main": 120.0,
+    "main_server": 150.0,
+}
+
+# Zależności ładowane dopiero w ścieżkach, które ich potrzebują
+FORBIDDEN = {
+    "client_main": ("numpy", "yaml", "tkinter", "multiprocessing", "asyncio", "lzma", "bz2", "zipfile"),
+    "main": ("numpy", "yaml", "tkinter", "multiprocessing", "asyncio", "lzma", "bz2", "zipfile"),
+    "main_server": ("numpy", "yaml", "tkinter", "multiprocessing", "lzma", "bz2", "zipfile"),
+}
+
+
+def _parse_importtime(stderr: str) -> List[tuple]:
+    """Wiersze "import time: self | cumulative | name" -> [(nazwa, własny us, łączny us, poziom)]."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Po separatorze jedna spacja, potem po dwie na każdy poziom zagnieżdżenia
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(own), int(cumulative), level))
+    return entries
+
+
+def measure(module: str) -> dict:
+    """Jeden import modułu w nowym procesie: łączny czas (ms), wszystkie zaimportowane moduły i największe."""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=PROJECT_DIR, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Import {module} nie powiódł się:\n{process.stderr[-2000:]}")
+
+    entries = _parse_importtime(process.stderr)
+    # Moduł jest wypisywany po swoich zależnościach, więc jego bezpośrednie zależności (poziom 1 -
+    # zagnieżdżone liczą się do nich) to wiersze od poprzedniego modułu najwyższego poziomu
+    total = None
+    children = []
+    for name, _, cumulative, level in entries:
+        if level == 0:
+            if name == module:
+                total = cumulative
+                break
+            children = []
+        elif level == 1:
+            children.append((name, cumulative))
+    if total is None:
+        raise RuntimeError(f"Brak {module} w wyniku -X importtime")
+    children.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "total_ms": total / 1000,
+        "modules": {name for name, _, _, _ in entries},
+        "top": [(name, cumulative / 1000) for name, cumulative in children],
+    }
+
+
+def run(options: dict) -> dict:
+    """Przeprowadza pomiar i zwraca wyniki jako słownik (ten sam, który trafia do pliku JSON)."""
+    results = {}
+    for module in options['modules']:
+        samples = [measure(module) for _ in range(options['repeat'])]
+        median = statistics.median(sample['total_ms'] for sample in samples)
+        imported = {name.split(".")[0] for sample in samples for name in sample['modules']}
+        budget = options['budgets'].get(module)
+        results[module] = {
+            "median_ms": median,
+            "min_ms": min(sample['total_ms'] for sample in samples),
+            "max_ms": max(sample['total_ms'] for sample in samples),
+            "budget_ms": budget,
+            "over_budget": budget is not None and median > budget,
+            "forbidden_imports": sorted(imported.intersection(FORBIDDEN.get(module, ()))),
+            "top": samples[-1]['top'][:options['top']],
+        }
+
+    return {
+        "benchmark": "import_time",
+        "started": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "options": options,
+        "results": results,
+        "passed": not any(result["over_budget"] or result["forbidden_imports"] for result in results.values()),
+    }
+
+
+def _parse_budgets(parser: argparse.ArgumentParser, values: List[str]) -> Dict[str, float]:
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for value in values:
+        module, _, milliseconds = value.partition("=")
+        try:
+            budgets[module] = float(milliseconds)
+        except ValueError:
+            parser.error(f"--budget w postaci modul=ms: {value}")
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Czas importu punktów wejścia (-X importtime) z budżetem")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_BUDGETS_MS), help="Moduły do zmierzenia")
+    parser.add_argument("--repeat", type=int, default=5, help="Liczba importów każdego modułu")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODUL=MS",
+                        help="Budżet czasu importu modułu w milisekundach (można podać wielokrotnie)")
+    parser.add_argument("--top", type=int, default=8, help="Ile największych zależności pokazać")
+    parser.add_argument("--output", default=None, help="Plik wynikowy JSON (domyślnie standardowe wyjście)")
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    options['budgets'] = _parse_budgets(parser, options.pop('budget'))
+    report = run(options)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        for module, result in report['results'].items():
+            status = "PRZEKROCZONY BUDŻET" if result['over_budget'] else "ok"
+            print(f"{module}: {result['median_ms']:.1f} ms (budżet {result['budget_ms']} ms) - {status}")
+            if result['forbidden_imports']:
+                print(f"  niepotrzebne przy starcie: {', '.join(result['forbidden_imports'])}")
+            print("  " + ", ".join(f"{name} {milliseconds:.1f}" for name, milliseconds in result['top']))
+        print(f"-> {args.output}")
+    else:
+        print(text)
+
+    if not report['passed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Generator obciążenia i pomiar przepustowości/opóźnień serwera z loggerem.
+
+Uruchamia N procesów klientów, z których każdy symuluje M czujników (SensorArray)
+i wysyła ich odczyty z zadaną częstotliwością do lokalnego serwera (server.Server + Logger)
+lub do serwera pod wskazanym adresem. Wynik (przepustowość, histogram czasu potwierdzeń,
+liczba zgubionych odczytów i błędów, opóźnienie zapisu loggera) jest zapisywany jako JSON.
+
+Użycie (z katalogu pythonProject):
+    python -m benchmarks.loadgen --clients 4 --sensors 1000 --rate 20000 --duration 10 --output wynik.json
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+SENSOR_KINDS = ('temperature', 'humidity', 'light', 'pressure')
+
+
+class _ErrorCounter:
+    """Zastępuje logger klienta - zlicza błędy zamiast je wypisywać."""
+
+    def __init__(self):
+        self.errors = 0
+        self.last_error = None
+
+    def log_info(self, message: str):
+        pass
+
+    def log_error(self, message: str):
+        self.errors += 1
+        self.last_error = message
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _histogram(values: List[float]) -> dict:
+    """Podsumowanie rozkładu: p50/p90/p99/max oraz kubełki o granicach rosnących dwukrotnie (w ms)."""
+    buckets = {}
+    for value in values:
+        bound = 0.125
+        while value > bound:
+            bound *= 2
+        buckets[bound] = buckets.get(bound, 0) + 1
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else None,
+        "p50": _percentile(values, 0.50),
+        "p90": _percentile(values, 0.90),
+        "p99": _percentile(values, 0.99),
+        "max": max(values) if values else None,
+        "buckets_ms": {f"<={bound:g}": count for bound, count in sorted(buckets.items())}
+    }
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _run_client(number: int, options: dict, start_at: float, results) -> None:
+    """Proces jednego klienta: wysyła odczyty swoich czujników przez options['duration'] sekund."""
+    from SensorArray import SensorArray
+    from network.Client import Client
+
+    errors = _ErrorCounter()
+    client = Client(options['host'], options['port'], logger=errors, batch_size=options['batch_size'],
+                    window=options['window'], protocol=options['protocol'])
+    rtts = []
+    acked = [0]
+
+    def on_ack(count, rtt):
+        acked[0] += count
+        rtts.append(rtt * 1000)
+
+    client.on_ack = on_ack
+
+    # Czujniki klienta dzielimy po równo między typy
+    sensors = options['sensors']
+    groups = []
+    for index, kind in enumerate(SENSOR_KINDS):
+        count = sensors // len(SENSOR_KINDS) + (1 if index < sensors % len(SENSOR_KINDS) else 0)
+        if count:
+            groups.append(SensorArray(kind, [f"C{number}_{kind[0].upper()}{i}" for i in range(count)],
+                                      seed=number * 10 + index))
+
+    # Jedna runda to jeden odczyt każdego czujnika; rate to odczyty na sekundę dla całego klienta
+    interval = sensors / options['rate'] if options['rate'] else 0.0
+    sent = 0
+    late_rounds = 0
+    max_lateness = 0.0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    deadline = started + options['duration']
+    next_round = started
+
+    while True:
+        now = time.perf_counter()
+        if now >= deadline or client.is_connection_failed():
+            break
+        if now < next_round:
+            # Czekając na kolejną rundę odbieramy potwierdzenia, żeby RTT nie obejmował czasu uśpienia
+            client.poll(next_round - now)
+        elif interval and now - next_round > interval:
+            late_rounds += 1
+            max_lateness = max(max_lateness, now - next_round)
+
+        batch = []
+        for group in groups:
+            batch.extend(group.readings(epoch_ns=options['epoch_ns']))
+        if not client.send_many(batch):
+            break
+        sent += len(batch)
+        next_round += interval
+
+    client.flush()
+    elapsed = time.perf_counter() - started
+    client.close()
+
+    results.put({
+        "client": number,
+        "sent": sent,
+        "acked": acked[0],
+        "elapsed": elapsed,
+        "errors": errors.errors,
+        "last_error": errors.last_error,
+        "connection_failed": client.is_connection_failed(),
+        "late_rounds": late_rounds,
+        "max_lateness_s": max_lateness,
+        "rtt_ms": rtts
+    })
+
+
+class _LocalServer:
+    """Serwer z loggerem uruchomiony w wątku tego procesu na czas pomiaru."""
+
+    def __init__(self, options: dict):
+        from Logger import Logger
+        from server.Server import Server
+
+        self.log_dir = tempfile.mkdtemp(prefix="loadgen_")
+        config = {
+            "log_dir": self.log_dir,
+            "filename_pattern": "sensors_%Y%m%d.csv",
+            "buffer_size": options['log_buffer'],
+            "rotate_every_hours": 24,
+            "max_size_mb": 50,
+            "retention_days": 1,
+            "async_write": options['log_async'],
+            "fsync": options['fsync'],
+            "timestamp_format": "epoch_ns" if options['epoch_ns'] else "iso",
+            "rollups": True
+        }
+        config_path = os.path.join(self.log_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+
+        self.logger = Logger(config_path) if options['logger'] else None
+        self.server = Server(port=options['port'], logger=self.logger, mode=options['server_mode'],
+                             epoch_ns=options['epoch_ns'])
+        self.received = 0
+        self.server.on_new_reading = self._count
+        self.flush_lags = []
+        self.queue_depths = []
+        self._thread = threading.Thread(target=self.server.start, name="LoadgenServer", daemon=True)
+        self._sampler = threading.Thread(target=self._sample, name="LoadgenSampler", daemon=True)
+        self._stopped = threading.Event()
+
+    def start(self, port: int):
+        if self.logger:
+            self.logger.start()
+        self._thread.start()
+        self._sampler.start()
+        # Czekamy, aż serwer zacznie nasłuchiwać
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("Serwer nie zaczął nasłuchiwać")
+
+    def stop(self) -> dict:
+        self.server.stop()
+        self._thread.join(timeout=10)
+        self._stopped.set()
+        self._sampler.join()
+        result = {"received": self.received}
+        if self.logger:
+            self.logger.stop()
+            result.update({
+                "logger_dropped": self.logger.dropped,
+                "logger_flush_lag_ms": _histogram([lag * 1000 for lag in self.flush_lags]),
+                "logger_queue_depth_max": max(self.queue_depths, default=0)
+            })
+        return result
+
+    def _count(self, reading: dict):
+        self.received += 1
+
+    def _sample(self):
+        while not self._stopped.wait(0.1):
+            if self.logger:
+                self.flush_lags.append(self.logger.last_flush_lag)
+                self.queue_depths.append(self.logger.queue_depth())
+
+
+def run(options: dict) -> dict:
+    """Przeprowadza pomiar i zwraca wyniki jako słownik (ten sam, który trafia do pliku JSON)."""
+    local = None
+    if options['host'] is None:
+        options['host'] = '127.0.0.1'
+        options['port'] = options['port'] or _free_port()
+        local = _LocalServer(options)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    start_at = time.time() + 1.0 + 0.1 * options['clients']
+    processes = [context.Process(target=_run_client, args=(number, options, start_at, results), daemon=True)
+                 for number in range(options['clients'])]
+
+    # Serwer wypisuje każdy odczyt - na czas pomiaru jego wyjście jest wyciszane
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if local else sys.stdout):
+        if local:
+            local.start(options['port'])
+        for process in processes:
+            process.start()
+        clients = [results.get(timeout=options['duration'] + 60) for _ in processes]
+        for process in processes:
+            process.join()
+        server_result = local.stop() if local else {}
+
+    sent = sum(client['sent'] for client in clients)
+    acked = sum(client['acked'] for client in clients)
+    elapsed = max(client['elapsed'] for client in clients)
+    rtts = [rtt for client in clients for rtt in client['rtt_ms']]
+
+    summary = {
+        "target_rate": options['rate'] * options['clients'],
+        "sent": sent,
+        "acked": acked,
+        "unacked": sent - acked,
+        "throughput": acked / elapsed if elapsed else 0.0,
+        "elapsed_s": elapsed,
+        "client_errors": sum(client['errors'] for client in clients),
+        "failed_clients": sum(client['connection_failed'] for client in clients),
+        "late_rounds": sum(client['late_rounds'] for client in clients),
+        "max_lateness_s": max(client['max_lateness_s'] for client in clients),
+        "ack_rtt_ms": _histogram(rtts),
+    }
+    if local:
+        summary["dropped"] = sent - server_result["received"] + server_result.get("logger_dropped", 0)
+        summary["server"] = server_result
+
+    return {
+        "benchmark": "loadgen",
+        "started": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "options": options,
+        "results": summary,
+        "clients": [{key: value for key, value in client.items() if key != 'rtt_ms'} for client in clients]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator obciążenia dla server.Server + Logger")
+    parser.add_argument("--clients", type=int, default=2, help="Liczba procesów klientów")
+    parser.add_argument("--sensors", type=int, default=100, help="Liczba czujników na klienta")
+    parser.add_argument("--rate", type=float, default=1000,
+                        help="Docelowa liczba odczytów na sekundę na klienta (0 = bez ograniczenia)")
+    parser.add_argument("--duration", type=float, default=10, help="Czas pomiaru w sekundach")
+    parser.add_argument("--protocol", choices=("json", "binary"), default="json")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--window", type=int, default=8, help="Maksymalna liczba paczek w locie")
+    parser.add_argument("--host", default=None, help="Adres istniejącego serwera (domyślnie serwer lokalny)")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--server-mode", choices=("async", "blocking"), default="async")
+    parser.add_argument("--no-logger", dest="logger", action="store_false", help="Serwer lokalny bez loggera")
+    parser.add_argument("--log-async", action="store_true", help="Logger z wątkiem zapisującym")
+    parser.add_argument("--log-buffer", type=int, default=200)
+    parser.add_argument("--fsync", choices=("never", "interval", "always"), default="never")
+    parser.add_argument("--epoch-ns", action="store_true",
+                        help="Znaczniki czasu jako nanosekundy od epoki (czujniki, protokół, serwer i logger)")
+    parser.add_argument("--output", default=None, help="Plik wynikowy JSON (domyślnie standardowe wyjście)")
+    args = parser.parse_args(argv)
+
+    if args.host is not None and not args.port:
+        parser.error("--port jest wymagany razem z --host")
+
+    report = run(vars(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        results = report['results']
+        rtt = results['ack_rtt_ms']
+        print(f"Przepustowość: {results['throughput']:.0f} odczytów/s, "
+              f"RTT p50/p99/max: {'/'.join(f'{rtt[key] or 0:.1f}' for key in ('p50', 'p99', 'max'))} ms, "
+              f"niepotwierdzone: {results['unacked']} -> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
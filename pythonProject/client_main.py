@@ -4,15 +4,16 @@ from HumiditySensor import HumiditySensor
 from LightSensor import LightSensor
 from PressureSensor import PressureSensor
 from network.Client import Client
-from datetime import datetime
-import time
+from SensorScheduler import SensorScheduler
+from EventBus import EventBus
 
 
 def main():
     logger = Logger("config.json")
     logger.start()
 
-    client = Client("localhost", 5000, logger=logger)
+    # Odczyty z czasu niedostępności serwera czekają w katalogu "spool" i są wysyłane po jego powrocie
+    client = Client("localhost", 5000, logger=logger, spool_dir="spool")
 
     sensors = [
         TemperatureSensor("T1", "Temp Sensor", "°C"),
@@ -21,40 +22,45 @@ def main():
         PressureSensor("P1", "Pressure Sensor", "hPa")
     ]
 
-    try:
-        for iteration in range(10):
-            for sensor in sensors:
-                # Sprawdź czy połączenie nie zostało przerwane
-                if client.is_connection_failed():
-                    print("Przerywanie działania - połączenie z serwerem niemożliwe")
-                    logger.log_error("Przerywanie działania - połączenie z serwerem niemożliwe")
-                    return
+    def log_batch(readings):
+        for reading in readings:
+            logger.log_reading(**reading)
+
+    def send_batch(readings):
+        # Wysłanie paczki odczytów przez trwałe połączenie
+        success = client.send_many(
+            {**reading, "timestamp": reading["timestamp"].isoformat()} for reading in readings
+        ) and client.flush()
+        if not success and client.is_connection_failed():
+            print("Przerywanie działania - nie udało się nawiązać połączenia po 3 próbach")
+            logger.log_error("Przerywanie działania - nie udało się nawiązać połączenia po 3 próbach")
+            scheduler.stop()
 
-                value = sensor.read_value()
-                reading = {
-                    "timestamp": datetime.now(),
-                    "sensor_id": sensor.sensor_id,
-                    "value": value,
-                    "unit": sensor.unit
-                }
-                logger.log_reading(**reading)
+    # Logger i klient sieciowy odbierają odczyty z szyny niezależnie od siebie i od odczytów czujników.
+    # Logger nie powinien gubić odczytów, a do serwera lepiej wysłać najnowsze niż zaległe.
+    bus = EventBus()
+    bus.subscribe("logger", log_batch, policy="block")
+    bus.subscribe("network", send_batch, policy="drop_oldest")
 
-                reading_to_send = reading.copy()
-                reading_to_send["timestamp"] = reading_to_send["timestamp"].isoformat()
+    # Każdy czujnik jest odczytywany co swoje sensor.frequency sekund
+    scheduler = SensorScheduler()
+    for sensor in sensors:
+        sensor.register_callback(bus.publish)
+        scheduler.add(sensor)
 
-                # Próba wysłania danych
-                success = client.send(reading_to_send)
-                if not success and client.is_connection_failed():
-                    print("Przerywanie działania - nie udało się nawiązać połączenia po 3 próbach")
-                    logger.log_error("Przerywanie działania - nie udało się nawiązać połączenia po 3 próbach")
-                    return
+    try:
+        scheduler.run(duration=10)
 
-            time.sleep(1)
+        metrics = scheduler.metrics()
+        if metrics["late"]:
+            logger.log_info(f"Spóźnione odczyty: {metrics['late']}, "
+                            f"maksymalne opóźnienie: {metrics['max_lateness']:.3f} s")
 
     except KeyboardInterrupt:
         print("Przerwano przez użytkownika")
         logger.log_info("Przerwano przez użytkownika")
     finally:
+        bus.stop()
         client.close()
         logger.stop()
         print("Zakończono działanie klienta.")
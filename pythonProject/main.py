@@ -4,9 +4,8 @@ from HumiditySensor import HumiditySensor
 from LightSensor import LightSensor
 from PressureSensor import PressureSensor
 from network.Client import Client
-
-from datetime import datetime
-import time
+from SensorScheduler import SensorScheduler
+from EventBus import EventBus
 
 def main():
     # Inicjalizacja loggera (opcjonalnie)
@@ -16,16 +15,17 @@ def main():
     # Inicjalizacja klienta
     client = Client(host="127.0.0.1", port=9999, logger=logger)
 
-    # Funkcja do wysyłania odczytu do serwera
-    def send_to_server(sensor_id, timestamp, value, unit):
-        success = client.send({
-            "sensor_id": sensor_id,
-            "timestamp": timestamp.isoformat(),
-            "value": value,
-            "unit": unit
-        })
+    # Funkcja do wysyłania paczki odczytów do serwera (w wątku subskrybenta szyny zdarzeń)
+    def send_to_server(readings):
+        success = client.send_many(
+            {**reading, "timestamp": reading["timestamp"].isoformat()} for reading in readings
+        ) and client.flush()
         if not success and logger:
-            logger.log_error(f"Błąd wysyłania danych z czujnika {sensor_id}")
+            logger.log_error(f"Błąd wysyłania {len(readings)} odczytów")
+
+    # Czujniki publikują odczyty na szynie - wysyłanie nie blokuje odczytów
+    bus = EventBus()
+    bus.subscribe("network", send_to_server, policy="drop_oldest")
 
     # Tworzenie czujników
     temp_sensor = TemperatureSensor(sensor_id="T1", name="Temp Sensor", unit="°C")
@@ -33,21 +33,22 @@ def main():
     light_sensor = LightSensor(sensor_id="L1", name="Light Sensor", unit="lux")
     pressure_sensor = PressureSensor(sensor_id="P1", name="Pressure Sensor", unit="hPa")
 
-    # Rejestracja wysyłania do serwera
-    temp_sensor.register_callback(send_to_server)
-    hum_sensor.register_callback(send_to_server)
-    light_sensor.register_callback(send_to_server)
-    pressure_sensor.register_callback(send_to_server)
+    # Rejestracja publikowania odczytów
+    temp_sensor.register_callback(bus.publish)
+    hum_sensor.register_callback(bus.publish)
+    light_sensor.register_callback(bus.publish)
+    pressure_sensor.register_callback(bus.publish)
+
+    # Każdy czujnik jest odczytywany co swoje sensor.frequency sekund
+    scheduler = SensorScheduler()
+    for sensor in (temp_sensor, hum_sensor, light_sensor, pressure_sensor):
+        scheduler.add(sensor)
 
     try:
-        for _ in range(10):
-            temp_sensor.read_value()
-            hum_sensor.read_value()
-            light_sensor.read_value()
-            pressure_sensor.read_value()
-            time.sleep(1)
+        scheduler.run(duration=10)
 
     finally:
+        bus.stop()
         client.close()
         logger.stop()
         print("Zakończono wysyłanie danych.")
@@ -1,11 +1,52 @@
+import argparse
+
+from Diagnostics import configure
+from Metrics import METRICS
+from server.Anomaly import AnomalyDetector
 from server.Server import Server
 from Logger import Logger
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serwer TCP odczytów czujników")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Liczba procesów roboczych na wspólnym porcie (SO_REUSEPORT), każdy z własnym loggerem")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Port HTTP z metrykami w formacie Prometheus (/metrics); domyślnie wyłączone. "
+                             "Przy --workers > 1 tylko metryki procesu nadrzędnego")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Poziom komunikatów diagnostycznych (DEBUG wypisuje każdy odczyt)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Limit odczytów czekających na zapis w loggerze (kontrola przyjmowania; "
+                             "włącza zapis asynchroniczny loggera)")
+    parser.add_argument("--shed-policy", default="reject", choices=["reject", "drop_oldest", "sample"],
+                        help="Co robić po przekroczeniu --max-pending")
+    parser.add_argument("--anomaly", action="store_true",
+                        help="Wykrywanie skoków i zawieszonych wartości w odczytach (komunikaty WARNING)")
+    args = parser.parse_args(argv)
+    options = {"max_pending": args.max_pending, "shed_policy": args.shed_policy,
+               "anomaly": AnomalyDetector() if args.anomaly else None}
+    configure(args.log_level)
+
+    if args.metrics_port is not None:
+        # Przed utworzeniem serwera i loggera - pobierają metryki w konstruktorach
+        METRICS.serve(args.metrics_port)
+
+    if args.workers > 1:
+        # Każdy proces roboczy loguje do logs/worker<numer>, a statystyki są scalane w tym procesie
+        from server.ShardedServer import ShardedServer
+
+        ShardedServer(port=5000, workers=args.workers, config_path="config.json", **options).start()
+        return
+
     logger = Logger("config.json")
+    # Ten sam plik konfiguracji czyta klient - poziomy Rollups (dla QUERY) włącza tylko serwer
+    logger.rollups_enabled = True
+    if args.max_pending:
+        # Kontrola przyjmowania mierzy kolejkę wątku zapisującego
+        logger.async_write = True
     logger.start()
 
-    server = Server(port=5000, logger=logger)
+    server = Server(port=5000, logger=logger, **options)
     try:
         server.start()
     finally:
@@ -1,76 +1,245 @@
 import socket
 import json
+import random
+import select
 import time
-from typing import Optional
+import weakref
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from Diagnostics import Diagnostics
+from Metrics import METRICS
+from network.Protocol import (
+    END, FRAME_ACK, FRAME_ERROR, FRAME_RETRY, HELLO, HELLO_OK, QUERY_ERROR, ROWS, FrameBuffer, QueryRequest,
+    ReadingEncoder, decode_counter, to_epoch_ns
+)
+from network.Spool import Spool
+
+_log = Diagnostics("client")
+
+# Klienci procesu, których stan pokazują wspólne wskaźniki client_* (zamknięte i usunięte wypadają)
+_clients = weakref.WeakSet()
+
+
+def _inflight_batches() -> int:
+    return sum(len(client._inflight) for client in list(_clients))
+
+
+def _spooled_readings() -> int:
+    return sum(client.spooled() for client in list(_clients))
 
 
 class Client:
-    def __init__(self, host: str, port: int, timeout: float = 5.0, retries: int = 3, logger=None):
+    def __init__(self, host: str, port: int, timeout: float = 5.0, retries: int = 3, logger=None,
+                 batch_size: int = 100, window: int = 8, backoff_base: float = 0.1, backoff_max: float = 5.0,
+                 protocol: str = "json", spool_dir: Optional[str] = None, spool_max_bytes: int = 256 * 1024 * 1024,
+                 spool_policy: str = "drop_oldest", replay_rate: float = 1000.0, replay_batch: int = 1000,
+                 retry_interval: float = 5.0):
         """
         Inicjalizuje klienta sieciowego do przesyłania danych do serwera TCP.
 
+        Klient utrzymuje jedno trwałe połączenie i wysyła odczyty paczkami (tablica JSON
+        zakończona znakiem nowej linii). Serwer potwierdza je zbiorczo odpowiedzią "ACK <n>",
+        gdzie n to łączna liczba odczytów przyjętych w danym połączeniu.
+
+        Przeciążony serwer dołącza wskazówkę "RETRY <ms>": klient wstrzymuje wtedy wysyłanie
+        na ms milisekund i zmniejsza o połowę liczbę paczek w locie (po kolejnych potwierdzeniach
+        bez wskazówki wraca ona stopniowo do window). Paczka odrzucona z wskazówką
+        ("ERR <n> RETRY <ms>") wraca do kolejki i jest wysyłana ponownie.
+
         :param host: Adres IP lub nazwa hosta serwera
         :param port: Port TCP serwera
-        :param timeout: Maksymalny czas oczekiwania na połączenie (w sekundach)
-        :param retries: Liczba prób ponowienia połączenia przy błędzie
+        :param timeout: Maksymalny czas oczekiwania na połączenie i potwierdzenie (w sekundach)
+        :param retries: Liczba kolejnych nieudanych prób połączenia, po której klient się poddaje
         :param logger: Obiekt loggera do logowania zdarzeń (opcjonalny)
+        :param batch_size: Maksymalna liczba odczytów w jednej paczce
+        :param window: Maksymalna liczba niepotwierdzonych paczek w locie
+        :param backoff_base: Początkowe opóźnienie przed ponownym połączeniem (w sekundach)
+        :param backoff_max: Górny limit opóźnienia przed ponownym połączeniem (w sekundach)
+        :param protocol: "json" (tekstowy) lub "binary" (network.Protocol, negocjowany przy połączeniu;
+                         gdy serwer go nie obsługuje, klient wraca do JSON)
+        :param spool_dir: Katalog trwałego bufora (network.Spool). Jeśli podany, po wyczerpaniu prób połączenia
+                          klient nie poddaje się, tylko zapisuje odczyty na dysk, co retry_interval sekund
+                          próbuje połączyć się ponownie, a po powrocie serwera odtwarza zaległe odczyty
+        :param spool_max_bytes: Maksymalny rozmiar bufora na dysku
+        :param spool_policy: Co robić po jego przekroczeniu: "drop_oldest" lub "drop_newest"
+        :param replay_rate: Maksymalna liczba odtwarzanych odczytów na sekundę (obok bieżących)
+        :param replay_batch: Maksymalna liczba odczytów w jednej paczce odtwarzania
+        :param retry_interval: Odstęp między próbami połączenia w trybie offline (w sekundach)
         """
+        if protocol not in ("json", "binary"):
+            raise ValueError(f"Nieznany protokół: {protocol}")
+
         self.host = host
         self.port = port
         self.timeout = timeout
         self.retries = retries
         self.logger = logger
+        self.batch_size = batch_size
+        self.window = window
+        self._window_limit = window  # Bieżący limit paczek w locie (zmniejszany przy wskazówkach RETRY)
+        self._resume_at = 0.0  # Do kiedy wstrzymać wysyłanie (wskazówka RETRY od serwera)
+        self._retry_hint = 0  # Wskazówka z ramki RETRY protokołu binarnego dla następnego potwierdzenia
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.protocol = protocol
         self.connection_failed = False  # Flaga informująca o niepowodzeniu połączenia
 
+        # Wywoływane po każdym potwierdzeniu: (liczba potwierdzonych odczytów, czas od wysłania w sekundach)
+        self.on_ack: Optional[Callable[[int, float], None]] = None
+
+        self._sock: Optional[socket.socket] = None
+        self._binary = False  # Czy w bieżącym połączeniu wynegocjowano protokół binarny
+        self._encoder = ReadingEncoder()
+        self._recv_buffer = FrameBuffer(4096)
+        self._pending: List[dict] = []
+        # Paczki w locie: [numer ostatniego odczytu w połączeniu, odczyty, czas wysłania,
+        #                  znacznik spoolu (None dla bieżących odczytów)]
+        self._inflight = deque()
+        self._sent = 0
+
+        self.replay_rate = replay_rate
+        self.replay_batch = replay_batch
+        self.retry_interval = retry_interval
+        self._spool = Spool(spool_dir, max_bytes=spool_max_bytes, policy=spool_policy) if spool_dir else None
+        self._offline = False  # Serwer niedostępny - odczyty trafiają do spoolu
+        self._next_attempt = 0.0
+        self._replay_tokens = float(replay_batch)
+        self._replay_time = time.monotonic()
+
+        self._connected_once = False
+        self._metric_reconnects = METRICS.counter("client_reconnects_total",
+                                                  "Ponowne połączenia klienta z serwerem (bez pierwszego)")
+        self._metric_connect_errors = METRICS.counter("client_connect_errors_total", "Nieudane próby połączenia")
+        # Wskaźniki są wspólne dla procesu (suma po otwartych klientach) i nie trzymają referencji do klienta
+        METRICS.gauge("client_inflight_batches", "Paczki czekające na potwierdzenie", _inflight_batches)
+        METRICS.gauge("client_spooled_readings", "Odczyty czekające w spoolu", _spooled_readings)
+        _clients.add(self)
+
     def connect(self) -> None:
         """
-        Metoda zachowana dla zgodności ze specyfikacją – połączenie tworzone jest przy każdym send().
+        Nawiązuje połączenie z serwerem (z ponowieniami i wykładniczym opóźnieniem).
+        Wywoływane automatycznie przy pierwszym wysłaniu danych.
         """
-        pass
+        if self._sock is None:
+            self._reconnect()
 
     def send(self, data: dict) -> bool:
         """
-        Wysyła dane do serwera w formacie JSON, czeka na potwierdzenie ACK.
+        Wysyła pojedynczy odczyt do serwera i czeka na potwierdzenie ACK.
 
         :param data: Słownik danych do wysłania
         :return: True jeśli wysłano i odebrano ACK, False w przeciwnym razie
         """
         if self.connection_failed:
-            if self.logger:
-                self.logger.log_error("Połączenie zostało przerwane po wyczerpaniu prób")
+            return self._report_failed()
+        self._pending.append(data)
+        if not self.flush():
             return False
+        _log.debug("Wysłano dane i otrzymano ACK: %s", data)
+        return True
 
-        message = self._serialize(data) + b"\n"
+    def send_many(self, readings: Iterable[dict]) -> bool:
+        """
+        Dodaje odczyty do kolejki i wysyła pełne paczki bez czekania na każde potwierdzenie.
+        Niepełna końcówka zostaje w kolejce do następnego wywołania lub do flush().
 
-        for attempt in range(1, self.retries + 1):
-            try:
-                with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
-                    sock.sendall(message)
-                    if self.logger:
-                        self.logger.log_info(f"Wysłano dane: {data}")
-
-                    ack = sock.recv(1024).strip()
-                    if ack == b"ACK":
-                        if self.logger:
-                            self.logger.log_info("Otrzymano potwierdzenie ACK")
-                        return True
-                    else:
-                        if self.logger:
-                            self.logger.log_error(f"Nieprawidłowe potwierdzenie: {ack}")
-            except Exception as e:
-                if self.logger:
-                    self.logger.log_error(f"Błąd wysyłania danych (próba {attempt}/{self.retries}): {e}")
+        :param readings: Odczyty do wysłania
+        :return: False jeśli połączenie zostało trwale przerwane, True w przeciwnym razie
+        """
+        if self.connection_failed:
+            return self._report_failed()
+        self._pending.extend(readings)
+        if self._offline and not self._try_online():
+            return self._spool_pending()
 
-                if attempt < self.retries:
-                    time.sleep(1)
-                else:
-                    # Po wyczerpaniu wszystkich prób
-                    self.connection_failed = True
-                    if self.logger:
-                        self.logger.log_error(
-                            f"Wyczerpano wszystkie próby połączenia ({self.retries}). Przerywanie połączenia.")
+        while len(self._pending) >= self.batch_size:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            if not self._send_batch(batch):
+                return self._spool_pending()
+        return self._replay()
 
-        return False
+    def flush(self) -> bool:
+        """
+        Wysyła wszystkie oczekujące odczyty i czeka, aż serwer potwierdzi każdy z nich.
+
+        :return: True jeśli wszystkie odczyty zostały potwierdzone (albo, gdy serwer jest niedostępny,
+                 zapisane w spoolu), False w przeciwnym razie
+        """
+        if not self.send_many([]):
+            return False
+        if self._offline:
+            return self._spool_pending()
+        # Paczki odrzucone przez przeciążony serwer wracają do _pending - wysyłamy, aż wszystko zostanie potwierdzone
+        while self._pending or self._inflight:
+            if self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                if not self._send_batch(batch):
+                    return self._spool_pending()
+            elif not self._wait_for_ack():
+                return self._spool_pending()
+        return True
+
+    def poll(self, timeout: float = 0.0) -> bool:
+        """
+        Odbiera potwierdzenia paczek w locie, czekając na nie co najwyżej timeout sekund.
+        Pozwala wykorzystać czas bezczynności między wysyłkami zamiast zwykłego time.sleep().
+
+        :return: False jeśli połączenie zostało trwale przerwane, True w przeciwnym razie
+        """
+        if self.connection_failed:
+            return self._report_failed()
+        if self._offline:
+            self._try_online()
+        if not self._replay():
+            return False
+        if not self._inflight or self._offline:
+            time.sleep(timeout)
+            return True
+        return self._poll_acks(timeout) or self._spool_pending()
+
+    def query(self, start, end, sensors: Optional[Iterable[str]] = None, bucket: Optional[float] = None,
+              chunk: int = 1000) -> Iterator[dict]:
+        """
+        Pobiera z serwera odczyty z przedziału [start, end] (datetime, tekst ISO lub ns od epoki)
+        przez osobne połączenie. Wiersze są zwracane na bieżąco, w miarę nadchodzenia kolejnych porcji.
+        Serwer w trybie "blocking" obsługuje jedno połączenie naraz - zapytanie zostanie obsłużone
+        dopiero po zamknięciu połączenia, którym klient wysyła odczyty.
+
+        :param sensors: Identyfikatory czujników (domyślnie wszystkie)
+        :param bucket: Długość kubełka agregacji w sekundach - zamiast odczytów zwracane są
+                       kubełki z count/avg/min/max/last
+        :param chunk: Liczba wierszy w jednej porcji odpowiedzi
+        :raises ValueError: Gdy serwer odrzucił zapytanie
+        """
+        request = QueryRequest(to_epoch_ns(start), to_epoch_ns(end), sensors,
+                               int(bucket * 10 ** 9) if bucket is not None else None, chunk)
+        buffer = FrameBuffer(65536)
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(request.to_line())
+            while True:
+                line = buffer.read_line()
+                if line is None:
+                    if not buffer.recv_into(sock):
+                        raise ConnectionError("Serwer zamknął połączenie przed końcem odpowiedzi")
+                    continue
+                kind, _, payload = line.partition(b" ")
+                if kind == ROWS:
+                    yield from json.loads(payload.decode('utf-8'))
+                elif kind == END:
+                    return
+                elif kind == QUERY_ERROR:
+                    raise ValueError(f"Serwer odrzucił zapytanie: {payload.decode('utf-8')}")
+
+    def is_offline(self) -> bool:
+        """Czy klient działa w trybie offline (serwer niedostępny, odczyty trafiają do spoolu)."""
+        return self._offline
+
+    def spooled(self) -> int:
+        """Liczba odczytów czekających w spoolu na wysłanie."""
+        return len(self._spool) if self._spool is not None else 0
 
     def is_connection_failed(self) -> bool:
         """
@@ -82,16 +251,298 @@ class Client:
 
     def close(self) -> None:
         """
-        Zamyka połączenie – w tej wersji połączenie jest tymczasowe, więc nic nie robi.
+        Wysyła zaległe odczyty (jeśli to możliwe) i zamyka połączenie.
         """
+        if not self.connection_failed and (self._pending or self._inflight):
+            self.flush()
+        self._disconnect()
+        if self._spool is not None:
+            # Niewysłane odczyty zostają na dysku do następnego uruchomienia
+            self._spool.rewind()
+            self._spool.close()
+        _clients.discard(self)
         if self.logger:
             self.logger.log_info("Zakończono działanie klienta.")
 
-    def _serialize(self, data: dict) -> bytes:
+    def _send_batch(self, readings: List[dict], token: Optional[tuple] = None) -> bool:
+        # Przy pełnym oknie czekamy na potwierdzenie najstarszej paczki
+        while len(self._inflight) >= self._window_limit:
+            if not self._wait_for_ack():
+                return self._unsent(readings, token)
+
+        # Serwer prosił o zwolnienie - w tym czasie tylko odbieramy potwierdzenia
+        delay = self._resume_at - time.monotonic()
+        if delay > 0 and not self._poll_acks(delay):
+            return self._unsent(readings, token)
+
+        if self._sock is None and not self._reconnect():
+            return self._unsent(readings, token)
+
+        self._sent += len(readings)
+        self._inflight.append([self._sent, readings, time.monotonic(), token])
+        try:
+            self._sock.sendall(self._frame(readings))
+        except OSError as e:
+            if self.logger:
+                self.logger.log_error(f"Błąd wysyłania danych: {e}")
+            return self._reconnect()
+        return self._poll_acks()
+
+    def _poll_acks(self, timeout: float = 0.0) -> bool:
+        """Przetwarza potwierdzenia, które dotrą w ciągu timeout sekund (domyślnie tylko te, które już są)."""
+        if self._sock is None:
+            return True
+        deadline = time.monotonic() + timeout
+        try:
+            while select.select([self._sock], [], [], max(0.0, deadline - time.monotonic()))[0]:
+                if not self._recv_buffer.recv_into(self._sock):
+                    raise ConnectionError("Serwer zamknął połączenie")
+                for rejected, acked, retry_ms in self._read_responses():
+                    self._handle_response(rejected, acked, retry_ms)
+        except (OSError, ValueError) as e:
+            if self.logger:
+                self.logger.log_error(f"Błąd odbioru potwierdzenia: {e}")
+            return self._reconnect()
+        return True
+
+    def _wait_for_ack(self) -> bool:
+        """Czeka na kolejne potwierdzenie od serwera. Po błędzie łączy się ponownie i wysyła paczki w locie."""
+        if self._sock is None and not self._reconnect():
+            return False
+
+        try:
+            responses = self._read_responses()
+            while not responses:
+                if not self._recv_buffer.recv_into(self._sock):
+                    raise ConnectionError("Serwer zamknął połączenie")
+                responses = self._read_responses()
+        except (OSError, ValueError) as e:
+            if self.logger:
+                self.logger.log_error(f"Błąd odbioru potwierdzenia: {e}")
+            return self._reconnect()
+
+        for rejected, acked, retry_ms in responses:
+            self._handle_response(rejected, acked, retry_ms)
+        return True
+
+    def _read_responses(self) -> List[Tuple[bool, int, int]]:
+        """Wycina z bufora wszystkie kompletne potwierdzenia jako (czy odrzucono, licznik, wskazówka RETRY w ms)."""
+        responses = []
+        if self._binary:
+            while True:
+                frame = self._recv_buffer.read_frame()
+                if frame is None:
+                    break
+                frame_type, value = decode_counter(frame)
+                if frame_type == FRAME_RETRY:
+                    self._retry_hint = value
+                elif frame_type in (FRAME_ACK, FRAME_ERROR):
+                    responses.append((frame_type == FRAME_ERROR, value, self._retry_hint))
+                    self._retry_hint = 0
+                elif self.logger:
+                    self.logger.log_error(f"Nieprawidłowa ramka potwierdzenia: {frame_type}")
+            return responses
+
+        while True:
+            line = self._recv_buffer.read_line()
+            if line is None:
+                break
+            parts = line.split()
+            retry = len(parts) == 4 and parts[2] == b"RETRY" and parts[3].isdigit()
+            if (len(parts) != 2 and not retry) or parts[0] not in (b"ACK", b"ERR") or not parts[1].isdigit():
+                if self.logger:
+                    self.logger.log_error(f"Nieprawidłowe potwierdzenie: {line}")
+                continue
+            responses.append((parts[0] == b"ERR", int(parts[1]), int(parts[3]) if retry else 0))
+        return responses
+
+    def _handle_response(self, rejected: bool, acked: int, retry_ms: int = 0) -> None:
+        now = time.monotonic()
+        if retry_ms:
+            # Serwer jest przeciążony: przerwa w wysyłaniu i o połowę mniej paczek w locie
+            self._resume_at = max(self._resume_at, now + retry_ms / 1000)
+            self._window_limit = max(1, self._window_limit // 2)
+            _log.debug("Serwer prosi o zwolnienie na %d ms (paczek w locie: %d)", retry_ms, self._window_limit)
+        elif not rejected and self._window_limit < self.window:
+            self._window_limit += 1
+
+        while self._inflight and self._inflight[0][0] <= acked:
+            end, readings, sent_at, token = self._inflight.popleft()
+            if token is not None:
+                self._spool.commit(token)
+            if self.on_ack:
+                self.on_ack(len(readings), now - sent_at)
+
+        if rejected and self._inflight:
+            # Serwer odrzucił najstarszą niepotwierdzoną paczkę i nie wliczył jej do licznika
+            end, rejected, sent_at, token = self._inflight.popleft()
+            if token is not None:
+                self._spool.commit(token)
+            for entry in self._inflight:
+                entry[0] -= len(rejected)
+            self._sent -= len(rejected)
+            if retry_ms:
+                # Odrzucona z powodu przeciążenia - wysyłamy ją ponownie po przerwie
+                self._pending[:0] = rejected
+            elif self.logger:
+                self.logger.log_error(f"Serwer odrzucił paczkę {len(rejected)} odczytów")
+
+    def _reconnect(self, attempts: Optional[int] = None) -> bool:
+        """
+        Zestawia połączenie od nowa z wykładniczym opóźnieniem między próbami
+        i ponownie wysyła wszystkie niepotwierdzone paczki.
+        """
+        attempts = self.retries if attempts is None else attempts
+        for attempt in range(1, attempts + 1):
+            self._disconnect()
+            try:
+                self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._negotiate()
+                self._resend_inflight()
+                if self._connected_once:
+                    self._metric_reconnects.inc()
+                self._connected_once = True
+                return True
+            except OSError as e:
+                self._metric_connect_errors.inc()
+                if self.logger:
+                    self.logger.log_error(f"Błąd połączenia (próba {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(self._backoff(attempt))
+
+        # Po wyczerpaniu wszystkich prób
+        self._disconnect()
+        if self._spool is not None:
+            self._go_offline()
+            return False
+        self.connection_failed = True
+        if self.logger:
+            self.logger.log_error(
+                f"Wyczerpano wszystkie próby połączenia ({self.retries}). Przerywanie połączenia.")
+        return False
+
+    def _go_offline(self) -> None:
+        """Przenosi niepotwierdzone odczyty do spoolu i przechodzi w tryb offline."""
+        if not self._offline and self.logger:
+            self.logger.log_error("Serwer niedostępny - odczyty będą zapisywane w spoolu")
+        self._offline = True
+        self._next_attempt = time.monotonic() + self.retry_interval
+
+        # Paczki odtwarzane ze spoolu wciąż w nim są - wystarczy cofnąć pozycję odczytu
+        self._spool.rewind()
+        for end, readings, sent_at, token in self._inflight:
+            if token is None:
+                self._spool.append(readings)
+        self._inflight.clear()
+        self._sent = 0
+
+    def _try_online(self) -> bool:
+        """W trybie offline co retry_interval sekund próbuje ponownie połączyć się z serwerem."""
+        if time.monotonic() < self._next_attempt:
+            return False
+        if not self._reconnect(attempts=1):
+            return False
+        self._offline = False
+        if self.logger:
+            self.logger.log_info(f"Połączono ponownie - w spoolu czeka {len(self._spool)} odczytów")
+        return True
+
+    def _spool_pending(self) -> bool:
+        """Po nieudanym wysłaniu: w trybie offline zapisuje oczekujące odczyty w spoolu (True), bez spoolu zwraca False."""
+        if not self._offline:
+            return False
+        if self._pending:
+            self._spool.append(self._pending)
+            self._pending = []
+        return True
+
+    def _unsent(self, readings: List[dict], token: Optional[tuple]) -> bool:
+        # Paczka, której nie zdążono dodać do paczek w locie - w trybie offline trafia do spoolu
+        if self._offline and token is None:
+            self._spool.append(readings)
+        return False
+
+    def _replay(self) -> bool:
+        """Wysyła zaległe odczyty ze spoolu, nie szybciej niż replay_rate odczytów na sekundę."""
+        if self._spool is None or self._offline or not len(self._spool):
+            return True
+
+        now = time.monotonic()
+        self._replay_tokens = min(float(self.replay_batch),
+                                  self._replay_tokens + (now - self._replay_time) * self.replay_rate)
+        self._replay_time = now
+
+        # Odtwarzanie nie czeka na miejsce w oknie - zajmuje tylko to, co zostało po bieżących odczytach
+        while self._replay_tokens >= 1 and len(self._inflight) < self._window_limit:
+            readings, token = self._spool.read(int(self._replay_tokens))
+            if not readings:
+                break
+            self._replay_tokens -= len(readings)
+            if not self._send_batch(readings, token):
+                return self._spool_pending()
+        return True
+
+    def _resend_inflight(self) -> None:
+        # Licznik potwierdzeń serwera jest liczony osobno dla każdego połączenia
+        self._sent = 0
+        now = time.monotonic()
+        frames = []
+        for entry in self._inflight:
+            self._sent += len(entry[1])
+            entry[0] = self._sent
+            entry[2] = now
+            frames.append(self._frame(entry[1]))
+        if frames:
+            self._sock.sendall(b"".join(frames))
+
+    def _negotiate(self) -> None:
+        """Uzgadnia protokół binarny z serwerem, jeśli został wybrany."""
+        self._binary = False
+        if self.protocol != "binary":
+            return
+
+        self._sock.sendall(HELLO + b"\n")
+        line = self._recv_buffer.read_line()
+        while line is None:
+            if not self._recv_buffer.recv_into(self._sock):
+                raise ConnectionError("Serwer zamknął połączenie podczas negocjacji")
+            line = self._recv_buffer.read_line()
+
+        if line.strip() == HELLO_OK:
+            self._binary = True
+            self._encoder.reset()
+        elif self.logger:
+            self.logger.log_error("Serwer nie obsługuje protokołu binarnego - używany będzie JSON")
+
+    def _frame(self, readings: List[dict]) -> bytes:
+        if self._binary:
+            return self._encoder.encode(readings)
+        return self._serialize(readings) + b"\n"
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        self._recv_buffer = FrameBuffer(4096)
+
+    def _report_failed(self) -> bool:
+        if self.logger:
+            self.logger.log_error("Połączenie zostało przerwane po wyczerpaniu prób")
+        return False
+
+    def _serialize(self, data) -> bytes:
         """
-        Serializuje słownik do formatu JSON w postaci bajtów.
+        Serializuje dane do formatu JSON w postaci bajtów.
 
-        :param data: Dane do serializacji
+        :param data: Dane do serializacji (odczyt lub lista odczytów)
         :return: Zserializowane dane w formacie JSON jako bajty
         """
         return json.dumps(data).encode('utf-8')
@@ -0,0 +1,327 @@
+import json
+import struct
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Negocjacja: klient wysyła HELLO jako pierwszą linię, serwer odpowiada HELLO_OK.
+# Od tego momentu w obu kierunkach płyną wyłącznie ramki binarne.
+# Serwer, który nie zna protokołu binarnego, odpowie "ERR" - klient wraca wtedy do JSON.
+HELLO = b"HELLO BIN1"
+HELLO_OK = b"OK BIN1"
+
+# Ramka: 4 bajty długości (little-endian), potem treść zaczynająca się od bajtu typu
+FRAME_HEADER = struct.Struct("<I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+FRAME_DEFINE = ord("D")    # nadanie numeru parze (sensor_id, unit)
+FRAME_READINGS = ord("R")  # paczka odczytów
+FRAME_ACK = ord("A")       # łączna liczba przyjętych odczytów
+FRAME_ERROR = ord("E")     # odrzucona ramka, łączna liczba przyjętych odczytów
+FRAME_RETRY = ord("W")     # wskazówka "zwolnij" w ms - dotyczy następnej ramki ACK/ERROR
+
+_DEFINE = struct.Struct("<BH")
+_READINGS = struct.Struct("<BH")
+_RECORD = struct.Struct("<Hqd")  # numer czujnika, znacznik czasu [ns od epoki], wartość
+_COUNTER = struct.Struct("<BQ")
+
+MAX_SENSORS = 0xFFFF
+MAX_RECORDS = 0xFFFF
+
+# Zapytania o odczyty (tylko protokół tekstowy): "QUERY {...}", odpowiedź "ROWS [...]" ... "END n źródło"
+# albo "QERR opis" - zob. QueryRequest
+QUERY = b"QUERY"
+ROWS = b"ROWS"
+END = b"END"
+QUERY_ERROR = b"QERR"
+
+
+def to_epoch_ns(timestamp) -> int:
+    """Zamienia znacznik czasu (int ns, datetime lub tekst ISO) na nanosekundy od epoki."""
+    if isinstance(timestamp, int):
+        return timestamp
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    # Sekundy i mikrosekundy osobno - iloczyn timestamp() * 10**6 traci dokładność na float
+    return int(timestamp.replace(microsecond=0).timestamp()) * 1_000_000_000 + timestamp.microsecond * 1000
+
+
+def from_epoch_ns(timestamp_ns: int) -> datetime:
+    """Zamienia nanosekundy od epoki na datetime w czasie lokalnym (z dokładnością do mikrosekundy)."""
+    seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000)
+
+
+def encode_counter(frame_type: int, value: int) -> bytes:
+    body = _COUNTER.pack(frame_type, value)
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+def decode_counter(frame) -> Tuple[int, int]:
+    return _COUNTER.unpack_from(frame)
+
+
+def _pack_text(text: str) -> bytes:
+    raw = text.encode('utf-8')
+    if len(raw) > 255:
+        raise ValueError(f"Zbyt długi tekst w ramce binarnej: {text[:32]}...")
+    return bytes((len(raw),)) + raw
+
+
+class ReadingEncoder:
+    """
+    Koduje odczyty do ramek binarnych. Identyfikatory czujników są internowane:
+    przy pierwszym użyciu wysyłana jest ramka DEFINE, później tylko 2-bajtowy numer.
+    Numeracja obowiązuje w obrębie jednego połączenia - po ponownym połączeniu trzeba wywołać reset().
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    def reset(self) -> None:
+        self._ids.clear()
+
+    def encode(self, readings: List[dict]) -> bytes:
+        parts = []
+        records = bytearray()
+        count = 0
+        for reading in readings:
+            key = (reading.get("sensor_id", "unknown"), reading.get("unit", ""))
+            index = self._ids.get(key)
+            if index is None:
+                if len(self._ids) >= MAX_SENSORS:
+                    raise ValueError("Przekroczono liczbę czujników możliwych do zakodowania w połączeniu")
+                index = len(self._ids)
+                self._ids[key] = index
+                body = _DEFINE.pack(FRAME_DEFINE, index) + _pack_text(key[0]) + _pack_text(key[1])
+                parts.append(FRAME_HEADER.pack(len(body)) + body)
+
+            records += _RECORD.pack(index, to_epoch_ns(reading["timestamp"]), float(reading.get("value", 0)))
+            count += 1
+            if count == MAX_RECORDS:
+                parts.append(self._readings_frame(count, records))
+                records = bytearray()
+                count = 0
+
+        if count:
+            parts.append(self._readings_frame(count, records))
+        return b"".join(parts)
+
+    @staticmethod
+    def _readings_frame(count: int, records: bytearray) -> bytes:
+        body_size = _READINGS.size + len(records)
+        return FRAME_HEADER.pack(body_size) + _READINGS.pack(FRAME_READINGS, count) + records
+
+
+class ReadingDecoder:
+    """Dekoduje ramki DEFINE/READINGS wysłane przez ReadingEncoder (stan jednego połączenia)."""
+
+    def __init__(self, iso_timestamps: bool = True):
+        """
+        :param iso_timestamps: Czy zamieniać znaczniki czasu na tekst ISO (jak w protokole JSON);
+                               False zostawia je jako int - nanosekundy od epoki
+        """
+        self.iso_timestamps = iso_timestamps
+        self._sensors: Dict[int, Tuple[str, str]] = {}
+
+    def decode(self, frame) -> List[dict]:
+        """
+        Zwraca listę odczytów z ramki READINGS (lub pustą listę dla ramki DEFINE).
+        Znacznik czasu odczytu jest zwracany w formacie ISO, tak jak w protokole JSON
+        (albo jako nanosekundy od epoki, jeśli iso_timestamps == False).
+
+        :raises ValueError: Gdy ramka jest uszkodzona lub nieznanego typu
+        """
+        if not len(frame):
+            raise ValueError("Pusta ramka")
+        frame_type = frame[0]
+
+        try:
+            if frame_type == FRAME_DEFINE:
+                _, index = _DEFINE.unpack_from(frame)
+                offset = _DEFINE.size
+                sensor_id, offset = self._unpack_text(frame, offset)
+                unit, offset = self._unpack_text(frame, offset)
+                self._sensors[index] = (sensor_id, unit)
+                return []
+
+            if frame_type == FRAME_READINGS:
+                _, count = _READINGS.unpack_from(frame)
+                if len(frame) != _READINGS.size + count * _RECORD.size:
+                    raise ValueError("Niezgodna długość ramki odczytów")
+                readings = []
+                sensors = self._sensors
+                iso_timestamps = self.iso_timestamps
+                for index, timestamp_ns, value in _RECORD.iter_unpack(frame[_READINGS.size:]):
+                    sensor_id, unit = sensors[index]
+                    readings.append({
+                        "sensor_id": sensor_id,
+                        "timestamp": from_epoch_ns(timestamp_ns).isoformat() if iso_timestamps else timestamp_ns,
+                        "value": value,
+                        "unit": unit
+                    })
+                return readings
+
+        except (struct.error, KeyError, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Uszkodzona ramka binarna: {e}") from e
+
+        raise ValueError(f"Nieznany typ ramki: {frame_type}")
+
+    @staticmethod
+    def _unpack_text(frame, offset: int) -> Tuple[str, int]:
+        length = frame[offset]
+        start = offset + 1
+        if start + length > len(frame):
+            raise IndexError("Tekst wychodzi poza ramkę")
+        return bytes(frame[start:start + length]).decode('utf-8'), start + length
+
+
+class FrameBuffer:
+    """
+    Wielokrotnie używany bufor odbiorczy. Dane są wczytywane bezpośrednio do bufora
+    (socket.recv_into lub asyncio.BufferedProtocol), a linie i ramki są z niego wycinane
+    bez sklejania kolejnych fragmentów w nowe obiekty bytes.
+
+    Ramki zwracane przez read_frame() to widoki na bufor - są ważne tylko do następnego
+    wywołania get_buffer()/recv_into().
+    """
+
+    def __init__(self, size: int = 64 * 1024, max_size: int = MAX_FRAME_SIZE + FRAME_HEADER.size):
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self.max_size = max_size
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """Zwraca wolny fragment bufora do zapisu (w razie potrzeby przesuwa lub powiększa bufor)."""
+        if self._start == self._end:
+            self._start = self._end = 0
+        if self._end == len(self._buffer) or (sizehint > 0 and len(self._buffer) - self._end < sizehint):
+            self._make_room(max(sizehint, 1))
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+
+    def recv_into(self, sock) -> int:
+        """Odbiera dane z gniazda prosto do bufora. Zwraca liczbę bajtów (0 = koniec połączenia)."""
+        nbytes = sock.recv_into(self.get_buffer())
+        self.buffer_updated(nbytes)
+        return nbytes
+
+    def read_line(self) -> Optional[bytes]:
+        """Zwraca kolejną linię (bez znaku nowej linii) lub None, jeśli nie jest jeszcze kompletna."""
+        end = self._buffer.find(b"\n", self._start, self._end)
+        if end < 0:
+            return None
+        line = bytes(self._view[self._start:end])
+        self._start = end + 1
+        return line
+
+    def read_remaining(self) -> bytes:
+        data = bytes(self._view[self._start:self._end])
+        self._start = self._end = 0
+        return data
+
+    def read_frame(self):
+        """Zwraca treść kolejnej ramki binarnej (memoryview) lub None, jeśli nie dotarła w całości."""
+        available = self._end - self._start
+        if available < FRAME_HEADER.size:
+            return None
+        (length,) = FRAME_HEADER.unpack_from(self._buffer, self._start)
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Zbyt duża ramka: {length} B")
+        if available < FRAME_HEADER.size + length:
+            return None
+        start = self._start + FRAME_HEADER.size
+        self._start = start + length
+        return self._view[start:start + length]
+
+    def _make_room(self, needed: int) -> None:
+        pending = self._end - self._start
+        if self._start:
+            # Przesunięcie niekompletnych danych na początek bufora (bez zmiany rozmiaru)
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+        if len(self._buffer) - self._end >= needed:
+            return
+
+        size = len(self._buffer)
+        while size - pending < needed:
+            size *= 2
+        if size > self.max_size:
+            if pending + needed > self.max_size:
+                raise ValueError("Przekroczono maksymalny rozmiar bufora odbiorczego")
+            size = self.max_size
+
+        buffer = bytearray(size)
+        buffer[:pending] = self._buffer[:pending]
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+
+
+class QueryRequest:
+    """
+    Zapytanie o odczyty z przedziału czasu, wysyłane przez połączenie z serwerem jako linia:
+
+        QUERY {"start": ..., "end": ..., "sensors": ["T1", ...], "bucket": 60, "chunk": 1000}
+
+    start i end to tekst ISO albo nanosekundy od epoki, sensors (opcjonalne) ogranicza zapytanie
+    do wybranych czujników, a bucket (opcjonalny, w sekundach) zamienia surowe odczyty na kubełki
+    z count/avg/min/max/last. Serwer odpowiada liniami "ROWS <tablica JSON>" po co najwyżej
+    chunk wierszy, a na końcu "END <liczba wierszy> <źródło>" ("window" lub "logger").
+    Błąd zapytania to linia "QERR <opis>".
+    """
+
+    def __init__(self, start_ns: int, end_ns: int, sensors: Optional[Iterable[str]] = None,
+                 bucket_ns: Optional[int] = None, chunk_rows: int = 1000):
+        """
+        :param start_ns: Początek przedziału (ns od epoki, włącznie)
+        :param end_ns: Koniec przedziału (ns od epoki, włącznie)
+        :param sensors: Identyfikatory czujników (None - wszystkie)
+        :param bucket_ns: Długość kubełka agregacji w ns (None - surowe odczyty)
+        :param chunk_rows: Maksymalna liczba wierszy w jednej linii ROWS
+        """
+        if end_ns < start_ns:
+            raise ValueError("Koniec przedziału jest wcześniejszy niż początek")
+        if bucket_ns is not None and bucket_ns <= 0:
+            raise ValueError("Długość kubełka musi być dodatnia")
+        if chunk_rows < 1:
+            raise ValueError("chunk musi być dodatni")
+
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.sensors: Optional[Set[str]] = set(sensors) if sensors is not None else None
+        self.bucket_ns = bucket_ns
+        self.chunk_rows = chunk_rows
+
+    @classmethod
+    def parse(cls, payload: bytes) -> "QueryRequest":
+        """Tworzy zapytanie z treści linii QUERY. :raises ValueError: Gdy zapytanie jest niepoprawne"""
+        request = json.loads(payload.decode('utf-8'))
+        if not isinstance(request, dict) or 'start' not in request or 'end' not in request:
+            raise ValueError("Zapytanie musi zawierać pola start i end")
+        sensors = request.get('sensors')
+        if sensors is not None and not isinstance(sensors, list):
+            raise ValueError("Pole sensors musi być listą")
+        bucket = request.get('bucket')
+        return cls(to_epoch_ns(request['start']), to_epoch_ns(request['end']), sensors,
+                   int(bucket * 10 ** 9) if bucket is not None else None, int(request.get('chunk', 1000)))
+
+    def to_line(self) -> bytes:
+        """Linia zapytania do wysłania przez klienta."""
+        request = {"start": self.start_ns, "end": self.end_ns, "chunk": self.chunk_rows}
+        if self.sensors is not None:
+            request["sensors"] = sorted(self.sensors)
+        if self.bucket_ns is not None:
+            request["bucket"] = self.bucket_ns / 10 ** 9
+        return QUERY + b" " + json.dumps(request).encode('utf-8') + b"\n"
+
+    @staticmethod
+    def error(error: Exception) -> bytes:
+        """Linia QERR z opisem błędu zapytania."""
+        return QUERY_ERROR + b" " + str(error).replace("\n", " ").encode('utf-8') + b"\n"
@@ -5,8 +5,15 @@ import time
 from server.Server import Server
 
 class ServerGUI:
-    def __init__(self, master):
+    def __init__(self, master, refresh_ms: int = 1000, workers: int = 1):
+        """
+        :param master: Główne okno Tk
+        :param refresh_ms: Co ile milisekund odświeżać tabelę czujników
+        :param workers: Liczba procesów roboczych serwera (powyżej 1 - ShardedServer)
+        """
         self.master = master
+        self.refresh_ms = refresh_ms
+        self.workers = workers
         self.master.title("Serwer TCP - GUI")
         self.master.geometry("800x500")
 
@@ -15,8 +22,12 @@ class ServerGUI:
 
         self.port_var = tk.StringVar(value="5000")
         self.status_var = tk.StringVar(value="Zatrzymano")
+        # Status ustawiany z wątku serwera - do zmiennej Tk trafia dopiero w wątku GUI
+        self._status = "Zatrzymano"
 
-        self.sensor_data = {}
+        # Wiersze tabeli: {sensor_id: wpis migawki}, wersja ostatnio pokazanej migawki
+        self._rows = {}
+        self._version = None
 
         self._create_widgets()
         self._update_table_loop()
@@ -51,9 +62,13 @@ class ServerGUI:
 
         try:
             port = int(self.port_var.get())
-            self.server = Server(port)
-            self.server.on_new_reading = self._on_new_reading
+            if self.workers > 1:
+                from server.ShardedServer import ShardedServer
+                self.server = ShardedServer(port, self.workers, stats_interval=self.refresh_ms / 1000)
+            else:
+                self.server = Server(port, stats_interval=self.refresh_ms / 1000)
             self.server.on_status_change = self._on_status_change
+            self._clear_table()
 
             self.server_thread = Thread(target=self.server.start, daemon=True)
             self.server_thread.start()
@@ -65,31 +80,58 @@ class ServerGUI:
             self.server.stop()
             self.server = None
 
-    def _on_new_reading(self, reading):
-        self.sensor_data[reading['sensor_id']] = reading
-
     def _on_status_change(self, status):
-        self.status_var.set(status)
+        self._status = status
 
     def _update_table_loop(self):
+        if self.status_var.get() != self._status:
+            self.status_var.set(self._status)
         self._refresh_table()
-        self.master.after(5000, self._update_table_loop)
+        self.master.after(self.refresh_ms, self._update_table_loop)
+
+    def _clear_table(self):
+        self.tree.delete(*self.tree.get_children())
+        self._rows = {}
+        self._version = None
 
     def _refresh_table(self):
-        if self.server:
-            stats = self.server.get_sensor_stats()
-            self.tree.delete(*self.tree.get_children())
-            for stat in stats:
-                self.tree.insert("", "end", values=(
-                    stat['sensor'],
-                    stat['last_value'],
-                    stat['unit'],
-                    stat['timestamp'],
-                    stat['avg_1h'],
-                    stat['avg_12h']
-                ))
+        """Nanosi na tabelę zmiany z migawki statystyk serwera - tylko wiersze czujników, które się zmieniły."""
+        if not self.server:
+            return
+        snapshot = self.server.stats_snapshot()
+        if snapshot.version == self._version:
+            return
+        self._version = snapshot.version
+
+        for sensor_id in self._rows.keys() - snapshot.sensors.keys():
+            self.tree.delete(sensor_id)
+            del self._rows[sensor_id]
+
+        for sensor_id, stat in snapshot.sensors.items():
+            previous = self._rows.get(sensor_id)
+            if previous is stat:
+                continue
+            values = (
+                stat['sensor'],
+                stat['last_value'],
+                stat['unit'],
+                stat['timestamp'],
+                stat['avg_1h'],
+                stat['avg_12h']
+            )
+            if previous is None:
+                self.tree.insert("", "end", iid=sensor_id, values=values)
+            else:
+                self.tree.item(sensor_id, values=values)
+            self._rows[sensor_id] = stat
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="GUI serwera TCP")
+    parser.add_argument("--refresh-ms", type=int, default=1000, help="Odstęp odświeżania tabeli w milisekundach")
+    parser.add_argument("--workers", type=int, default=1, help="Liczba procesów roboczych serwera")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = ServerGUI(root)
+    app = ServerGUI(root, refresh_ms=args.refresh_ms, workers=args.workers)
     root.mainloop()
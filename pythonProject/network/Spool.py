@@ -0,0 +1,258 @@
+import json
+import os
+import struct
+from typing import List, Optional, Tuple
+
+from network.Protocol import ReadingDecoder, ReadingEncoder
+
+# Paczka w pliku segmentu: długość treści, liczba odczytów, potem ramki protokołu binarnego
+# (DEFINE + READINGS) zakodowane od nowa dla każdej paczki, więc każdą można zdekodować osobno
+_CHUNK = struct.Struct("<II")
+
+SPOOL_POLICIES = ('drop_oldest', 'drop_newest')
+SEGMENT_SUFFIX = '.spool'
+POSITION_FILE = 'position.json'
+
+
+class Spool:
+    """
+    Trwały bufor (store-and-forward) odczytów, których nie udało się wysłać.
+
+    Odczyty są dopisywane na koniec plików segmentów w katalogu spoolu w zwartym formacie
+    protokołu binarnego (network.Protocol), więc w pamięci nie jest trzymane nic poza pozycjami.
+    read() zwraca kolejne odczyty od pozycji odczytu, a commit() przesuwa pozycję potwierdzoną,
+    która jest zapisywana na dysku - po restarcie odtwarzanie zaczyna się od niej. Segmenty
+    w całości potwierdzone są usuwane.
+
+    Gdy spool przekroczy max_bytes, polityka "drop_oldest" usuwa najstarsze segmenty,
+    a "drop_newest" odrzuca nowe odczyty. Odrzucone odczyty są liczone w evicted.
+    Zachowywane są tylko pola sensor_id, timestamp, value i unit.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, max_bytes: int = 256 * 1024 * 1024,
+                 policy: str = 'drop_oldest', iso_timestamps: bool = True):
+        """
+        :param directory: Katalog na pliki spoolu (tworzony, jeśli nie istnieje)
+        :param segment_bytes: Rozmiar, po którego przekroczeniu zaczynany jest nowy segment
+        :param max_bytes: Maksymalny łączny rozmiar segmentów
+        :param policy: Co robić po przekroczeniu max_bytes: "drop_oldest" lub "drop_newest"
+        :param iso_timestamps: Czy zwracać znaczniki czasu jako tekst ISO (False - nanosekundy od epoki)
+        """
+        if policy not in SPOOL_POLICIES:
+            raise ValueError(f"Nieznana polityka spoolu: {policy}")
+
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.iso_timestamps = iso_timestamps
+        self.evicted = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._encoder = ReadingEncoder()
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._sizes = {segment: os.path.getsize(self._path(segment)) for segment in self._segments}
+        # Numery segmentów nigdy się nie powtarzają, więc stare znaczniki nie wskażą nowego segmentu
+        self._last_segment = self._segments[-1] if self._segments else -1
+        self._writer = None
+
+        # Pozycja potwierdzona (zapisywana na dysku) i pozycja odczytu (może ją wyprzedzać): (segment, offset)
+        self._committed = self._load_position()
+        self._read = self._committed
+        self._pending = sum(self._count(segment, self._committed) for segment in self._segments)
+
+    def __len__(self) -> int:
+        """Liczba odczytów czekających w spoolu (także tych odczytanych, ale niepotwierdzonych)."""
+        return self._pending
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def append(self, readings: List[dict]) -> int:
+        """Dopisuje odczyty na koniec spoolu. Zwraca liczbę zapisanych odczytów."""
+        if not readings:
+            return 0
+
+        self._encoder.reset()
+        payload = self._encoder.encode(readings)
+        chunk = _CHUNK.pack(len(payload), len(readings)) + payload
+
+        if self.size_bytes + len(chunk) > self.max_bytes:
+            if self.policy == 'drop_newest' or not self._evict(len(chunk)):
+                self.evicted += len(readings)
+                return 0
+
+        if self._writer is None or self._sizes[self._segments[-1]] >= self.segment_bytes:
+            self._open_segment()
+        self._writer.write(chunk)
+        self._writer.flush()
+        self._sizes[self._segments[-1]] += len(chunk)
+        self._pending += len(readings)
+        return len(readings)
+
+    def read(self, max_readings: int) -> Tuple[List[dict], Optional[tuple]]:
+        """
+        Zwraca kolejne odczyty od pozycji odczytu (całe paczki, co najmniej jedną, łącznie zwykle
+        nie więcej niż max_readings) oraz znacznik do przekazania do commit() po ich wysłaniu.
+        Zwraca ([], None), gdy nie ma nic do odczytu.
+        """
+        readings = []
+        segment, offset = self._read
+        while segment is not None and len(readings) < max_readings:
+            if segment not in self._sizes:
+                segment, offset = self._next_segment(segment), 0
+                continue
+            if offset >= self._sizes[segment]:
+                following = self._next_segment(segment)
+                if following is None:
+                    break
+                segment, offset = following, 0
+                continue
+
+            with open(self._path(segment), 'rb') as f:
+                f.seek(offset)
+                while offset < self._sizes[segment] and len(readings) < max_readings:
+                    header = f.read(_CHUNK.size)
+                    if len(header) < _CHUNK.size:
+                        break
+                    length, count = _CHUNK.unpack(header)
+                    if readings and len(readings) + count > max_readings:
+                        break
+                    readings.extend(self._decode(f.read(length)))
+                    offset += _CHUNK.size + length
+            if offset < self._sizes[segment]:
+                break
+
+        if not readings:
+            return [], None
+        self._read = (segment, offset)
+        return readings, (segment, offset, len(readings))
+
+    def commit(self, token: tuple) -> None:
+        """Potwierdza odczyty zwrócone przez read() aż do znacznika (włącznie) i usuwa zbędne segmenty."""
+        segment, offset, count = token
+        if self._committed[0] is None or (segment, offset) <= self._committed:
+            # Znacznik sprzed usunięcia segmentów (drop_oldest) - te odczyty już zostały policzone
+            return
+        self._committed = (segment, offset)
+        self._pending = max(0, self._pending - count)
+
+        for old in [old for old in self._segments if old < segment]:
+            self._remove_segment(old)
+        if offset >= self._sizes.get(segment, 0) and segment != self._segments[-1]:
+            self._remove_segment(segment)
+        elif offset >= self._sizes.get(segment, 0) and self._pending == 0:
+            # Wszystko wysłane - następny zapis zacznie nowy segment, a bieżący można usunąć
+            self._close_writer()
+            self._remove_segment(segment)
+        self._save_position()
+
+    def rewind(self) -> None:
+        """Cofa pozycję odczytu do pozycji potwierdzonej (np. po zerwaniu połączenia w trakcie odtwarzania)."""
+        self._read = self._committed
+
+    def close(self) -> None:
+        self._close_writer()
+        self._save_position()
+
+    def _evict(self, needed: int) -> bool:
+        # Usuwa najstarsze segmenty, aż zmieści się nowa paczka. False, jeśli to niemożliwe.
+        while self._segments and self.size_bytes + needed > self.max_bytes:
+            oldest = self._segments[0]
+            if oldest == self._segments[-1]:
+                self._close_writer()
+            self.evicted += self._count(oldest, self._committed)
+            self._pending -= self._count(oldest, self._committed)
+            self._remove_segment(oldest)
+            following = self._segments[0] if self._segments else None
+            if self._committed[0] is not None and self._committed[0] <= oldest:
+                self._committed = (following, 0)
+            if self._read[0] is not None and self._read[0] <= oldest:
+                self._read = (following, 0)
+        self._save_position()
+        return needed <= self.max_bytes
+
+    def _count(self, segment: int, position: tuple) -> int:
+        """Liczba odczytów w segmencie za pozycją position (tylko nagłówki paczek)."""
+        committed_segment, committed_offset = position
+        if committed_segment is not None and segment < committed_segment:
+            return 0
+        offset = committed_offset if segment == committed_segment else 0
+        total = 0
+        with open(self._path(segment), 'rb') as f:
+            f.seek(offset)
+            while True:
+                header = f.read(_CHUNK.size)
+                if len(header) < _CHUNK.size:
+                    return total
+                length, count = _CHUNK.unpack(header)
+                total += count
+                f.seek(length, os.SEEK_CUR)
+
+    def _decode(self, payload: bytes) -> List[dict]:
+        decoder = ReadingDecoder(iso_timestamps=self.iso_timestamps)
+        view = memoryview(payload)
+        readings = []
+        offset = 0
+        while offset < len(view):
+            (length,) = struct.unpack_from("<I", view, offset)
+            readings.extend(decoder.decode(view[offset + 4:offset + 4 + length]))
+            offset += 4 + length
+        return readings
+
+    def _open_segment(self) -> None:
+        self._close_writer()
+        self._last_segment += 1
+        segment = self._last_segment
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        self._writer = open(self._path(segment), 'ab')
+        if self._read[0] is None:
+            self._read = self._committed = (segment, 0)
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _remove_segment(self, segment: int) -> None:
+        if segment not in self._sizes:
+            return
+        self._segments.remove(segment)
+        del self._sizes[segment]
+        try:
+            os.remove(self._path(segment))
+        except FileNotFoundError:
+            pass
+        if not self._segments:
+            self._read = self._committed = (None, 0)
+
+    def _next_segment(self, segment: int) -> Optional[int]:
+        for candidate in self._segments:
+            if candidate > segment:
+                return candidate
+        return None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:010d}{SEGMENT_SUFFIX}")
+
+    def _load_position(self) -> tuple:
+        first = (self._segments[0], 0) if self._segments else (None, 0)
+        try:
+            with open(os.path.join(self.directory, POSITION_FILE), 'r', encoding='utf-8') as f:
+                position = json.load(f)
+        except (OSError, ValueError):
+            return first
+        if position.get('segment') in self._sizes:
+            return position['segment'], min(position.get('offset', 0), self._sizes[position['segment']])
+        return first
+
+    def _save_position(self) -> None:
+        path = os.path.join(self.directory, POSITION_FILE)
+        segment, offset = self._committed
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'segment': segment, 'offset': offset}, f)
+        os.replace(path + '.tmp', path)
@@ -1,6 +1,7 @@
-import yaml
-
 def load_client_config(path="config.yaml") -> dict:
+    # PyYAML dopiero przy wczytywaniu konfiguracji - sam import modułu nie wydłuża startu klienta
+    import yaml
+
     with open(path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f)
 
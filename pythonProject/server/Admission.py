@@ -0,0 +1,63 @@
+from typing import Dict, Optional
+
+SHED_POLICIES = ('reject', 'drop_oldest', 'sample')
+
+
+class Admission:
+    """
+    Kontrola przyjmowania odczytów przez serwer na podstawie liczby odczytów czekających
+    na zapis w loggerze (Logger.queue_depth).
+
+    Powyżej slowdown_ratio * max_pending serwer nadal przyjmuje paczki, ale do potwierdzenia
+    dołącza wskazówkę "RETRY <ms>" - klient powinien zwolnić. Gdy paczka przekroczyłaby
+    max_pending, serwer zrzuca obciążenie zgodnie z polityką:
+
+    - "reject" - paczka nie jest przyjmowana, klient dostaje "ERR <n> RETRY <ms>" i wysyła ją ponownie później,
+    - "drop_oldest" - paczka jest przyjmowana, a z kolejki zapisu loggera usuwane są najstarsze odczyty,
+    - "sample" - paczka trafia do statystyk, ale do loggera tylko co sample_every-ty odczyt każdego czujnika.
+    """
+
+    def __init__(self, max_pending: int, policy: str = 'reject', slowdown_ratio: float = 0.5,
+                 retry_after_ms: int = 100, sample_every: int = 10):
+        """
+        :param max_pending: Maksymalna liczba odczytów czekających na zapis
+        :param policy: Polityka zrzucania obciążenia: "reject", "drop_oldest" lub "sample"
+        :param slowdown_ratio: Od jakiej części max_pending dołączać do potwierdzeń wskazówkę RETRY
+        :param retry_after_ms: Wskazówka dla klienta przy pełnym obciążeniu (w milisekundach)
+        :param sample_every: Co który odczyt czujnika zapisywać przy polityce "sample"
+        """
+        if policy not in SHED_POLICIES:
+            raise ValueError(f"Nieznana polityka zrzucania obciążenia: {policy}")
+        if max_pending < 1 or not 0 < slowdown_ratio <= 1 or retry_after_ms < 1 or sample_every < 1:
+            raise ValueError("Nieprawidłowe parametry kontroli przyjmowania odczytów")
+
+        self.max_pending = max_pending
+        self.policy = policy
+        self.slowdown_pending = int(max_pending * slowdown_ratio)
+        self.retry_after_ms = retry_after_ms
+        self.sample_every = sample_every
+        self.shed = 0  # Odczyty odrzucone, usunięte z kolejki albo pominięte przy zapisie
+        self._samples: Dict[Optional[str], int] = {}
+
+    def retry_ms(self, pending: int) -> int:
+        """Wskazówka dla klienta (w ms) przy pending odczytach czekających na zapis; 0 - bez wskazówki."""
+        if pending < self.slowdown_pending:
+            return 0
+        if pending >= self.max_pending:
+            return self.retry_after_ms
+        # Rośnie liniowo od progu spowolnienia do max_pending
+        span = max(1, self.max_pending - self.slowdown_pending)
+        return max(1, self.retry_after_ms * (pending - self.slowdown_pending) // span)
+
+    def overflow(self, pending: int, count: int) -> int:
+        """O ile odczytów paczka count odczytów przekroczyłaby max_pending."""
+        return max(0, pending + count - self.max_pending)
+
+    def sample(self, sensor_id: Optional[str]) -> bool:
+        """Czy zapisać kolejny odczyt czujnika przy polityce "sample" (co sample_every-ty)."""
+        seen = self._samples.get(sensor_id, 0)
+        self._samples[sensor_id] = seen + 1
+        if seen % self.sample_every == 0:
+            return True
+        self.shed += 1
+        return False
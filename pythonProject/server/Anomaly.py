@@ -0,0 +1,189 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class ZScoreDetector:
+    """
+    Skoki wartości: odchylenie od wykładniczo ważonej średniej (EWMA) większe niż threshold
+    wykładniczo ważonych odchyleń standardowych. Stan czujnika: liczba odczytów, średnia i wariancja.
+    """
+
+    name = "zscore"
+
+    def __init__(self, alpha: float = 0.05, threshold: float = 4.0, warmup: int = 20, min_std: float = 1e-6):
+        """
+        :param alpha: Waga nowego odczytu w średniej i wariancji (0..1) - im mniejsza, tym dłuższa pamięć
+        :param threshold: Próg |z|, powyżej którego odczyt jest anomalią
+        :param warmup: Ile pierwszych odczytów czujnika tylko uczy średnią (bez zgłaszania anomalii)
+        :param min_std: Najmniejsze odchylenie standardowe (żeby drobna zmiana stałego sygnału nie dawała z = inf)
+        """
+        if not 0 < alpha < 1 or threshold <= 0 or warmup < 1 or min_std <= 0:
+            raise ValueError("Nieprawidłowe parametry detektora z-score")
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std
+
+    def new_state(self, sensor_id: str) -> list:
+        return [0, 0.0, 0.0]
+
+    def update(self, state: list, timestamp_ns: int, value: float) -> Optional[str]:
+        count, mean, variance = state
+        state[0] = count + 1
+        if count == 0:
+            state[1] = value
+            return None
+
+        difference = value - mean
+        increment = self.alpha * difference
+        state[1] = mean + increment
+        state[2] = (1 - self.alpha) * (variance + difference * increment)
+
+        if count >= self.warmup:
+            z = difference / max(math.sqrt(variance), self.min_std)
+            if abs(z) > self.threshold:
+                return f"z = {z:.1f} (średnia {mean:.2f})"
+        return None
+
+
+class RateDetector:
+    """Zbyt szybka zmiana: |różnica wartości| / czas między odczytami większe niż max_rate na sekundę."""
+
+    name = "rate"
+
+    def __init__(self, max_rate: float):
+        """:param max_rate: Największa dopuszczalna zmiana wartości na sekundę"""
+        if max_rate <= 0:
+            raise ValueError("max_rate musi być dodatnie")
+        self.max_rate = max_rate
+
+    def new_state(self, sensor_id: str) -> list:
+        return [None, 0.0]
+
+    def update(self, state: list, timestamp_ns: int, value: float) -> Optional[str]:
+        last_ns, last_value = state
+        if last_ns is not None and timestamp_ns <= last_ns:
+            # Odczyt spóźniony lub z tym samym znacznikiem czasu - nie da się policzyć tempa zmian
+            return None
+        state[0] = timestamp_ns
+        state[1] = value
+        if last_ns is None:
+            return None
+
+        rate = abs(value - last_value) * 1e9 / (timestamp_ns - last_ns)
+        if rate > self.max_rate:
+            return f"zmiana {rate:.2f}/s (z {last_value:.2f})"
+        return None
+
+
+class StuckDetector:
+    """
+    Zawieszony czujnik: ta sama wartość (z dokładnością do tolerance) w co najmniej min_count kolejnych
+    odczytach trwających co najmniej min_seconds. Zgłaszane raz na każdą serię takich odczytów.
+    """
+
+    name = "stuck"
+
+    def __init__(self, min_count: int = 30, min_seconds: float = 0.0, tolerance: float = 0.0):
+        """
+        :param min_count: Od ilu jednakowych odczytów z rzędu zgłosić anomalię
+        :param min_seconds: Jak długo (w sekundach) wartość musi się nie zmieniać
+        :param tolerance: Największa różnica wartości uznawanych za jednakowe
+        """
+        if min_count < 2 or min_seconds < 0 or tolerance < 0:
+            raise ValueError("Nieprawidłowe parametry detektora zawieszonej wartości")
+        self.min_count = min_count
+        self.min_ns = int(min_seconds * 10 ** 9)
+        self.tolerance = tolerance
+
+    def new_state(self, sensor_id: str) -> list:
+        # Wartość serii, początek serii (ns), liczba odczytów w serii, czy już zgłoszono
+        return [None, 0, 0, False]
+
+    def update(self, state: list, timestamp_ns: int, value: float) -> Optional[str]:
+        if state[0] is None or abs(value - state[0]) > self.tolerance:
+            state[0] = value
+            state[1] = timestamp_ns
+            state[2] = 1
+            state[3] = False
+            return None
+
+        state[2] += 1
+        if not state[3] and state[2] >= self.min_count and timestamp_ns - state[1] >= self.min_ns:
+            state[3] = True
+            return f"wartość {value} bez zmian w {state[2]} odczytach ({(timestamp_ns - state[1]) / 1e9:.0f} s)"
+        return None
+
+
+class RangeDetector:
+    """Wartość spoza zakresu [minimum, maximum] - wspólnego albo podanego dla konkretnych czujników."""
+
+    name = "range"
+
+    def __init__(self, minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 limits: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None):
+        """
+        :param minimum: Najmniejsza dopuszczalna wartość (None - bez ograniczenia)
+        :param maximum: Największa dopuszczalna wartość (None - bez ograniczenia)
+        :param limits: Zakresy {sensor_id: (minimum, maximum)} zastępujące wspólny zakres
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limits = dict(limits or {})
+
+    def new_state(self, sensor_id: str) -> list:
+        minimum, maximum = self.limits.get(sensor_id, (self.minimum, self.maximum))
+        return [-math.inf if minimum is None else minimum, math.inf if maximum is None else maximum]
+
+    def update(self, state: list, timestamp_ns: int, value: float) -> Optional[str]:
+        if value < state[0]:
+            return f"poniżej minimum {state[0]}"
+        if value > state[1]:
+            return f"powyżej maksimum {state[1]}"
+        return None
+
+
+class AnomalyDetector:
+    """
+    Strumieniowe wykrywanie anomalii w odczytach, uruchamiane przez serwer dla każdego przyjętego odczytu.
+
+    Każdy detektor (ZScoreDetector, RateDetector, StuckDetector, RangeDetector lub własna klasa
+    z atrybutem name i metodami new_state(sensor_id) / update(state, timestamp_ns, value)) trzyma
+    dla czujnika stały, niewielki stan (listę kilku liczb) i aktualizuje go w czasie O(1) - bez
+    przechowywania historii i bez ponownego przeglądania danych. update() detektora zwraca opis
+    anomalii albo None.
+
+    Stan jest zależny od kolejności odczytów, więc obiekt wolno używać tylko w jednym wątku
+    (w serwerze - w wątku, który przyjmuje odczyty).
+    """
+
+    def __init__(self, detectors: Optional[Sequence] = None):
+        """:param detectors: Detektory do uruchomienia; domyślnie ZScoreDetector i StuckDetector"""
+        self.detectors = tuple(detectors) if detectors is not None else (ZScoreDetector(), StuckDetector())
+        self._states: Dict[str, List[list]] = {}
+
+    def update(self, sensor_id: str, timestamp_ns: int, value: float) -> Optional[List[dict]]:
+        """
+        Przetwarza odczyt czujnika. Zwraca listę zdarzeń {"sensor_id", "timestamp_ns", "value",
+        "detector", "detail"} albo None, jeśli żaden detektor nie zgłosił anomalii.
+        """
+        states = self._states.get(sensor_id)
+        if states is None:
+            states = self._states[sensor_id] = [detector.new_state(sensor_id) for detector in self.detectors]
+
+        events = None
+        for detector, state in zip(self.detectors, states):
+            detail = detector.update(state, timestamp_ns, value)
+            if detail is not None:
+                if events is None:
+                    events = []
+                events.append({"sensor_id": sensor_id, "timestamp_ns": timestamp_ns, "value": value,
+                               "detector": detector.name, "detail": detail})
+        return events
+
+    def forget(self, sensor_id: str) -> None:
+        """Usuwa stan czujnika (np. po wymianie - detektory zaczną uczyć się od nowa)."""
+        self._states.pop(sensor_id, None)
+
+    def sensors(self) -> int:
+        return len(self._states)
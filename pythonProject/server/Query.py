@@ -0,0 +1,148 @@
+import heapq
+import json
+import time
+from typing import Iterable, Iterator, List, Optional
+
+from network.Protocol import END, ROWS, QueryRequest, from_epoch_ns, to_epoch_ns
+
+
+class Query(QueryRequest):
+    """
+    Zapytanie QUERY po stronie serwera (format linii i odpowiedzi - network.Protocol.QueryRequest).
+
+    Wiersze są posortowane po czasie i wytwarzane na bieżąco - w pamięci jest najwyżej jedna
+    porcja odpowiedzi (oraz migawka okna przy odpowiedzi z pamięci serwera albo gotowe kubełki
+    z Rollups, gdy logger ma poziom pasujący do bucket).
+    """
+
+    def __init__(self, start_ns: int, end_ns: int, sensors: Optional[Iterable[str]] = None,
+                 bucket_ns: Optional[int] = None, chunk_rows: int = 1000):
+        super().__init__(start_ns, end_ns, sensors, bucket_ns, chunk_rows)
+        self.source: Optional[str] = None
+
+    def plan(self, server) -> str:
+        """
+        Wybiera źródło odpowiedzi: okno w pamięci serwera, jeśli na pewno zawiera wszystkie
+        odczyty z przedziału, a w przeciwnym razie logger (jeśli jest).
+        """
+        self.source = 'window' if server.logger is None or self._window_covers(server) else 'logger'
+        return self.source
+
+    def chunks(self, server) -> Iterator[bytes]:
+        """Generator kolejnych linii odpowiedzi (ROWS ... i na końcu END)."""
+        source = self.source or self.plan(server)
+        if source == 'window':
+            rows = self._window_rows(server)
+            if self.bucket_ns is not None:
+                rows = self._buckets(rows)
+        elif self.bucket_ns is None:
+            rows = self._logger_rows(server)
+        elif server.logger.rollups is not None and server.logger.rollups.pick_tier(self.bucket_ns) is not None:
+            rows = self._rollup_rows(server)
+        else:
+            rows = self._buckets(self._logger_rows(server))
+
+        count = 0
+        chunk = []
+        for timestamp_ns, sensor_id, row in rows:
+            row["timestamp"] = timestamp_ns if server.epoch_ns else from_epoch_ns(timestamp_ns).isoformat()
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                count += len(chunk)
+                yield ROWS + b" " + json.dumps(chunk).encode('utf-8') + b"\n"
+                chunk = []
+        if chunk:
+            count += len(chunk)
+            yield ROWS + b" " + json.dumps(chunk).encode('utf-8') + b"\n"
+        yield END + f" {count} {source}\n".encode('ascii')
+
+    def _window_covers(self, server) -> bool:
+        # Okno czujnika ma wszystkie jego odczyty od pierwszego przyjętego po starcie serwera (since_ns)
+        # i nowsze od max(granica wieku, ostatni usunięty odczyt). Czujnik bez okna nie przysłał nic
+        # od startu serwera - wcześniejsze odczyty są tylko w logach. Bez listy czujników nie wiadomo,
+        # które czujniki nie mają okna, więc zakres sprzed startu serwera zawsze wymaga logów.
+        if self.sensors is None:
+            if self.start_ns < server.started_ns:
+                return False
+            sensors = list(server._readings)
+        else:
+            sensors = self.sensors
+
+        now_ns = time.time_ns()
+        for sensor_id in sensors:
+            stats = server._readings.get(sensor_id)
+            if stats is None:
+                if self.start_ns < server.started_ns:
+                    return False
+                continue
+            window = stats.window
+            if self.start_ns < stats.since_ns or self.start_ns <= max(window.horizon_ns, now_ns - window.retention_ns):
+                return False
+        return True
+
+    def _window_rows(self, server) -> Iterator[tuple]:
+        # Migawka przedziału z okien (zwarte tablice array), scalana po czasie między czujnikami
+        streams = []
+        for sensor_id, stats in list(server._readings.items()):
+            if self.sensors is not None and sensor_id not in self.sensors:
+                continue
+            timestamps, values = stats.window.range(self.start_ns, self.end_ns)
+            if timestamps:
+                streams.append(self._stream(sensor_id, stats.window.unit, timestamps, values))
+        for timestamp_ns, sensor_id, value, unit in heapq.merge(*streams):
+            yield timestamp_ns, sensor_id, {"sensor_id": sensor_id, "value": value, "unit": unit}
+
+    @staticmethod
+    def _stream(sensor_id: str, unit: str, timestamps, values) -> Iterator[tuple]:
+        for timestamp_ns, value in zip(timestamps, values):
+            yield timestamp_ns, sensor_id, value, unit
+
+    def _logger_rows(self, server) -> Iterator[tuple]:
+        sensor_id = next(iter(self.sensors)) if self.sensors is not None and len(self.sensors) == 1 else None
+        readings = server.logger.read_logs(self.start_ns, self.end_ns, sensor_id, parallel=True)
+        for reading in readings:
+            if self.sensors is not None and reading['sensor_id'] not in self.sensors:
+                continue
+            yield to_epoch_ns(reading['timestamp']), reading['sensor_id'], {
+                "sensor_id": reading['sensor_id'], "value": reading['value'], "unit": reading['unit']
+            }
+
+    def _rollup_rows(self, server) -> List[tuple]:
+        # Kubełki z poziomów Rollups - wynik ma tyle wierszy, ile kubełków, a nie odczytów
+        sensor_id = next(iter(self.sensors)) if self.sensors is not None and len(self.sensors) == 1 else None
+        rows = server.logger.query_rollups(self.start_ns, self.end_ns, self.bucket_ns / 10 ** 9, sensor_id)
+        result = []
+        for row in rows:
+            if self.sensors is None or row['sensor_id'] in self.sensors:
+                result.append((to_epoch_ns(row.pop('timestamp')), row['sensor_id'], row))
+        return result
+
+    def _buckets(self, rows: Iterable[tuple]) -> Iterator[tuple]:
+        """Agreguje uporządkowane po czasie wiersze w kubełki; kubełek jest wysyłany, gdy strumień go minie."""
+        bucket_ns = self.bucket_ns
+        current = None
+        states = {}
+        for timestamp_ns, sensor_id, row in rows:
+            start_ns = timestamp_ns - timestamp_ns % bucket_ns
+            if start_ns != current:
+                yield from self._closed(current, states)
+                current = start_ns
+                states = {}
+            value = row["value"]
+            state = states.get(sensor_id)
+            if state is None:
+                states[sensor_id] = [1, value, value, value, value, row["unit"]]
+            else:
+                state[0] += 1
+                state[1] += value
+                state[2] = min(state[2], value)
+                state[3] = max(state[3], value)
+                state[4] = value
+        yield from self._closed(current, states)
+
+    @staticmethod
+    def _closed(start_ns: Optional[int], states: dict) -> Iterator[tuple]:
+        for sensor_id in sorted(states):
+            count, total, minimum, maximum, last, unit = states[sensor_id]
+            yield start_ns, sensor_id, {"sensor_id": sensor_id, "count": count, "avg": total / count,
+                                        "min": minimum, "max": maximum, "last": last, "unit": unit}
@@ -0,0 +1,270 @@
+import math
+from collections import deque
+from typing import Dict, Mapping, NamedTuple, Optional
+
+from server.SensorWindow import SensorWindow
+
+
+class QuantileSketch:
+    """
+    Strumieniowy szkic kwantyli o stałym błędzie względnym (w stylu DDSketch).
+
+    Wartości trafiają do kubełków o wykładniczo rosnącej szerokości, więc szkic
+    zajmuje pamięć zależną od rozpiętości wartości, a nie od liczby odczytów.
+    Ponieważ kubełki są zwykłymi licznikami, odczyty można z niego także usuwać,
+    co pozwala liczyć kwantyle w przesuwającym się oknie.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy musi być z przedziału (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive: Dict[int, int] = {}
+        self._negative: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self._update(value, 1)
+
+    def remove(self, value: float) -> None:
+        self._update(value, -1)
+
+    def clear(self) -> None:
+        self._positive.clear()
+        self._negative.clear()
+        self._zero = 0
+        self.count = 0
+
+    def to_state(self) -> tuple:
+        """Kopia kubełków szkicu (do przesłania do innego procesu i scalenia przez merge_state)."""
+        return dict(self._positive), dict(self._negative), self._zero
+
+    def merge_state(self, state: tuple) -> None:
+        """Dolicza kubełki innego szkicu o tej samej dokładności (wynik to_state())."""
+        positive, negative, zero = state
+        for store, other in ((self._positive, positive), (self._negative, negative)):
+            for key, count in other.items():
+                store[key] = store.get(key, 0) + count
+                self.count += count
+        self._zero += zero
+        self.count += zero
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Zwraca przybliżony kwantyl rzędu q (0..1) lub None dla pustego szkicu."""
+        if self.count <= 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self._negative, reverse=True):
+            seen += self._negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            seen += self._positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return None
+
+    def _update(self, value: float, delta: int) -> None:
+        self.count += delta
+        if -self.min_value < value < self.min_value:
+            self._zero += delta
+            return
+
+        store = self._positive if value > 0 else self._negative
+        key = math.ceil(math.log(abs(value)) / self._log_gamma)
+        count = store.get(key, 0) + delta
+        if count > 0:
+            store[key] = count
+        else:
+            store.pop(key, None)
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+
+class RollingAggregate:
+    """
+    Liczba, suma, minimum, maksimum i szkic kwantyli odczytów z ostatnich span_ns.
+
+    Odczyty są dodawane przez add() i zdejmowane przez remove(), gdy wypadną z okna.
+    Minimum i maksimum są utrzymywane w kolejkach monotonicznych, więc każda operacja
+    ma zamortyzowany koszt O(1). boundary_ns to granica, do której (włącznie)
+    odczyty zostały już zdjęte z agregatu.
+    """
+
+    def __init__(self, span_ns: int, sketch: bool = True):
+        self.span_ns = span_ns
+        self.boundary_ns = -1 << 63
+        self.count = 0
+        self.total = 0.0
+        self.sketch = QuantileSketch() if sketch else None
+        self._removed = 0
+        self._cursor = 0
+        # Kandydaci na minimum/maksimum: pary (timestamp_ns, value) posortowane po czasie
+        self._min = deque()
+        self._max = deque()
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    def add(self, timestamp_ns: int, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if self.sketch:
+            self.sketch.add(value)
+        self._push(self._min, timestamp_ns, value, lambda kept, new: kept < new)
+        self._push(self._max, timestamp_ns, value, lambda kept, new: kept > new)
+
+    def remove(self, timestamp_ns: int, value: float) -> None:
+        self.count -= 1
+        self._removed += 1
+        if self.count:
+            self.total -= value
+        else:
+            self.total = 0.0
+        if self.sketch:
+            self.sketch.remove(value)
+        for candidates in (self._min, self._max):
+            while candidates and candidates[0][0] <= timestamp_ns:
+                candidates.popleft()
+
+    def advance(self, window: SensorWindow, now_ns: int) -> None:
+        """Zdejmuje z agregatu odczyty starsze niż span_ns względem now_ns (muszą być jeszcze w oknie)."""
+        boundary_ns = now_ns - self.span_ns
+        if boundary_ns <= self.boundary_ns:
+            return
+
+        # Kursor wskazuje pierwszy odczyt, który może jeszcze być w agregacie. Wszystko przed nim
+        # jest <= boundary_ns, więc odczyt spóźniony wstawiony przed kursor tylko przesuwa go
+        # o jedno miejsce wstecz - przejście do przodu pomija takie odczyty bez ich zdejmowania.
+        previous_ns = self.boundary_ns
+        self.boundary_ns = boundary_ns
+        seq = max(self._cursor, window.first_seq)
+        end = window.next_seq
+        while seq < end:
+            timestamp_ns, value = window.get(seq)
+            if timestamp_ns > boundary_ns:
+                break
+            if timestamp_ns > previous_ns:
+                self.remove(timestamp_ns, value)
+            seq += 1
+        self._cursor = seq
+
+        # Odejmowanie liczb zmiennoprzecinkowych kumuluje błąd - co jakiś czas liczymy sumę od nowa
+        if self._removed > max(1024, self.count):
+            _, values = window.range(boundary_ns + 1, 1 << 62)
+            self.total = math.fsum(values)
+            self._removed = 0
+
+    def contains(self, timestamp_ns: int) -> bool:
+        return timestamp_ns > self.boundary_ns
+
+    @staticmethod
+    def _push(candidates: deque, timestamp_ns: int, value: float, keeps) -> None:
+        # Odczyt dodawany na końcu (typowy przypadek): usuwamy kandydatów, których zdominował
+        if not candidates or candidates[-1][0] <= timestamp_ns:
+            while candidates and not keeps(candidates[-1][1], value):
+                candidates.pop()
+            candidates.append((timestamp_ns, value))
+            return
+
+        # Odczyt spóźniony: wstawiamy go w środek, o ile późniejszy kandydat go nie dominuje
+        position = len(candidates)
+        while position and candidates[position - 1][0] > timestamp_ns:
+            position -= 1
+        if not keeps(value, candidates[position][1]):
+            return
+        candidates.insert(position, (timestamp_ns, value))
+        while position and not keeps(candidates[position - 1][1], value):
+            del candidates[position - 1]
+            position -= 1
+
+
+class SensorStats:
+    """
+    Okno odczytów jednego czujnika razem z przyrostowymi agregatami dla kilku długości okien.
+    Najdłuższe okno wyznacza czas przechowywania odczytów w SensorWindow.
+    """
+
+    def __init__(self, spans_ns: Dict[str, int], max_points: int = 1 << 17, sketch: bool = True):
+        """
+        :param spans_ns: Nazwane długości okien w nanosekundach, np. {"1h": ..., "12h": ...}
+        :param max_points: Maksymalna liczba odczytów trzymanych w pamięci
+        :param sketch: Czy utrzymywać szkice kwantyli (p50/p95)
+        """
+        self.window = SensorWindow(max(spans_ns.values()), max_capacity=max_points)
+        self.window.on_evict = self._on_evict
+        self.aggregates = {name: RollingAggregate(span_ns, sketch) for name, span_ns in spans_ns.items()}
+        self._evicted = False  # Czy od ostatniego dopisania bufor usuwał odczyty liczone w agregatach
+        # Znacznik czasu pierwszego odczytu - wcześniejsze odczyty czujnika mogły trafić tylko do logów
+        self.since_ns: Optional[int] = None
+
+    def add(self, timestamp_ns: int, value: float, now_ns: int) -> None:
+        if self.since_ns is None:
+            self.since_ns = timestamp_ns
+        self.advance(now_ns)
+        appended = self.window.append(timestamp_ns, value, now_ns=now_ns)
+        if self._evicted:
+            self._after_evict()
+        if not appended:
+            return
+        for aggregate in self.aggregates.values():
+            if aggregate.contains(timestamp_ns):
+                aggregate.add(timestamp_ns, value)
+
+    def advance(self, now_ns: int) -> None:
+        """Przesuwa wszystkie okna do chwili now_ns (bez nowego odczytu)."""
+        for aggregate in self.aggregates.values():
+            aggregate.advance(self.window, now_ns)
+        self.window.evict(now_ns - self.window.retention_ns)
+
+    def _on_evict(self, timestamp_ns: int, value: float) -> None:
+        # Odczyt usunięty po zapełnieniu bufora - zdejmujemy go z agregatów, które go jeszcze liczą.
+        # Odczyty z tym samym znacznikiem czasu są usuwane razem, więc do końca usuwania granica
+        # zostaje tuż przed nim (kolejne takie odczyty też są jeszcze w agregacie)
+        for aggregate in self.aggregates.values():
+            if aggregate.contains(timestamp_ns):
+                aggregate.remove(timestamp_ns, value)
+                aggregate.boundary_ns = timestamp_ns - 1
+                self._evicted = True
+
+    def _after_evict(self) -> None:
+        # Okno nie zawiera już niczego do horizon_ns włącznie - granica i kursor agregatów przesuwają się
+        # razem, więc spóźniony odczyt z usuniętym znacznikiem czasu nie zostanie ponownie policzony
+        self._evicted = False
+        for aggregate in self.aggregates.values():
+            if aggregate.boundary_ns < self.window.horizon_ns:
+                aggregate.boundary_ns = self.window.horizon_ns
+                aggregate._cursor = max(aggregate._cursor, self.window.first_seq)
+
+
+class StatsSnapshot(NamedTuple):
+    """
+    Niezmienna migawka statystyk wszystkich czujników publikowana przez serwer.
+
+    sensors to {sensor_id: wpis} (jak w Server.get_sensor_stats), a wpisy są tylko do odczytu.
+    Wpis czujnika, którego statystyki się nie zmieniły, jest tym samym obiektem co w poprzedniej
+    migawce, więc zmiany można wykrywać przez porównanie tożsamości (is). version rośnie
+    przy każdej migawce różniącej się od poprzedniej.
+    """
+    version: int
+    timestamp_ns: int
+    sensors: Mapping[str, Mapping]
@@ -0,0 +1,181 @@
+from array import array
+from typing import Callable, Optional, Tuple
+
+
+class SensorWindow:
+    """
+    Okno czasowe odczytów jednego czujnika przechowywane w buforze cyklicznym.
+
+    Znaczniki czasu (ns od epoki, int64) i wartości (float64) leżą w dwóch tablicach
+    array.array, więc okno nie tworzy osobnego obiektu na każdy odczyt. Dopisanie
+    i usunięcie najstarszych odczytów ma zamortyzowany koszt O(1), a pojemność rośnie
+    dwukrotnie tylko do max_capacity - po jej osiągnięciu usuwane są najstarsze odczyty.
+
+    Każdy odczyt ma numer kolejny (seq) rosnący przez cały czas życia okna; first_seq
+    to numer najstarszego odczytu, który wciąż jest w oknie.
+
+    on_evict (jeśli ustawione) jest wywoływane z (timestamp_ns, value) dla każdego odczytu,
+    który wypada z okna - zarówno przez wiek, jak i przez zapełnienie bufora.
+    """
+
+    def __init__(self, retention_ns: int, initial_capacity: int = 1024, max_capacity: int = 1 << 17):
+        """
+        :param retention_ns: Jak długo odczyty pozostają w oknie (w nanosekundach)
+        :param initial_capacity: Początkowa liczba miejsc w buforze
+        :param max_capacity: Maksymalna liczba odczytów przechowywanych naraz
+        """
+        if initial_capacity < 1 or max_capacity < 1:
+            raise ValueError("Nieprawidłowa pojemność okna")
+        initial_capacity = min(initial_capacity, max_capacity)
+
+        self.retention_ns = retention_ns
+        self.max_capacity = max_capacity
+        self.unit = ""
+        self.first_seq = 0
+        # Znacznik czasu ostatniego usuniętego odczytu - okno zawiera wszystkie przyjęte odczyty nowsze od niego
+        self.horizon_ns = -1 << 63
+        self.on_evict: Optional[Callable[[int, float], None]] = None
+
+        self._timestamps = array('q', bytes(8 * initial_capacity))
+        self._values = array('d', bytes(8 * initial_capacity))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._timestamps)
+
+    @property
+    def next_seq(self) -> int:
+        """Numer, który dostanie następny dopisany odczyt."""
+        return self.first_seq + self._count
+
+    def append(self, timestamp_ns: int, value: float, now_ns: Optional[int] = None) -> bool:
+        """
+        Dopisuje odczyt i usuwa odczyty starsze niż retention_ns względem now_ns
+        (domyślnie względem dopisywanego odczytu).
+        Odczyty spóźnione względem ostatniego są wstawiane na właściwe miejsce,
+        więc okno zawsze pozostaje posortowane po czasie.
+
+        Zawartość okna to zawsze wszystkie przyjęte odczyty nowsze od pewnej granicy:
+        po zapełnieniu bufora usuwane są wszystkie odczyty z najstarszym znacznikiem czasu,
+        a odczyt, który byłby najstarszy w oknie albo nie jest nowszy od usuniętych (horizon_ns),
+        nie jest przyjmowany.
+
+        :return: True jeśli odczyt został dopisany, False jeśli od razu wypadłby z okna
+        """
+        cutoff_ns = (timestamp_ns if now_ns is None else now_ns) - self.retention_ns
+        self.evict(cutoff_ns)
+        if timestamp_ns <= cutoff_ns or timestamp_ns <= self.horizon_ns:
+            return False
+
+        if self._count == len(self._timestamps):
+            if len(self._timestamps) < self.max_capacity:
+                self._grow()
+            else:
+                oldest_ns = self._timestamps[self._head]
+                if timestamp_ns <= oldest_ns:
+                    return False
+                self.evict(oldest_ns)
+
+        capacity = len(self._timestamps)
+        position = (self._head + self._count) % capacity
+        self._count += 1
+
+        # Wstawianie przez przesuwanie od końca - dla prawie posortowanych danych to O(1)
+        while position != self._head:
+            previous = (position - 1) % capacity
+            if self._timestamps[previous] <= timestamp_ns:
+                break
+            self._timestamps[position] = self._timestamps[previous]
+            self._values[position] = self._values[previous]
+            position = previous
+
+        self._timestamps[position] = timestamp_ns
+        self._values[position] = value
+        return True
+
+    def evict(self, cutoff_ns: int) -> int:
+        """Usuwa odczyty ze znacznikiem czasu <= cutoff_ns. Zwraca liczbę usuniętych odczytów."""
+        removed = 0
+        while self._count and self._timestamps[self._head] <= cutoff_ns:
+            self._drop_oldest()
+            removed += 1
+        return removed
+
+    def last(self) -> Optional[Tuple[int, float]]:
+        """Zwraca najnowszy odczyt jako (timestamp_ns, value) lub None dla pustego okna."""
+        if not self._count:
+            return None
+        position = (self._head + self._count - 1) % len(self._timestamps)
+        return self._timestamps[position], self._values[position]
+
+    def get(self, seq: int) -> Tuple[int, float]:
+        """Zwraca odczyt o podanym numerze kolejnym."""
+        offset = seq - self.first_seq
+        if not 0 <= offset < self._count:
+            raise IndexError(f"Odczyt {seq} nie jest już w oknie")
+        position = (self._head + offset) % len(self._timestamps)
+        return self._timestamps[position], self._values[position]
+
+    def range(self, start_ns: int, end_ns: int) -> Tuple[array, array]:
+        """
+        Zwraca kopię odczytów z przedziału [start_ns, end_ns] jako dwie tablice
+        (znaczniki czasu, wartości). Tablice można bez kopiowania owinąć
+        w NumPy przez numpy.frombuffer.
+        """
+        first = self._bisect(start_ns, right=False)
+        last = self._bisect(end_ns, right=True)
+        return self._slice(self._timestamps, first, last), self._slice(self._values, first, last)
+
+    def seq_at(self, timestamp_ns: int) -> int:
+        """Numer kolejny pierwszego odczytu ze znacznikiem czasu > timestamp_ns."""
+        return self.first_seq + self._bisect(timestamp_ns, right=True)
+
+    def memory_bytes(self) -> int:
+        """Rozmiar tablic okna w bajtach."""
+        return self._timestamps.itemsize * len(self._timestamps) + self._values.itemsize * len(self._values)
+
+    def _bisect(self, timestamp_ns: int, right: bool) -> int:
+        # Indeks logiczny pierwszego odczytu > timestamp_ns (right, jak bisect_right) lub >= timestamp_ns
+        low, high = 0, self._count
+        capacity = len(self._timestamps)
+        while low < high:
+            middle = (low + high) // 2
+            value = self._timestamps[(self._head + middle) % capacity]
+            if value < timestamp_ns or (right and value == timestamp_ns):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _slice(self, data: array, first: int, last: int) -> array:
+        if first >= last:
+            return array(data.typecode)
+        capacity = len(data)
+        start = (self._head + first) % capacity
+        end = (self._head + last) % capacity
+        if start < end:
+            return data[start:end]
+        return data[start:] + data[:end]
+
+    def _drop_oldest(self) -> None:
+        self.horizon_ns = self._timestamps[self._head]
+        if self.on_evict:
+            self.on_evict(self._timestamps[self._head], self._values[self._head])
+        self._head = (self._head + 1) % len(self._timestamps)
+        self._count -= 1
+        self.first_seq += 1
+
+    def _grow(self) -> None:
+        capacity = min(self.max_capacity, 2 * len(self._timestamps))
+        timestamps = self._slice(self._timestamps, 0, self._count)
+        values = self._slice(self._values, 0, self._count)
+        timestamps.extend(array('q', bytes(8 * (capacity - self._count))))
+        values.extend(array('d', bytes(8 * (capacity - self._count))))
+        self._timestamps = timestamps
+        self._values = values
+        self._head = 0
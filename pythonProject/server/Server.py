@@ -1,75 +1,581 @@
+import asyncio
 import socket
 import json
-import traceback
+import time
+from types import MappingProxyType
 from typing import Optional, Callable, Dict, List
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from Diagnostics import Diagnostics
+from Metrics import METRICS
+from network.Protocol import (
+    FRAME_ACK, FRAME_ERROR, FRAME_READINGS, FRAME_RETRY, HELLO, HELLO_OK, QUERY, FrameBuffer, ReadingDecoder,
+    encode_counter, from_epoch_ns, to_epoch_ns
+)
+from server.Admission import Admission
+from server.Anomaly import AnomalyDetector
+from server.Query import Query
+from server.RollingStats import SensorStats, StatsSnapshot
+
+_log = Diagnostics("server")
+
+
+class _Session:
+    """
+    Stan protokołu jednego połączenia, wspólny dla trybu asyncio i blokującego.
+
+    Pojedynczy odczyt (obiekt JSON w linii) dostaje od razu odpowiedź "ACK".
+    Paczka odczytów (tablica JSON w linii) jest potwierdzana zbiorczo: po przetworzeniu
+    wszystkich linii z jednego fragmentu danych wysyłane jest jedno "ACK <n>", gdzie n to
+    łączna liczba odczytów z paczek przyjętych w tym połączeniu.
+
+    Linia "HELLO BIN1" przełącza połączenie na protokół binarny (network.Protocol),
+    w którym potwierdzenia mają postać ramek ACK/ERROR z tym samym licznikiem.
+
+    Linia "QUERY {...}" (tylko w protokole tekstowym) to zapytanie o odczyty (server.Query).
+    Przetwarzanie kolejnych linii jest wstrzymywane do czasu wysłania całej odpowiedzi.
+
+    Przy włączonej kontroli przyjmowania (server.Admission) potwierdzenie paczki może mieć postać
+    "ACK <n> RETRY <ms>" (klient powinien zwolnić), a odrzucona z powodu przeciążenia paczka -
+    "ERR <n> RETRY <ms>" (klient powinien wysłać ją ponownie po ms milisekundach). W protokole
+    binarnym wskazówka to ramka RETRY tuż przed ramką ACK/ERROR.
+    """
+
+    def __init__(self, server: "Server"):
+        self.server = server
+        self.received = 0
+        self.binary = False
+        self._decoder: Optional[ReadingDecoder] = None
+        self._ack_pending = False
+        self._retry_ms = 0  # Największa wskazówka RETRY od ostatniego potwierdzenia
+        self._output = []
+        self.query: Optional[Query] = None  # Zapytanie czekające na obsłużenie przez połączenie
+
+    def feed(self, buffer: FrameBuffer) -> None:
+        """
+        Przetwarza wszystkie kompletne linie/ramki z bufora.
+
+        :raises ValueError: Gdy strumień jest uszkodzony i połączenie trzeba zamknąć
+        """
+        while self.query is None:
+            if self.binary:
+                frame = buffer.read_frame()
+                if frame is None:
+                    return
+                self.feed_frame(frame)
+            else:
+                line = buffer.read_line()
+                if line is None:
+                    if len(buffer) > self.server.max_line_size:
+                        raise ValueError("Zbyt długa linia")
+                    return
+                self.feed_line(line)
+
+    def feed_eof(self, buffer: FrameBuffer) -> None:
+        # Stare klienty mogą nie zakończyć ostatniej linii znakiem nowej linii
+        if not self.binary and len(buffer):
+            self.feed_line(buffer.read_remaining())
+
+    def feed_line(self, line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+
+        if line == HELLO:
+            self._flush_ack()
+            self._output.append(HELLO_OK + b"\n")
+            self.binary = True
+            self._decoder = ReadingDecoder(iso_timestamps=not self.server.epoch_ns)
+            return
+
+        if line.startswith(QUERY + b" "):
+            self._flush_ack()
+            try:
+                self.query = Query.parse(line[len(QUERY) + 1:])
+            except (ValueError, TypeError) as e:
+                self._output.append(Query.error(e))
+            return
+
+        try:
+            payload = json.loads(line.decode('utf-8'))
+        except ValueError as e:
+            self._reject(e)
+            return
+
+        if isinstance(payload, list):
+            self._feed_batch(payload)
+            return
+
+        # Pojedynczy odczyt (stare klienty) też podlega kontroli przyjmowania; odrzucony dostaje
+        # "ERR <n> RETRY <ms>", a przyjęty - zwykłe "ACK" (bez wskazówki, której stare klienty nie znają)
+        admitted, sample, retry_ms = self._admit(1)
+        if not admitted:
+            self._flush_ack()
+            self._respond(FRAME_ERROR, b"ERR", retry_ms)
+            return
+        if self._handle_admitted(payload, sample):
+            self.server._metric_readings.inc()
+            self._flush_ack()
+            self._output.append(b"ACK\n")
+            self.server._metric_acks.inc()
+
+    def feed_frame(self, frame) -> None:
+        try:
+            readings = self._decoder.decode(frame)
+        except ValueError as e:
+            self._reject(e)
+            return
+
+        if frame[0] == FRAME_READINGS:
+            self._feed_batch(readings)
+
+    def _feed_batch(self, readings: list) -> None:
+        admitted, sample, retry_ms = self._admit(len(readings))
+        if not admitted:
+            self._flush_ack()
+            self._respond(FRAME_ERROR, b"ERR", retry_ms)
+            return
+        self._retry_ms = max(self._retry_ms, retry_ms)
+
+        if sample:
+            for reading in readings:
+                self._handle_admitted(reading, True)
+        else:
+            for reading in readings:
+                self.server._handle_reading(reading)
+        self.received += len(readings)
+        self.server._metric_readings.inc(len(readings))
+        self._ack_pending = True
+
+    def _admit(self, count: int) -> tuple:
+        """
+        Kontrola przyjmowania count odczytów (server.Admission).
+        Zwraca (czy przyjąć, czy zapisywać tylko próbkę, wskazówka RETRY w ms).
+        """
+        server = self.server
+        admission = server.admission
+        if admission is None:
+            return True, False, 0
+
+        pending = server.logger.queue_depth()
+        retry_ms = admission.retry_ms(pending)
+        overflow = admission.overflow(pending, count)
+        if overflow and admission.policy == 'reject':
+            admission.shed += count
+            server._metric_shed.inc(count)
+            return False, False, retry_ms
+        if overflow and admission.policy == 'drop_oldest':
+            shed = server.logger.shed(overflow)
+            admission.shed += shed
+            server._metric_shed.inc(shed)
+        return True, bool(overflow) and admission.policy == 'sample', retry_ms
+
+    def _handle_admitted(self, reading, sample: bool) -> bool:
+        # Przy polityce "sample" do loggera trafia tylko co sample_every-ty odczyt czujnika
+        log = True
+        if sample:
+            log = self.server.admission.sample(reading.get("sensor_id") if isinstance(reading, dict) else None)
+            if not log:
+                self.server._metric_shed.inc()
+        return self.server._handle_reading(reading, log)
+
+    def take_output(self) -> bytes:
+        self._flush_ack()
+        output = b"".join(self._output)
+        self._output.clear()
+        return output
+
+    def _reject(self, error: Exception) -> None:
+        self.server._metric_parse_errors.inc()
+        self.server._handle_error(error)
+        self._flush_ack()
+        self._respond(FRAME_ERROR, b"ERR", 0)
+
+    def _flush_ack(self) -> None:
+        if self._ack_pending:
+            self._respond(FRAME_ACK, b"ACK", self._retry_ms)
+            self._ack_pending = False
+            self._retry_ms = 0
+            self.server._metric_acks.inc()
+
+    def _respond(self, frame_type: int, word: bytes, retry_ms: int) -> None:
+        # Potwierdzenie/odrzucenie z licznikiem odczytów i opcjonalną wskazówką RETRY
+        if retry_ms:
+            self.server._metric_retry_hints.inc()
+        if self.binary:
+            if retry_ms:
+                self._output.append(encode_counter(FRAME_RETRY, retry_ms))
+            self._output.append(encode_counter(frame_type, self.received))
+        elif retry_ms:
+            self._output.append(word + f" {self.received} RETRY {retry_ms}\n".encode('ascii'))
+        else:
+            self._output.append(word + f" {self.received}\n".encode('ascii'))
+
+
+class _ClientProtocol(asyncio.BufferedProtocol):
+    """Obsługa pojedynczego, trwałego połączenia w trybie asyncio (odbiór prosto do bufora sesji)."""
+
+    def __init__(self, server: "Server"):
+        self.server = server
+        self.transport = None
+        self.session = _Session(server)
+        self.buffer = FrameBuffer()
+        self._drained: Optional[asyncio.Future] = None  # Ustawiane, gdy bufor wysyłania jest pełny
+        self._eof = False
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+        self.server._connections.add(self)
+        self.server._metric_connections.inc()
+
+    def pause_writing(self) -> None:
+        self._drained = asyncio.get_running_loop().create_future()
+
+    def resume_writing(self) -> None:
+        if self._drained is not None and not self._drained.done():
+            self._drained.set_result(None)
+        self._drained = None
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.buffer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.buffer.buffer_updated(nbytes)
+        if self.session.query is None:
+            started = time.perf_counter()
+            self._feed()
+            self.server._metric_handle.observe(time.perf_counter() - started)
+
+    def _feed(self) -> None:
+        try:
+            self.session.feed(self.buffer)
+        except ValueError as e:
+            _log.error("%s - zamykanie połączenia", e, every=1.0)
+            self._write_output()
+            self.transport.close()
+            return
+        self._write_output()
+        if self.session.query is not None:
+            # Na czas odpowiedzi nie czytamy kolejnych danych z połączenia
+            self.transport.pause_reading()
+            asyncio.get_running_loop().create_task(self._answer(self.session.query))
+
+    async def _answer(self, query: Query) -> None:
+        """
+        Wysyła odpowiedź na zapytanie porcjami. Porcje z okna w pamięci są tworzone w pętli zdarzeń,
+        a czytanie logów z dysku odbywa się w puli wątków. Gdy bufor wysyłania się zapełni
+        (pause_writing), następna porcja jest tworzona dopiero po jego opróżnieniu.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = query.chunks(self.server)
+        from_disk = query.plan(self.server) == 'logger'
+        try:
+            while not self.transport.is_closing():
+                chunk = await loop.run_in_executor(None, next, chunks, None) if from_disk else next(chunks, None)
+                if chunk is None:
+                    break
+                self.transport.write(chunk)
+                if self._drained is not None:
+                    await self._drained
+                elif not from_disk:
+                    await asyncio.sleep(0)
+        except Exception as e:
+            _log.error("Błąd zapytania: %s", e, every=1.0)
+            if not self.transport.is_closing():
+                self.transport.write(Query.error(e))
+        finally:
+            chunks.close()
+
+        self.session.query = None
+        if self.transport.is_closing():
+            return
+        if not self._eof:
+            self.transport.resume_reading()
+        self._feed()
+        if self._eof and self.session.query is None:
+            self.eof_received()
+            self.transport.close()
+
+    def eof_received(self):
+        self._eof = True
+        if self.session.query is not None:
+            # Odpowiedź na zapytanie jest jeszcze wysyłana - połączenie zamkniemy po jej końcu
+            return True
+        self.session.feed_eof(self.buffer)
+        self._write_output()
+        return False
+
+    def connection_lost(self, exc) -> None:
+        self.server._connections.discard(self)
+        self.resume_writing()
+
+    def _write_output(self) -> None:
+        output = self.session.take_output()
+        if output and not self.transport.is_closing():
+            self.transport.write(output)
 
 
 class Server:
-    def __init__(self, port: int, logger=None):
+    def __init__(self, port: int, logger=None, mode: str = "async", backlog: int = socket.SOMAXCONN,
+                 client_timeout: float = 30.0, window_hours: float = 12, window_max_points: int = 1 << 17,
+                 extra_windows: Optional[Dict[str, float]] = None, percentiles: bool = True,
+                 epoch_ns: bool = False, stats_interval: float = 1.0, reuse_port: bool = False,
+                 max_pending: Optional[int] = None, shed_policy: str = "reject", retry_after_ms: int = 100,
+                 sample_every: int = 10, anomaly: Optional[AnomalyDetector] = None):
         """
         Inicjalizuje serwer na wskazanym porcie.
 
         :param port: Port do nasłuchiwania
         :param logger: Opcjonalny obiekt loggera
+        :param mode: Tryb pracy: "async" (asyncio, wiele trwałych połączeń naraz)
+                     lub "blocking" (jedno połączenie na raz, jak w pierwszej wersji)
+        :param backlog: Długość kolejki oczekujących połączeń przekazywana do listen()
+        :param client_timeout: Czas bezczynności połączenia w trybie "blocking" (w sekundach)
+        :param window_hours: Jak długo odczyty są trzymane w pamięci na potrzeby statystyk
+        :param window_max_points: Maksymalna liczba odczytów w pamięci dla jednego czujnika
+        :param extra_windows: Dodatkowe okna statystyk {nazwa: długość w sekundach}, np. {"5m": 300}
+        :param percentiles: Czy liczyć przybliżone kwantyle p50/p95 w każdym oknie
+        :param epoch_ns: Znaczniki czasu jako int - nanosekundy od epoki - w odczytach z protokołu binarnego
+                         (przekazywanych do on_new_reading) i w odczytach przekazywanych do loggera;
+                         zamiana na datetime następuje dopiero przy prezentacji
+        :param stats_interval: Co ile sekund wątek serwera publikuje migawkę statystyk (stats_snapshot)
+        :param reuse_port: Ustawia SO_REUSEPORT - kilka procesów może nasłuchiwać na tym samym porcie,
+                           a jądro rozdziela między nie połączenia (server.ShardedServer)
+        :param max_pending: Limit odczytów czekających na zapis w loggerze (kontrola przyjmowania,
+                            server.Admission); None - bez limitu. Wymaga loggera z async_write
+        :param shed_policy: Co robić po przekroczeniu max_pending: "reject", "drop_oldest" lub "sample"
+        :param retry_after_ms: Wskazówka RETRY dla klientów przy pełnym obciążeniu (w milisekundach)
+        :param sample_every: Co który odczyt czujnika zapisywać przy polityce "sample"
+        :param anomaly: Wykrywanie anomalii w przyjmowanych odczytach (server.Anomaly); zdarzenia trafiają
+                        do on_anomaly, a gdy go nie ustawiono - do komunikatów diagnostycznych
         """
+        if mode not in ("async", "blocking"):
+            raise ValueError(f"Nieznany tryb pracy serwera: {mode}")
+
         self.port = port
         self.logger = logger
+        self.mode = mode
+        self.backlog = backlog
+        self.reuse_port = reuse_port
+        self.client_timeout = client_timeout
+        self.max_line_size = 1024 * 1024
+        # Bez loggera serwer nie ma kolejki, którą mógłby przepełnić. Logger synchroniczny zapisuje bufor
+        # dopiero po zapełnieniu, więc przy odrzucaniu paczek jego bufor nigdy by się nie opróżnił
+        if max_pending and logger is not None and not getattr(logger, "async_write", False):
+            raise ValueError("max_pending wymaga loggera z zapisem asynchronicznym (async_write)")
+        self.admission = Admission(max_pending, shed_policy, retry_after_ms=retry_after_ms,
+                                   sample_every=sample_every) if max_pending and logger else None
+        self.anomaly = anomaly
 
         self.on_new_reading: Optional[Callable[[dict], None]] = None
         self.on_status_change: Optional[Callable[[str], None]] = None
+        # Wywoływane w wątku serwera przy każdej publikacji statystyk z wynikiem export_stats()
+        self.on_stats: Optional[Callable[[dict], None]] = None
+        # Wywoływane w wątku serwera dla każdej anomalii wykrytej przez anomaly (zdarzenie z AnomalyDetector.update)
+        self.on_anomaly: Optional[Callable[[dict], None]] = None
+
+        self.window_ns = int(window_hours * 3600 * 10 ** 9)
+        self.window_max_points = window_max_points
+        self.percentiles = percentiles
+        self.epoch_ns = epoch_ns
+        # Okna statystyk; "12h" to zawsze główne okno o długości window_hours
+        self.stats_windows_ns = {"1h": 3600 * 10 ** 9, "12h": self.window_ns}
+        for name, seconds in (extra_windows or {}).items():
+            self.stats_windows_ns[name] = int(seconds * 10 ** 9)
 
-        self._readings: Dict[str, List[dict]] = {}
+        self._readings: Dict[str, SensorStats] = {}
         self._running = False
+        self.stats_interval = stats_interval
+        self._snapshot = StatsSnapshot(0, 0, MappingProxyType({}))
+        self._snapshot_due = 0.0
+        # Od kiedy okna w pamięci zawierają wszystkie przyjęte odczyty (dla zapytań QUERY)
+        self.started_ns = time.time_ns()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shutdown: Optional[asyncio.Event] = None
+        self._connections = set()
+        # Połączenie obsługiwane w trybie blokującym - stop() je zamyka, żeby nie czekać na client_timeout
+        self._client_socket: Optional[socket.socket] = None
+
+        # Metryki (Metrics) - przy wyłączonym rejestrze to obiekty, których metody nic nie robią
+        self._metric_readings = METRICS.counter("server_readings_received_total", "Odczyty przyjęte przez serwer")
+        self._metric_acks = METRICS.counter("server_acks_sent_total", "Wysłane potwierdzenia ACK")
+        self._metric_parse_errors = METRICS.counter("server_parse_errors_total",
+                                                    "Linie i ramki, których nie udało się zdekodować")
+        self._metric_connections = METRICS.counter("server_connections_total", "Przyjęte połączenia klientów")
+        self._metric_shed = METRICS.counter("server_shed_readings_total",
+                                            "Odczyty odrzucone lub niezapisane przez kontrolę przyjmowania")
+        self._metric_retry_hints = METRICS.counter("server_retry_hints_total", "Potwierdzenia ze wskazówką RETRY")
+        self._metric_anomalies = METRICS.counter("server_anomalies_total", "Anomalie wykryte w odczytach")
+        self._metric_handle = METRICS.histogram("server_handle_client_seconds",
+                                                "Czas przetworzenia fragmentu danych odebranego z połączenia")
+        self._metric_window = METRICS.gauge("server_window_memory_bytes",
+                                            "Pamięć zajmowana przez okna odczytów (przy ostatniej publikacji statystyk)")
+        METRICS.gauge("server_connections_open", "Otwarte połączenia (tryb asyncio)",
+                      lambda: len(self._connections))
+        METRICS.gauge("server_sensors", "Liczba czujników w oknach", lambda: len(self._readings))
 
     def start(self) -> None:
-        """Uruchamia serwer i nasłuchuje na porcie TCP."""
+        """Uruchamia serwer i nasłuchuje na porcie TCP (blokuje do wywołania stop())."""
         self._running = True
+        self.started_ns = time.time_ns()
         self._set_status("Nasłuchiwanie")
 
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-                server_socket.bind(('', self.port))
-                server_socket.listen(5)
-                print(f"[SERVER] Listening on port {self.port}")
-
-                while self._running:
-                    client_socket, addr = server_socket.accept()
-                    with client_socket:
-                        self._handle_client(client_socket)
+            if self.mode == "async":
+                asyncio.run(self._serve_async())
+            else:
+                self._serve_blocking()
 
         except Exception as e:
             self._set_status("Błąd")
-            print(f"[SERVER ERROR] {e}")
-            traceback.print_exc()
+            _log.error("%s", e, exc_info=e)
 
         finally:
             self._set_status("Zatrzymano")
 
     def stop(self) -> None:
-        """Zatrzymuje serwer."""
+        """Zatrzymuje serwer. Bezpieczne do wywołania z innego wątku."""
         self._running = False
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._shutdown.set)
+            except RuntimeError:
+                # Pętla zdążyła się już zamknąć
+                pass
+        client_socket = self._client_socket
+        if client_socket is not None:
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # Połączenie zostało już zamknięte
+                pass
         self._set_status("Zatrzymano")
 
+    async def _serve_async(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._shutdown = asyncio.Event()
+        if not self._running:
+            return
+
+        server = await self._loop.create_server(
+            lambda: _ClientProtocol(self),
+            host='', port=self.port, backlog=self.backlog, reuse_address=True,
+            reuse_port=self.reuse_port or None
+        )
+        _log.info("Listening on port %d (asyncio)", self.port)
+        publisher = self._loop.create_task(self._publish_loop())
+
+        try:
+            await self._shutdown.wait()
+        finally:
+            publisher.cancel()
+            server.close()
+            for connection in list(self._connections):
+                connection.transport.close()
+            await server.wait_closed()
+            self._loop = None
+
+    async def _publish_loop(self) -> None:
+        while True:
+            self._publish_stats()
+            await asyncio.sleep(self.stats_interval)
+
+    def _serve_blocking(self) -> None:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            server_socket.bind(('', self.port))
+            server_socket.listen(self.backlog)
+            # Krótki timeout pozwala zauważyć wywołanie stop() bez czekania na kolejnego klienta
+            server_socket.settimeout(0.5)
+            _log.info("Listening on port %d", self.port)
+
+            while self._running:
+                self._maybe_publish_stats()
+                try:
+                    client_socket, addr = server_socket.accept()
+                except socket.timeout:
+                    continue
+                client_socket.settimeout(self.client_timeout)
+                self._metric_connections.inc()
+                with client_socket:
+                    self._client_socket = client_socket
+                    try:
+                        if self._running:
+                            self._handle_client(client_socket)
+                    finally:
+                        self._client_socket = None
+
     def _handle_client(self, client_socket) -> None:
+        """Obsługuje połączenie w trybie blokującym - aż do zamknięcia przez klienta."""
+        session = _Session(self)
+        buffer = FrameBuffer()
         try:
-            data = b""
-            while not data.endswith(b"\n"):
-                chunk = client_socket.recv(1024)
-                if not chunk:
+            while self._running:
+                if not buffer.recv_into(client_socket):
+                    session.feed_eof(buffer)
                     break
-                data += chunk
+                started = time.perf_counter()
+                session.feed(buffer)
+                output = session.take_output()
+                if output:
+                    client_socket.sendall(output)
+                self._metric_handle.observe(time.perf_counter() - started)
+                self._maybe_publish_stats()
+                while session.query is not None:
+                    # sendall blokuje, dopóki klient nie odbierze danych - to wystarcza jako kontrola przepływu
+                    self._answer_blocking(client_socket, session.query)
+                    session.query = None
+                    session.feed(buffer)
+                    output = session.take_output()
+                    if output:
+                        client_socket.sendall(output)
+
+            output = session.take_output()
+            if output:
+                client_socket.sendall(output)
+
+        except (OSError, ValueError) as e:
+            # Po stop() połączenie jest zamykane przez serwer - to nie jest błąd
+            if self._running:
+                _log.error("%s", e, every=1.0)
+
+    def _answer_blocking(self, client_socket, query: Query) -> None:
+        chunks = query.chunks(self)
+        try:
+            for chunk in chunks:
+                client_socket.sendall(chunk)
+        except OSError:
+            raise
+        except Exception as e:
+            _log.error("Błąd zapytania: %s", e, every=1.0)
+            client_socket.sendall(Query.error(e))
+        finally:
+            chunks.close()
 
-            json_data = json.loads(data.decode('utf-8'))
-            print(f"[SERVER] Received data:")
-            for k, v in json_data.items():
-                print(f"  {k}: {v}")
+    def _handle_reading(self, json_data: dict, log: bool = True) -> bool:
+        """
+        Przetwarza jeden odczyt. Zwraca True, jeśli został przyjęty poprawnie.
+
+        :param log: Czy przekazać odczyt do loggera (False - pominięty przez kontrolę przyjmowania)
+        """
+        try:
+            _log.debug("Received data: %s", json_data)
 
-            # Logowanie
-            if self.logger:
+            # Logowanie - ze znacznikiem czasu odczytu (nie czasem przyjęcia), żeby zapytania
+            # o okno w pamięci i o pliki/rollupy używały tego samego zegara
+            if self.logger and log:
+                timestamp = json_data.get("timestamp")
+                if isinstance(timestamp, str):
+                    timestamp = datetime.fromisoformat(timestamp)
+                elif not isinstance(timestamp, (int, datetime)):
+                    raise ValueError(f"Nieprawidłowy znacznik czasu odczytu: {timestamp!r}")
                 self.logger.log_reading(
                     sensor_id=json_data.get("sensor_id", "unknown"),
-                    timestamp=datetime.now(),
+                    timestamp=timestamp,
                     value=json_data.get("value", 0),
                     unit=json_data.get("unit", "")
                 )
@@ -78,22 +584,27 @@ class Server:
             self._buffer_reading(json_data)
             if self.on_new_reading:
                 self.on_new_reading(json_data)
-
-            # Wysłanie ACK
-            client_socket.sendall(b"ACK\n")
-            print("[SERVER] ACK sent")
+            return True
 
         except Exception as e:
-            print(f"[SERVER ERROR] {e}")
-            traceback.print_exc()
+            self._handle_error(e)
+            return False
 
-            if self.logger:
-                self.logger.log_reading(
-                    sensor_id="server",
-                    timestamp=datetime.now(),
-                    value=0,
-                    unit="ERROR"
-                )
+    def _handle_error(self, error: Exception) -> None:
+        # Przy zalewie błędnych danych wypisywany jest najwyżej jeden komunikat na sekundę
+        _log.error("%s", error, exc_info=error, every=1.0)
+
+        if self.logger:
+            self.logger.log_reading(
+                sensor_id="server",
+                timestamp=self._now(),
+                value=0,
+                unit="ERROR"
+            )
+
+    def _now(self):
+        """Czas serwera - tylko dla wierszy, które serwer tworzy sam (np. wpisy o błędach)."""
+        return time.time_ns() if self.epoch_ns else datetime.now()
 
     def _set_status(self, status: str):
         if self.on_status_change:
@@ -104,46 +615,124 @@ class Server:
         if not sensor_id:
             return
 
-        timestamp = datetime.fromisoformat(reading.get("timestamp"))
-        value = reading.get("value", 0)
+        timestamp_ns = to_epoch_ns(reading.get("timestamp"))
+        value = float(reading.get("value", 0))
+
+        stats = self._readings.get(sensor_id)
+        if stats is None:
+            stats = SensorStats(self.stats_windows_ns, self.window_max_points, self.percentiles)
+            self._readings[sensor_id] = stats
+
+        stats.window.unit = reading.get("unit", "")
+        stats.add(timestamp_ns, value, time.time_ns())
 
-        if sensor_id not in self._readings:
-            self._readings[sensor_id] = []
+        if self.anomaly is not None:
+            events = self.anomaly.update(sensor_id, timestamp_ns, value)
+            if events:
+                self._report_anomalies(events)
 
-        self._readings[sensor_id].append({
-            "timestamp": timestamp,
-            "value": value,
-            "unit": reading.get("unit", "")
-        })
+    def _report_anomalies(self, events: List[dict]) -> None:
+        self._metric_anomalies.inc(len(events))
+        for event in events:
+            if self.on_anomaly:
+                self.on_anomaly(event)
+            else:
+                _log.warning("Anomalia (%s) czujnika %s: %s", event["detector"], event["sensor_id"],
+                             event["detail"], every=1.0)
 
-        # Zachowaj tylko ostatnie 12h
-        cutoff = datetime.now() - timedelta(hours=12)
-        self._readings[sensor_id] = [
-            r for r in self._readings[sensor_id] if r["timestamp"] > cutoff
-        ]
+    def stats_snapshot(self) -> StatsSnapshot:
+        """
+        Ostatnia migawka statystyk opublikowana przez wątek serwera (co stats_interval sekund).
+        Można ją czytać z dowolnego wątku bez blokad - nigdy nie jest modyfikowana.
+        """
+        return self._snapshot
+
+    def _maybe_publish_stats(self) -> None:
+        # Tryb blokujący nie ma pętli zdarzeń - migawka jest publikowana między kolejnymi odbiorami danych
+        now = time.monotonic()
+        if now >= self._snapshot_due:
+            self._snapshot_due = now + self.stats_interval
+            self._publish_stats()
+
+    def _publish_stats(self) -> None:
+        """Buduje nową migawkę statystyk. Wywoływane tylko w wątku serwera, który modyfikuje okna."""
+        if self.on_stats:
+            self.on_stats(self.export_stats())
+        if METRICS.enabled:
+            self._metric_window.set(sum(stats.window.memory_bytes() for stats in self._readings.values()))
+
+        previous = self._snapshot
+        sensors = {}
+        changed = False
+        for entry in self.get_sensor_stats():
+            sensor_id = entry["sensor"]
+            old = previous.sensors.get(sensor_id)
+            if old is not None and old == entry:
+                sensors[sensor_id] = old
+            else:
+                sensors[sensor_id] = MappingProxyType(entry)
+                changed = True
+
+        if changed or len(sensors) != len(previous.sensors):
+            self._snapshot = StatsSnapshot(previous.version + 1, time.time_ns(), MappingProxyType(sensors))
+
+    def export_stats(self) -> Dict[str, dict]:
+        """
+        Stan agregatów wszystkich czujników w postaci, którą można przesłać do innego procesu
+        i scalić z innymi (server.ShardedServer): {sensor_id: {"unit", "last": (timestamp_ns, value),
+        "windows": {nazwa okna: (count, total, min, max, stan szkicu kwantyli lub None)}}}.
+        Tylko w wątku serwera.
+        """
+        result = {}
+        now_ns = time.time_ns()
+        for sensor_id, stats in self._readings.items():
+            stats.advance(now_ns)
+            last = stats.window.last()
+            if not last:
+                continue
+            result[sensor_id] = {
+                "unit": stats.window.unit,
+                "last": last,
+                "windows": {
+                    name: (aggregate.count, aggregate.total, aggregate.minimum, aggregate.maximum,
+                           aggregate.sketch.to_state() if aggregate.sketch else None)
+                    for name, aggregate in stats.aggregates.items()
+                },
+            }
+        return result
 
     def get_sensor_stats(self) -> List[dict]:
-        """Zwraca statystyki do GUI: ostatnia wartość, średnie 1h i 12h dla każdego czujnika."""
+        """
+        Zwraca statystyki do GUI: ostatnia wartość, średnie 1h i 12h dla każdego czujnika.
+        Modyfikuje okna (przesuwa je do bieżącej chwili), więc wolno ją wywoływać tylko w wątku
+        serwera - inne wątki powinny korzystać ze stats_snapshot().
+        Dla każdego okna (1h, 12h i dodatkowych) zwracane są też count_/avg_/min_/max_
+        oraz - jeśli włączone - przybliżone p50_/p95_ z dopiskiem nazwy okna.
+        Koszt nie zależy od liczby odczytów w oknach - agregaty są liczone przyrostowo.
+        """
         result = []
-        now = datetime.now()
-
-        for sensor_id, readings in self._readings.items():
-            readings_1h = [r for r in readings if r["timestamp"] > now - timedelta(hours=1)]
-            readings_12h = readings  # już przefiltrowane do 12h w _buffer_reading
-
-            last = readings[-1] if readings else None
-
-            if last:
-                avg_1h = sum(r["value"] for r in readings_1h) / len(readings_1h) if readings_1h else 0
-                avg_12h = sum(r["value"] for r in readings_12h) / len(readings_12h) if readings_12h else 0
-
-                result.append({
-                    "sensor": sensor_id,
-                    "last_value": last["value"],
-                    "unit": last["unit"],
-                    "timestamp": last["timestamp"].isoformat(),
-                    "avg_1h": round(avg_1h, 2),
-                    "avg_12h": round(avg_12h, 2)
-                })
+        now_ns = time.time_ns()
+
+        for sensor_id, stats in self._readings.items():
+            stats.advance(now_ns)
+            last = stats.window.last()
+            if not last:
+                continue
+
+            entry = {
+                "sensor": sensor_id,
+                "last_value": last[1],
+                "unit": stats.window.unit,
+                "timestamp": from_epoch_ns(last[0]).isoformat(),
+            }
+            for name, aggregate in stats.aggregates.items():
+                entry[f"avg_{name}"] = round(aggregate.average or 0, 2)
+                entry[f"count_{name}"] = aggregate.count
+                entry[f"min_{name}"] = aggregate.minimum
+                entry[f"max_{name}"] = aggregate.maximum
+                if aggregate.sketch:
+                    entry[f"p50_{name}"] = aggregate.sketch.quantile(0.5)
+                    entry[f"p95_{name}"] = aggregate.sketch.quantile(0.95)
+            result.append(entry)
 
         return result
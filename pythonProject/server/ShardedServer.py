@@ -0,0 +1,232 @@
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from Diagnostics import Diagnostics, configure, current_level
+from network.Protocol import from_epoch_ns
+from server.RollingStats import QuantileSketch
+from server.Server import Server
+
+_log = Diagnostics("server")
+
+
+def _worker_logger(config_path: str, number: int, async_write: bool = False):
+    """
+    Logger procesu roboczego - z własnym katalogiem <log_dir>/worker<numer>.
+
+    :param async_write: Wymusza zapis asynchroniczny (potrzebny kontroli przyjmowania - max_pending)
+    """
+    from Logger import Logger
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    config['log_dir'] = os.path.join(config['log_dir'], f"worker{number}")
+    # Poziomy Rollups są używane przez zapytania QUERY - jak w main_server
+    config['rollups'] = True
+    if async_write:
+        config['async_write'] = True
+
+    # Logger czyta konfigurację tylko w konstruktorze, więc plik tymczasowy można od razu usunąć
+    descriptor, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(config, f)
+        return Logger(path)
+    finally:
+        os.remove(path)
+
+
+def _run_worker(number: int, port: int, config_path: Optional[str], options: dict, updates, stop_event,
+                log_level: int) -> None:
+    """Proces roboczy: Server z SO_REUSEPORT, który co stats_interval wysyła stan agregatów do rodzica."""
+    configure(log_level)
+    logger = _worker_logger(config_path, number, bool(options.get("max_pending"))) if config_path else None
+    if logger:
+        logger.start()
+
+    server = Server(port, logger=logger, reuse_port=True, **options)
+    server.on_stats = lambda stats: updates.put((number, stats))
+    # Anomalie wykryte w procesie roboczym trafiają do on_anomaly procesu nadrzędnego
+    server.on_anomaly = lambda event: updates.put((number, [event]))
+
+    def watch_stop():
+        # Sprawdzanie zamiast stop_event.wait(): Event.set() w procesie nadrzędnym czeka, aż obudzą się
+        # wszystkie czekające procesy, więc zabity w trakcie wait() proces roboczy blokowałby stop()
+        while not stop_event.is_set():
+            time.sleep(0.2)
+        server.stop()
+
+    threading.Thread(target=watch_stop, name="ShardStop", daemon=True).start()
+    try:
+        server.start()
+    finally:
+        if logger:
+            logger.stop()
+        updates.put((number, None))
+
+
+class ShardedServer(Server):
+    """
+    Serwer złożony z kilku procesów roboczych nasłuchujących na tym samym porcie (SO_REUSEPORT).
+
+    Jądro rozdziela połączenia między procesy, więc parsowanie, agregacja i logowanie odczytów
+    działają na wielu rdzeniach. Każdy proces ma własny Logger z katalogiem <log_dir>/worker<numer>.
+    Procesy co stats_interval sekund przesyłają do procesu nadrzędnego stan swoich agregatów
+    (Server.export_stats) - liczniki, sumy, minima, maksima i kubełki szkiców kwantyli dają się
+    scalać, więc get_sensor_stats() i stats_snapshot() pokazują jeden wspólny widok wszystkich
+    czujników (z opóźnieniem do stats_interval).
+
+    Stan procesów roboczych jest trzymany tylko w pamięci procesu nadrzędnego: start() zaczyna od pustego
+    stanu, proces roboczy, który uległ awarii, jest usuwany ze scalonych statystyk, a po stop() ostatnie
+    scalone statystyki pozostają dostępne do następnego start().
+
+    Zapytania QUERY są obsługiwane przez proces, który przyjął połączenie - widzi on tylko
+    własne okna i własne logi. Wykrywanie anomalii (anomaly) działa w procesach roboczych, a zdarzenia
+    są przekazywane do on_anomaly procesu nadrzędnego; stan detektorów czujnika jest w procesie,
+    który przyjmuje jego odczyty (czujnik wysyłający przez kilka połączeń ma kilka niezależnych stanów).
+    """
+
+    def __init__(self, port: int, workers: int, config_path: Optional[str] = None, **options):
+        """
+        :param port: Port do nasłuchiwania
+        :param workers: Liczba procesów roboczych
+        :param config_path: Plik konfiguracji loggera (None - bez loggera)
+        :param options: Pozostałe parametry Server (mode, window_hours, stats_interval, epoch_ns, ...)
+        """
+        if workers < 1:
+            raise ValueError("Liczba procesów roboczych musi być dodatnia")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("SO_REUSEPORT nie jest dostępne w tym systemie")
+
+        super().__init__(port, **options)
+        self.workers = workers
+        self.config_path = config_path
+        self._options = options
+        self._shards: Dict[int, dict] = {}
+        self._processes = []
+        self._stop_event = None
+
+    def start(self) -> None:
+        """Uruchamia procesy robocze i scala ich statystyki (blokuje do wywołania stop())."""
+        context = multiprocessing.get_context('spawn')
+        updates = context.Queue()
+        self._stop_event = context.Event()
+        self._running = True
+        # Stan z poprzedniego uruchomienia nie może mieszać się z nowymi procesami
+        self._shards.clear()
+        crashed = set()
+        self._set_status("Nasłuchiwanie")
+
+        try:
+            self._processes = [
+                context.Process(target=_run_worker, name=f"ServerWorker-{number}", daemon=True,
+                                args=(number, self.port, self.config_path, self._options, updates,
+                                      self._stop_event, current_level()))
+                for number in range(self.workers)
+            ]
+            for process in self._processes:
+                process.start()
+            _log.info("Listening on port %d (%d workers)", self.port, self.workers)
+
+            finished = set()
+            while len(finished) < self.workers:
+                self._maybe_publish_stats()
+                self._reap_crashed(finished, crashed)
+                try:
+                    number, stats = updates.get(timeout=self.stats_interval)
+                except queue.Empty:
+                    if not self._running or not any(process.is_alive() for process in self._processes):
+                        break
+                    continue
+                if number in crashed:
+                    continue
+                if stats is None:
+                    finished.add(number)
+                elif isinstance(stats, list):
+                    self._report_anomalies(stats)
+                else:
+                    self._shards[number] = stats
+            self._publish_stats()
+
+        except Exception as e:
+            self._set_status("Błąd")
+            _log.error("%s", e, exc_info=e)
+
+        finally:
+            self._stop_event.set()
+            for process in self._processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            self._set_status("Zatrzymano")
+
+    def _reap_crashed(self, finished: set, crashed: set) -> None:
+        # Proces, który zakończył się z błędem, nie wyśle już stanu ani pożegnania (None) - jego ostatnie
+        # agregaty są nieaktualne, więc znikają ze scalonych statystyk, a pętla nie czeka na niego
+        for number, process in enumerate(self._processes):
+            if number in finished or process.exitcode in (None, 0):
+                continue
+            finished.add(number)
+            crashed.add(number)
+            self._shards.pop(number, None)
+            _log.error("Proces roboczy %d zakończył się z kodem %s", number, process.exitcode)
+
+    def stop(self) -> None:
+        """Zatrzymuje procesy robocze. Bezpieczne do wywołania z innego wątku."""
+        self._running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+        self._set_status("Zatrzymano")
+
+    def get_sensor_stats(self) -> List[dict]:
+        """Statystyki wszystkich czujników scalone z ostatnich stanów przesłanych przez procesy robocze."""
+        merged: Dict[str, dict] = {}
+        for stats in self._shards.values():
+            for sensor_id, shard in stats.items():
+                entry = merged.get(sensor_id)
+                if entry is None:
+                    merged[sensor_id] = entry = {"unit": shard["unit"], "last": shard["last"], "windows": {}}
+                elif shard["last"][0] > entry["last"][0]:
+                    entry["unit"] = shard["unit"]
+                    entry["last"] = shard["last"]
+
+                for name, (count, total, minimum, maximum, sketch) in shard["windows"].items():
+                    window = entry["windows"].get(name)
+                    if window is None:
+                        window = entry["windows"][name] = [0, 0.0, None, None, None]
+                    window[0] += count
+                    window[1] += total
+                    if minimum is not None:
+                        window[2] = minimum if window[2] is None else min(window[2], minimum)
+                    if maximum is not None:
+                        window[3] = maximum if window[3] is None else max(window[3], maximum)
+                    if sketch is not None:
+                        if window[4] is None:
+                            window[4] = QuantileSketch()
+                        window[4].merge_state(sketch)
+
+        result = []
+        for sensor_id, entry in merged.items():
+            timestamp_ns, value = entry["last"]
+            stat = {
+                "sensor": sensor_id,
+                "last_value": value,
+                "unit": entry["unit"],
+                "timestamp": from_epoch_ns(timestamp_ns).isoformat(),
+            }
+            for name, (count, total, minimum, maximum, sketch) in entry["windows"].items():
+                stat[f"avg_{name}"] = round(total / count if count else 0, 2)
+                stat[f"count_{name}"] = count
+                stat[f"min_{name}"] = minimum
+                stat[f"max_{name}"] = maximum
+                if sketch is not None:
+                    stat[f"p50_{name}"] = sketch.quantile(0.5)
+                    stat[f"p95_{name}"] = sketch.quantile(0.95)
+            result.append(stat)
+        return result